@@ -0,0 +1,147 @@
+import sys
+import json
+import time
+import threading
+from pathlib import Path
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from loadTest import make_pdf
+
+# 本地回放的巨潮资讯网：公告查询接口（分页）和 PDF 下载均由录制的公告列表生成，用于基准测试，
+# 也可以单独启动后把 CNINFO_API_BASE 指向它：
+#   python benchmark/fixtureServer.py 8800
+FIXTURE_PATH = Path(__file__).resolve().parent / "fixtures" / "cninfo_listing.json"
+# 每 30KB 对应一页，生成的 PDF 页数与录制的附件大小成比例
+KB_PER_PAGE = 30
+
+
+class FixtureSite:
+    """
+    录制的公告列表复制 copies 份（每份时间向前平移 30 天、announcementId 加后缀），模拟多页的长列表
+    """
+
+    def __init__(self, copies=3, latency=0.0):
+        recorded = json.loads(FIXTURE_PATH.read_text(encoding="utf-8"))["announcements"]
+        self.latency = latency
+        self.announcements = []
+        for copy in range(copies):
+            for item in recorded:
+                item = dict(item)
+                if copy:
+                    item["announcementId"] = f"{item['announcementId']}{copy:02d}"
+                    item["announcementTime"] -= copy * 30 * 86400 * 1000
+                self.announcements.append(item)
+        self.by_id = {item["announcementId"]: item for item in self.announcements}
+        self.requests = {"query": 0, "pdf": 0}
+        self._pdfs = {}
+        self._lock = threading.Lock()
+
+    def query(self, form):
+        """
+        按 seDate 过滤并分页，返回与公告查询接口相同结构的数据
+        """
+        page_num = int(form.get("pageNum", 1))
+        page_size = int(form.get("pageSize", 30))
+        items = self.announcements
+        if form.get("seDate"):
+            start, end = form["seDate"].split("~")
+            start_ms = datetime.strptime(start, "%Y-%m-%d").timestamp() * 1000
+            end_ms = (datetime.strptime(end, "%Y-%m-%d") + timedelta(days=1)).timestamp() * 1000
+            items = [item for item in items if start_ms <= item["announcementTime"] < end_ms]
+        total_pages = -(-len(items) // page_size)
+        return {
+            "totalAnnouncement": len(items),
+            "totalRecordNum": len(items),
+            "announcements": items[(page_num - 1) * page_size:page_num * page_size] or None,
+            "hasMore": page_num < total_pages,
+            "totalpages": total_pages,
+        }
+
+    def pdf(self, announcement_id):
+        """
+        生成（并缓存）公告对应的 PDF，内容由 announcementId 决定
+        """
+        with self._lock:
+            if announcement_id not in self._pdfs:
+                item = self.by_id[announcement_id]
+                pages = max(1, item["adjunctSize"] // KB_PER_PAGE)
+                self._pdfs[announcement_id] = make_pdf([
+                    [f"Announcement {announcement_id} page {page + 1} line {line} lorem ipsum dolor sit amet" for line in range(40)]
+                    for page in range(pages)
+                ])
+            return self._pdfs[announcement_id]
+
+
+def make_handler(site):
+    class Handler(BaseHTTPRequestHandler):
+        def send_bytes(self, body, content_type, status=200, headers=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if urlparse(self.path).path != "/new/hisAnnouncement/query":
+                self.send_bytes(b"not found", "text/plain", 404)
+                return
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+            form = {key: values[0] for key, values in parse_qs(body).items()}
+            site.requests["query"] += 1
+            time.sleep(site.latency)
+            self.send_bytes(json.dumps(site.query(form), ensure_ascii=False).encode("utf-8"), "application/json;charset=UTF-8")
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/new/disclosure/detail":
+                announcement_id = parse_qs(url.query).get("announcementId", [""])[0]
+            elif url.path.startswith("/finalpage/"):
+                announcement_id = Path(url.path).stem
+            else:
+                announcement_id = None
+            if announcement_id not in site.by_id:
+                self.send_bytes(b"not found", "text/plain", 404)
+                return
+
+            site.requests["pdf"] += 1
+            time.sleep(site.latency)
+            body = site.pdf(announcement_id)
+            # 支持 Range 续传
+            range_header = self.headers.get("Range")
+            if range_header and range_header.startswith("bytes="):
+                start = int(range_header[6:].split("-")[0] or 0)
+                if start >= len(body):
+                    self.send_bytes(b"", "application/pdf", 416, {"Content-Range": f"bytes */{len(body)}"})
+                    return
+                self.send_bytes(body[start:], "application/pdf", 206, {"Content-Range": f"bytes {start}-{len(body) - 1}/{len(body)}"})
+                return
+            self.send_bytes(body, "application/pdf")
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_server(site, port=0):
+    """
+    在后台线程中启动回放服务器，返回 (服务器, 地址)
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(site))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8800
+    server, base_url = start_server(FixtureSite(), port)
+    print(f"回放服务器已启动: {base_url}（CNINFO_API_BASE={base_url}）")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
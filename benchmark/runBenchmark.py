@@ -0,0 +1,191 @@
+import os
+import io
+import sys
+import json
+import time
+import asyncio
+import argparse
+import resource
+import tempfile
+import contextlib
+from pathlib import Path
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from fixtureServer import FixtureSite, start_server
+
+# 端到端基准测试：启动本地回放服务器，依次运行 列表 → 下载 → 解析 → 分析（模拟提供商）四个阶段，
+# 输出总耗时、吞吐量、峰值内存和各阶段耗时（JSON）；指定 --baseline 时与之前的结果比较，超过阈值返回非 0：
+#   python benchmark/runBenchmark.py --output benchmark/result.json
+#   python benchmark/runBenchmark.py --baseline benchmark/result.json --threshold 0.2
+TARGET_URL = "https://www.cninfo.com.cn/new/disclosure/stock?stockCode=002031&orgId=gssz0002031"
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    # Linux 下 ru_maxrss 的单位为 KB
+    return round(resource.getrusage(who).ru_maxrss / 1024, 1)
+
+
+@contextlib.contextmanager
+def quiet(enabled):
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        yield
+
+
+class Stages:
+    """
+    记录每个阶段的耗时和统计信息
+    """
+
+    def __init__(self):
+        self.results = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        stats = {}
+        start = time.perf_counter()
+        yield stats
+        stats["seconds"] = round(time.perf_counter() - start, 3)
+        if stats.get("items"):
+            stats["items_per_second"] = round(stats["items"] / stats["seconds"], 2) if stats["seconds"] else None
+        self.results[name] = stats
+
+
+async def run_pipeline(args, base_url, stages, inputJson, getPdfFiles, pdfText, callLLM):
+    with stages.stage("listing") as stats:
+        records = await inputJson.fetch_listing_api(TARGET_URL, args.start_date, args.end_date)
+        stats["items"] = len(records)
+        stats["pages"] = -(-len(records) // inputJson.API_PAGE_SIZE)
+
+    with stages.stage("download") as stats:
+        # 详情链接指向真实站点，替换为回放服务器地址
+        hrefs = [record["href"].replace(inputJson.BASE, base_url) for record in records]
+        limits = httpx.Limits(max_connections=args.download_concurrency, max_keepalive_connections=args.download_concurrency)
+        async with httpx.AsyncClient(timeout=60, limits=limits) as client:
+            downloaded = await getPdfFiles.download_all(
+                client, [record["title"] for record in records], hrefs, concurrency=args.download_concurrency, rate_limit=0
+            )
+        paths = [Path(path) for path, _ in downloaded if path]
+        stats["items"] = len(paths)
+        stats["failed"] = len(downloaded) - len(paths)
+        stats["bytes"] = sum(path.stat().st_size for path in paths)
+
+    stats = stages.results["download"]
+    stats["mb_per_second"] = round(stats["bytes"] / 1024 / 1024 / stats["seconds"], 2) if stats["seconds"] else None
+
+    with stages.stage("parse") as stats:
+        pages = 0
+        for path in paths:
+            _, text_stats = pdfText.extract_text(path)
+            pages += text_stats["pages"]
+        stats["items"] = len(paths)
+        stats["pages"] = pages
+
+    with stages.stage("analyze") as stats:
+        results = callLLM.analyze_pdf_files(paths, concurrency=args.llm_concurrency)
+        stats["items"] = len(results)
+        stats["failed"] = sum(1 for result in results.values() if not result)
+    return len(records)
+
+
+def compare(report, baseline, threshold):
+    """
+    与基准结果比较各阶段和总耗时，返回变慢超过阈值的项目
+    """
+    regressions = []
+    pairs = [("total", report["wall_seconds"], baseline.get("wall_seconds"))]
+    pairs += [(name, stats["seconds"], baseline.get("stages", {}).get(name, {}).get("seconds")) for name, stats in report["stages"].items()]
+    for name, current, previous in pairs:
+        if previous and current > previous * (1 + threshold):
+            regressions.append({"stage": name, "seconds": current, "baseline_seconds": previous, "change": round(current / previous - 1, 3)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端基准测试（本地回放服务器 + 模拟提供商）")
+    parser.add_argument("--copies", type=int, default=3, help="录制的公告列表复制份数（每份 20 条）")
+    parser.add_argument("--start-date", default="2024-01-01")
+    parser.add_argument("--end-date", default="2025-12-31")
+    parser.add_argument("--server-latency", type=float, default=0.0, help="回放服务器每个请求的延迟（秒）")
+    parser.add_argument("--download-concurrency", type=int, default=4)
+    parser.add_argument("--llm-concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="模拟提供商的平均响应时间（秒）")
+    parser.add_argument("--output", help="把 JSON 报告写入文件")
+    parser.add_argument("--baseline", help="与之前的 JSON 报告比较")
+    parser.add_argument("--threshold", type=float, default=0.2, help="耗时增加超过该比例视为退化")
+    parser.add_argument("--verbose", action="store_true", help="显示各阶段的日志输出")
+    args = parser.parse_args()
+    # 之后会切换到临时目录，先把文件路径转为绝对路径
+    output = Path(args.output).resolve() if args.output else None
+    baseline_path = Path(args.baseline).resolve() if args.baseline else None
+
+    site = FixtureSite(copies=args.copies, latency=args.server_latency)
+    server, base_url = start_server(site)
+
+    # 模块级配置在导入各阶段模块之前设置，所有状态文件写入临时目录
+    workdir = Path(tempfile.mkdtemp(prefix="benchmark_"))
+    os.environ.update({
+        "CNINFO_API_BASE": base_url,
+        "LLM_PROVIDER": "mock",
+        "LLM_CACHE": "0",
+        # 回放的 PDF 内容由同一模板生成，关闭近似重复检测，保证每个公告都调用一次提供商
+        "LLM_DEDUP": "0",
+        "MOCK_LLM_LATENCY": str(args.llm_latency),
+        "MANIFEST_PATH": str(workdir / "manifest.db"),
+        "PDF_STORE_DIR": str(workdir / "pdf_store"),
+        "PDF_TEXT_CACHE_DIR": str(workdir / "text"),
+    })
+    os.chdir(workdir)
+    import_start = time.perf_counter()
+    import inputJson
+    import getPdfFiles
+    import pdfText
+    import callLLM
+    import metrics
+    import_seconds = time.perf_counter() - import_start
+
+    stages = Stages()
+    start = time.perf_counter()
+    with quiet(not args.verbose):
+        announcements = asyncio.run(run_pipeline(args, base_url, stages, inputJson, getPdfFiles, pdfText, callLLM))
+    wall = time.perf_counter() - start
+    server.shutdown()
+    # 关闭解析进程池，使子进程的峰值内存计入统计
+    if pdfText._pool is not None:
+        pdfText._pool.shutdown()
+
+    report = {
+        "announcements": announcements,
+        "wall_seconds": round(wall, 3),
+        "announcements_per_second": round(announcements / wall, 2) if wall else None,
+        "import_seconds": round(import_seconds, 3),
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_rss_children_mb": peak_rss_mb(resource.RUSAGE_CHILDREN),
+        "server_requests": site.requests,
+        "stages": stages.results,
+        # 各模块自身记录的细分耗时（每页、每次下载、每次 LLM 请求）和 token 用量
+        "metrics": metrics.summary(),
+        "settings": vars(args),
+        "workdir": str(workdir),
+    }
+
+    exit_code = 0
+    if baseline_path:
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+        report["regressions"] = compare(report, baseline, args.threshold)
+        exit_code = 1 if report["regressions"] else 0
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if output:
+        output.write_text(text, encoding="utf-8")
+    print(text)
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import contextlib
+from pathlib import Path
+from urllib.parse import urlparse
+from dotenv import load_dotenv
+from stagehand import Stagehand, StagehandConfig
+import metrics
+
+load_dotenv()
+
+# 共享的浏览器会话：inputJson.py 和 getPdfFiles.py 通过 open_session() 使用同一套配置，
+# 屏蔽图片、字体等不需要的资源，并把 cookies 和 User-Agent 保存到文件供之后的阶段和运行复用
+ROOT = Path(__file__).resolve().parent
+# 设置 STAGEHAND_DEBUG=1 时输出详细日志并开启 DOM 调试，默认关闭
+STAGEHAND_DEBUG = os.getenv("STAGEHAND_DEBUG", "0") == "1"
+# 已启动的浏览器的 CDP 地址（python browserSession.py serve 启动）；设置后直接连接，不再每次启动浏览器
+BROWSER_CDP_URL = os.getenv("BROWSER_CDP_URL")
+BROWSER_CDP_PORT = int(os.getenv("BROWSER_CDP_PORT", "9222"))
+# 屏蔽的资源类型（Playwright 的 resource_type），为空表示不屏蔽
+BROWSER_BLOCK_RESOURCES = {t.strip() for t in os.getenv("BROWSER_BLOCK_RESOURCES", "image,font,media").split(",") if t.strip()}
+# 屏蔽的统计、广告域名（匹配域名结尾）
+BROWSER_BLOCK_HOSTS = tuple(h.strip() for h in os.getenv(
+    "BROWSER_BLOCK_HOSTS", "hm.baidu.com,cnzz.com,google-analytics.com,googletagmanager.com,doubleclick.net"
+).split(",") if h.strip())
+# cookies、localStorage 和 User-Agent 的保存位置及有效期（秒）
+BROWSER_STATE_PATH = Path(os.getenv("BROWSER_STATE_PATH", ROOT / "cache" / "browser_state.json"))
+BROWSER_STATE_TTL = float(os.getenv("BROWSER_STATE_TTL", "3600"))
+
+
+def make_config(model_name=None, model_api_key=None):
+    """
+    构造 Stagehand 配置：连接已启动的浏览器或启动新的无头浏览器，调试输出按 STAGEHAND_DEBUG 开关
+    """
+    launch_options = {"cdp_url": BROWSER_CDP_URL} if BROWSER_CDP_URL else {"headless": True}
+    return StagehandConfig(
+        env="LOCAL",
+        model_name=model_name,
+        model_api_key=model_api_key,
+        local_browser_launch_options=launch_options,
+        verbose=3 if STAGEHAND_DEBUG else 0,
+        debug_dom=STAGEHAND_DEBUG,
+    )
+
+
+def load_state(max_age=None):
+    """
+    读取保存的会话状态；超过有效期或不存在时返回 None
+    """
+    try:
+        state = json.loads(BROWSER_STATE_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    max_age = BROWSER_STATE_TTL if max_age is None else max_age
+    if time.time() - state.get("savedAt", 0) > max_age:
+        return None
+    return state
+
+
+async def save_state(context, page):
+    """
+    保存浏览器上下文的 cookies、localStorage 和 User-Agent（先写临时文件再替换）
+    """
+    state = await context.storage_state()
+    state["userAgent"] = await page.evaluate("navigator.userAgent")
+    state["savedAt"] = time.time()
+    BROWSER_STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = BROWSER_STATE_PATH.with_suffix(f".{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_path, BROWSER_STATE_PATH)
+
+
+async def block_resources(route):
+    request = route.request
+    host = urlparse(request.url).hostname or ""
+    if request.resource_type in BROWSER_BLOCK_RESOURCES or host.endswith(BROWSER_BLOCK_HOSTS):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+@contextlib.asynccontextmanager
+async def open_session(model_name=None, model_api_key=None):
+    """
+    打开一个浏览器会话：恢复保存的 cookies、屏蔽不需要的资源，退出时保存会话状态并关闭
+    （连接的是常驻浏览器时只断开连接，浏览器保持运行）
+    """
+    sh = Stagehand(make_config(model_name, model_api_key))
+    with metrics.timer("browser_launch", warm=bool(BROWSER_CDP_URL)):
+        await sh.init()
+    context = sh.page.context
+    state = load_state(max_age=float("inf"))
+    if state and state.get("cookies"):
+        await context.add_cookies(state["cookies"])
+    if BROWSER_BLOCK_RESOURCES or BROWSER_BLOCK_HOSTS:
+        await context.route("**/*", block_resources)
+    try:
+        yield sh
+        await save_state(context, sh.page)
+    finally:
+        with contextlib.suppress(Exception):
+            await context.unroute("**/*", block_resources)
+        await sh.close()
+
+
+async def serve(port=BROWSER_CDP_PORT):
+    """
+    启动常驻的无头浏览器并开放 CDP 端口，各阶段设置 BROWSER_CDP_URL 后直接连接
+    """
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as p:
+        # 通过 CDP 连接的各阶段共用浏览器的默认上下文（其中的 cookies 在连接之间保留）
+        browser = await p.chromium.launch(headless=True, args=[f"--remote-debugging-port={port}"])
+        print(f"🌐 浏览器已启动，设置 BROWSER_CDP_URL=http://127.0.0.1:{port} 后各阶段将直接连接", flush=True)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await browser.close()
+
+
+if __name__ == "__main__":
+    # python browserSession.py serve [端口]   启动常驻浏览器
+    command = sys.argv[1] if len(sys.argv) > 1 else "serve"
+    if command == "serve":
+        asyncio.run(serve(int(sys.argv[2]) if len(sys.argv) > 2 else BROWSER_CDP_PORT))
+    else:
+        print(f"未知命令: {command}")
+        sys.exit(1)
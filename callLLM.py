@@ -1,41 +1,218 @@
 import os
 import json
 import sys
+import time
+import random
+import threading
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from dotenv import load_dotenv
-import google.generativeai as genai
-from PyPDF2 import PdfReader
-from openai import OpenAI
+import manifest
+import llmCache
+import pdfText
+import textCleaner
+import docChunker
+import metrics
+import triage
+import dedup
+import taskScheduler
+from llmProviders import get_provider, is_rate_limit_error
 
 # 加载 .env 中的 API Keys
 load_dotenv()
 
-# 配置 API Keys
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
+# 配置并发分析：全局默认并发数，可按提供商单独覆盖；每分钟 token 预算为 0 表示不限制
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_TOKENS_PER_PAGE = int(os.getenv("LLM_TOKENS_PER_PAGE", "1000"))
 
-# 配置模型名称
-GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-2.0-flash")
-DEEPSEEK_MODEL_NAME = os.getenv("DEEPSEEK_MODEL_NAME", "deepseek-chat")
+# 大文件分块分析：估算 token 数超过阈值时按章节切块并发分析，再合并结果
+LLM_CHUNK_THRESHOLD_TOKENS = int(os.getenv("LLM_CHUNK_THRESHOLD_TOKENS", "48000"))
+LLM_CHUNK_TOKENS = int(os.getenv("LLM_CHUNK_TOKENS", "12000"))
+LLM_MAP_CONCURRENCY = int(os.getenv("LLM_MAP_CONCURRENCY", "4"))
 
-# 配置 Gemini
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+# 流式输出：生成的内容边接收边写入 data/<文件名>.md.part 并以 llm_delta 事件推送到前端，完成后改名为 .md
+LLM_STREAM = os.getenv("LLM_STREAM", "1") == "1"
+# 两次 llm_delta 事件之间的最小间隔（秒），避免逐 token 刷屏；第一段内容总是立即推送
+LLM_STREAM_EVENT_INTERVAL = float(os.getenv("LLM_STREAM_EVENT_INTERVAL", "0.2"))
+
+SYSTEM_PROMPT = "你是一位专业的文档分析助手，请仔细分析用户提供的文档内容并按要求格式回答。"
+
+# 分析结果的输出格式
+OUTPUT_FORMAT = "## 公告编号\n[文档内的公告编号] \n\n## 公告日期\n[文档最后的一行的日期]  \n\n## 文档摘要\n[文档的核心内容摘要]\n\n## 关键信息\n- [要点1]\n- [要点2]\n- [要点3]\n\n## 详细内容\n[文档的详细分析]"
 
 def get_llm_provider():
     """
-    从环境变量获取LLM提供商设置，如果没有设置则默认使用Gemini
+    从环境变量获取LLM提供商设置，如果没有设置则默认使用Gemini（可选的提供商见 llmProviders.PROVIDERS）
     """
     return os.getenv("LLM_PROVIDER", "gemini").lower()
 
-def call_gemini_analyze_pdf(pdf_path):
+def load_request_content():
     """
-    调用 Gemini 分析 PDF 文档
+    读取 config.json 中的请求内容，target_url 不符合要求时返回 None
+    """
+    config_path = Path("config.json")
+    if config_path.exists():
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config_data = json.load(f)
+            # 验证target_url是否以https://www.cninfo.com.cn开头
+            target_url = config_data.get("target_url", "")
+            if not target_url.startswith('https://www.cninfo.com.cn'):
+                print("错误: 本项目能够处理的target_url是受限的，目前仅能处理针对https://www.cninfo.com.cn网站的请求")
+                return None
+            # 默认请求内容
+            return config_data.get("require", "请分析此文档并提取关键内容。")
+    # 如果没有 config.json，则使用默认请求内容
+    return "请分析此文档并提取关键内容。"
+
+def load_analyze_types():
+    """
+    读取 config.json 中需要完整分析的公告类型（快速分拣模式使用），未设置时返回 None（使用 TRIAGE_ANALYZE_TYPES）
+    """
+    config_path = Path("config.json")
+    if config_path.exists():
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get("analyzeTypes") or None
+    return None
+
+def load_type_priority():
+    """
+    读取 config.json 中各公告类型的优先级（priority 调度策略使用），数字越大越先分析，未设置的类型为 0
+    """
+    config_path = Path("config.json")
+    if config_path.exists():
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get("typePriority") or {}
+    return {}
+
+def get_output_path(pdf_path):
+    return Path("./data") / (Path(pdf_path).stem + ".md")
+
+def write_streamed_output(pdf_path, pieces):
+    """
+    边接收边写入 .md.part 文件并推送 llm_delta 事件，全部接收完成后改名为 .md 并返回完整文本；
+    中途中断时已生成的内容保留在 .md.part 中
+    """
+    output_path = get_output_path(pdf_path)
+    part_path = output_path.with_name(output_path.name + ".part")
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    name = Path(pdf_path).name
+    received = []
+    pending = []
+    chars = 0
+    start = time.monotonic()
+    first_seconds = None
+    last_emit = 0.0
+
+    with open(part_path, 'w', encoding='utf-8') as f:
+        for piece in pieces:
+            if not piece:
+                continue
+            f.write(piece)
+            f.flush()
+            received.append(piece)
+            pending.append(piece)
+            chars += len(piece)
+            now = time.monotonic()
+            if first_seconds is None:
+                first_seconds = now - start
+            if len(received) == 1 or now - last_emit >= LLM_STREAM_EVENT_INTERVAL:
+                emit_event("llm_delta", file=name, text="".join(pending), chars=chars)
+                pending = []
+                last_emit = now
+        if pending:
+            emit_event("llm_delta", file=name, text="".join(pending), chars=chars)
+
+    text = "".join(received)
+    if not text:
+        part_path.unlink(missing_ok=True)
+        return text
+    os.replace(part_path, output_path)
+    metrics.observe("llm_first_token", first_seconds, labels={"provider": get_llm_provider()}, file=name)
+    emit_event(
+        "llm_stream_end",
+        file=name,
+        chars=chars,
+        first_token_seconds=round(first_seconds, 2),
+        seconds=round(time.monotonic() - start, 2),
+    )
+    return text
+
+def map_reduce_analyze(pdf_path, request_content, text_content, provider):
+    """
+    大文件分块分析：先并发分析每一块（map），再把各块结果合并为统一格式（reduce）
+    """
+    chunks, stats = docChunker.chunk_text(text_content, LLM_CHUNK_TOKENS)
+    print(f"📚 文档约 {stats['total_tokens']} tokens，按章节切分为 {stats['chunks']} 块并发分析")
+    emit_event("chunk_stats", file=Path(pdf_path).name, **stats)
+
+    def analyze_chunk(index, chunk):
+        prompt = (
+            f"{request_content}\n\n以下是一份公告的第 {index + 1}/{len(chunks)} 部分:\n{chunk}\n\n"
+            "请提取这一部分中的公告编号、公告日期（如有）、关键信息和重要细节，使用简洁的 Markdown 列表返回。"
+        )
+        return provider.chat(SYSTEM_PROMPT, prompt, retries=LLM_MAX_RETRIES)
+
+    map_start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, LLM_MAP_CONCURRENCY)) as executor:
+        partials = list(executor.map(analyze_chunk, range(len(chunks)), chunks))
+    map_seconds = time.monotonic() - map_start
+
+    merged = "\n\n".join(f"### 第 {i + 1} 部分\n{partial}" for i, partial in enumerate(partials))
+    prompt = (
+        f"{request_content}\n\n一份公告被分成 {len(chunks)} 部分分别分析，各部分的分析结果如下:\n{merged}\n\n"
+        f"请综合所有部分，按以下格式返回整份文档的分析结果：\n\n{OUTPUT_FORMAT}"
+    )
+    reduce_start = time.monotonic()
+    result_text = write_streamed_output(pdf_path, provider.generate(SYSTEM_PROMPT, prompt, retries=LLM_MAX_RETRIES, stream=LLM_STREAM))
+    emit_event(
+        "chunk_done",
+        file=Path(pdf_path).name,
+        chunks=len(chunks),
+        map_seconds=round(map_seconds, 2),
+        reduce_seconds=round(time.monotonic() - reduce_start, 2),
+        reduce_prompt_tokens=docChunker.estimate_tokens(prompt),
+    )
+    return result_text
+
+def build_text_prompt(request_content, text_content):
+    return f"{request_content}\n\n文档内容如下:\n{text_content}\n\n请分析文档并按以下格式返回结果：\n\n{OUTPUT_FORMAT}"
+
+def read_pdf_text(pdf_path):
+    """
+    读取 PDF 文本（逐页解析，大文件多进程并行，结果按内容哈希缓存），
+    去掉页眉页脚和固定声明文字（PROMPT_CLEAN=1），未提取到文本时返回提示文字
+    """
+    print("正在读取PDF文件内容...")
+    with metrics.timer("pdf_parse", file=Path(pdf_path).name) as m:
+        text_content, text_stats = pdfText.extract_text(pdf_path)
+        m.update(pages=text_stats["pages"], cached=text_stats.get("cached", False))
+    print(pdfText.describe_stats(text_stats))
+
+    if textCleaner.PROMPT_CLEAN and text_content.strip():
+        text_content, clean_stats = textCleaner.clean_text(text_content)
+        metrics.count("prompt_tokens_raw", clean_stats["tokens_before"])
+        metrics.count("prompt_tokens_clean", clean_stats["tokens_after"])
+        emit_event("text_clean", file=Path(pdf_path).name, **clean_stats)
+        print(f"🧹 清理页眉页脚和模板文字: {clean_stats['tokens_before']} → {clean_stats['tokens_after']} tokens（减少 {clean_stats['reduction']:.0%}）")
+    else:
+        # 不清理时发送原始文本，分页符只在清理时使用
+        text_content = pdfText.join_pages(text_content)
+    
+    # 如果PDF内容为空，给出提示
+    if not text_content.strip():
+        print("⚠️ 注意: PDF文件中未提取到文本内容，可能是扫描版PDF")
+        text_content = "[无法从PDF中提取文本内容，可能是扫描版PDF]"
+    return text_content
+
+def analyze_with_provider(pdf_path, provider):
+    """
+    调用指定提供商分析 PDF 文档：能直接接收 PDF 的提供商上传文件，其余提供商先提取文本，
+    超出单次上下文预算的大文件按章节切块分析
     """
     try:
         # 确保pdf_path是Path对象
-        if isinstance(pdf_path, str):
-            pdf_path = Path(pdf_path)
+        pdf_path = Path(pdf_path)
             
         # 检查 PDF 文件是否存在
         if not pdf_path.exists():
@@ -43,190 +220,450 @@ def call_gemini_analyze_pdf(pdf_path):
             return
         
         # 读取 config.json 获取请求内容和验证target_url
-        config_path = Path("config.json")
-        if config_path.exists():
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
-                # 验证target_url是否以https://www.cninfo.com.cn开头
-                target_url = config_data.get("target_url", "")
-                if not target_url.startswith('https://www.cninfo.com.cn'):
-                    print("错误: 本项目能够处理的target_url是受限的，目前仅能处理针对https://www.cninfo.com.cn网站的请求")
-                    return
-                # 默认请求内容
-                request_content = config_data.get("require", "请分析此文档并提取关键内容。")
+        request_content = load_request_content()
+        if request_content is None:
+            return
+
+        if provider.accepts_pdf:
+            prompt = f"{request_content}\n\n请分析附件中的 PDF 文档并按以下格式返回结果：\n\n{OUTPUT_FORMAT}"
+            print(f"正在调用 {provider.model_name} 分析文档...")
+            with metrics.timer("llm_request", labels={"provider": provider.name}, file=pdf_path.name):
+                pieces = provider.generate_pdf(prompt, pdf_path, stream=LLM_STREAM)
+                result_text = write_streamed_output(pdf_path, pieces)
         else:
-            # 如果没有 config.json，则使用默认请求内容
-            request_content = "请分析此文档并提取关键内容。"
-        
-        # 读取 PDF 文件
-        pdf_data = pdf_path.read_bytes()
-        
-        # 创建 Gemini 模型实例
-        model = genai.GenerativeModel(GEMINI_MODEL_NAME)
-        
-        # 创建文件上传对象
-        pdf_file = genai.upload_file(path=pdf_path, display_name="Analysis Document")
-        
-        # 等待文件处理完成
-        print("正在上传和处理 PDF 文件...")
-        import time
-        while pdf_file.state.name == "PROCESSING":
-            print(".", end="", flush=True)
-            time.sleep(10)
-            pdf_file = genai.get_file(pdf_file.name)
-        
-        if pdf_file.state.name == "FAILED":
-            raise ValueError("PDF 文件处理失败")
+            # 读取PDF文件内容
+            text_content = read_pdf_text(pdf_path)
+            with metrics.timer("llm_request", labels={"provider": provider.name}, file=pdf_path.name) as m:
+                if docChunker.estimate_tokens(text_content) > LLM_CHUNK_THRESHOLD_TOKENS:
+                    m["chunked"] = True
+                    result_text = map_reduce_analyze(pdf_path, request_content, text_content, provider)
+                else:
+                    prompt = build_text_prompt(request_content, text_content)
+                    # 流式接收，边生成边写入 Markdown 文件
+                    print(f"正在调用 {provider.model_name} 分析文档...")
+                    result_text = write_streamed_output(pdf_path, provider.generate(SYSTEM_PROMPT, prompt, stream=LLM_STREAM))
         
-        print("\n✅ PDF 文件上传完成")
-        
-        # 构建提示内容
-        prompt = f"{request_content}\n\n请分析附件中的 PDF 文档并按以下格式返回结果：\n\n## 公告编号\n[文档内的公告编号] \n\n## 公告日期\n[文档最后的一行的日期]  \n\n## 文档摘要\n[文档的核心内容摘要]\n\n## 关键信息\n- [要点1]\n- [要点2]\n- [要点3]\n\n## 详细内容\n[文档的详细分析]"
-        
-        # 调用 Gemini 生成内容
-        print(f"正在调用 {GEMINI_MODEL_NAME} 分析文档...")
-        response = model.generate_content([prompt, pdf_file])
+        if not result_text:
+            print(f"❌ {provider.name} 返回空响应")
+            return
         
-        # 格式化为 Markdown 并保存
-        if response.text:
-            # 生成输出文件路径
-            output_filename = pdf_path.stem + ".md"
-            output_path = Path("./data") / output_filename
-            
-            # 确保data目录存在
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            # 写入 Markdown 文件
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(response.text)
-            
-            print(f"✅ 分析完成，结果已保存到: {output_path}")
-            print(f"\n{response.text}")
-        else:
-            print("❌ Gemini 返回空响应")
+        print(f"✅ 分析完成，结果已保存到: {get_output_path(pdf_path)}")
+        print(f"\n{result_text}")
+        return result_text
             
     except Exception as e:
+        # 限流错误交给调度器退避重试
+        if is_rate_limit_error(e):
+            raise
         print(f"❌ 处理过程中发生错误: {str(e)}")
         import traceback
         traceback.print_exc()
 
+def call_gemini_analyze_pdf(pdf_path):
+    """
+    调用 Gemini 分析 PDF 文档
+    """
+    return analyze_with_provider(pdf_path, get_provider("gemini"))
+
 def call_deepseek_analyze_pdf(pdf_path):
     """
     调用 DeepSeek 分析 PDF 文档
     """
+    return analyze_with_provider(pdf_path, get_provider("deepseek"))
+
+def call_llm_analyze_pdf(pdf_path, force=False):
+    """
+    根据环境变量选择的LLM提供商调用相应的分析函数，force 为 True 时忽略清单中已有的结果
+    """
+    llm_provider = get_llm_provider()
+    provider = get_provider(llm_provider)
+    if provider is None:
+        print(f"❌ 不支持的 LLM 提供商: {llm_provider}")
+        return
+    if not provider.is_configured():
+        print(f"❌ 未配置 {provider.api_key_env}")
+        return
+
+    return cached_analysis(pdf_path, lambda: analyze_with_provider(pdf_path, provider), force)
+
+def cached_analysis(pdf_path, analyze, force=False):
+    """
+    相同内容、相同提示词和模型已分析过且结果缓存中仍有时，直接复用；
+    否则调用 analyze() 得到结果，并记入清单和结果缓存
+    """
+    # 设置 PIPELINE_FORCE=1（全量刷新）时同样忽略结果缓存
+    force = force or manifest.FORCE
+    llm_provider = get_llm_provider()
+    provider = get_provider(llm_provider)
+    pdf_path = Path(pdf_path)
+    request_content = load_request_content()
+    if provider is None or request_content is None or not pdf_path.exists():
+        return analyze()
+
+    model_name = provider.model_name
+    sha256 = pdfText.file_sha256(pdf_path)
+    key = manifest.analysis_key(request_content, llm_provider, model_name)
+    cache_key = llmCache.make_key(sha256, request_content, llm_provider, model_name)
+    output_path = get_output_path(pdf_path)
+    # 复用结果只经过结果缓存，LLM_CACHE=0、过期和淘汰同样适用；清单只记录分析状态
+    result = None if force else llmCache.get(cache_key)
+    if result:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path.write_text(result, encoding='utf-8')
+        manifest.record_analysis(sha256, key, output_path, result)
+        print(f"⏭️ 已分析过相同内容，跳过: {pdf_path.name}")
+        return result
+
+    result = analyze()
+    manifest.record_analysis(sha256, key, output_path, result)
+    llmCache.put(cache_key, result, llm_provider, model_name)
+    return result
+
+def call_gemini_analyze_pdf_test(pdf_path):
+    print("正在上传和处理 PDF 文件...")
+    print(f"'{pdf_path}' 处理完毕！")
+
+# 结构化事件由 metrics 模块统一输出（与计时、计数事件共用同一把输出锁）
+emit_event = metrics.emit
+
+def estimate_tokens(pdf_path):
+    """
+    按页数粗略估算一个 PDF 需要消耗的 token 数
+    """
     try:
-        # 确保pdf_path是Path对象
-        if isinstance(pdf_path, str):
-            pdf_path = Path(pdf_path)
-            
-        # 检查 PDF 文件是否存在
-        if not pdf_path.exists():
-            print(f"❌ 错误: 找不到 PDF 文件 {pdf_path}")
+        return pdfText.page_count(pdf_path) * LLM_TOKENS_PER_PAGE
+    except Exception:
+        return LLM_TOKENS_PER_PAGE
+
+class TokenBudget:
+    """
+    每分钟 token 预算（令牌桶），预算不足时阻塞等待
+    """
+
+    def __init__(self, tokens_per_minute):
+        self.capacity = tokens_per_minute
+        self.available = float(tokens_per_minute)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens):
+        if not self.capacity:
             return
-        
-        # 读取 config.json 获取请求内容和验证target_url
-        config_path = Path("config.json")
-        if config_path.exists():
-            with open(config_path, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
-                # 验证target_url是否以https://www.cninfo.com.cn开头
-                target_url = config_data.get("target_url", "")
-                if not target_url.startswith('https://www.cninfo.com.cn'):
-                    print("错误: 本项目能够处理的target_url是受限的，目前仅能处理针对https://www.cninfo.com.cn网站的请求")
+        # 单个请求超过整分钟预算时，等到桶满即可发出
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.available = min(self.capacity, self.available + (now - self.updated) * self.capacity / 60)
+                self.updated = now
+                if self.available >= tokens:
+                    self.available -= tokens
                     return
-                # 默认请求内容
-                request_content = config_data.get("require", "请分析此文档并提取关键内容。")
+                wait = (tokens - self.available) * 60 / self.capacity
+            time.sleep(wait)
+
+class ProviderScheduler:
+    """
+    单个提供商的并发控制：遇到 429 时并发数减半并指数退避，连续成功后逐步恢复
+    """
+
+    def __init__(self, name, max_concurrency, tokens_per_minute):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self.in_flight = 0
+        self.successes = 0
+        self.backoff = 1.0
+        self.cooldown_until = 0.0
+        self.budget = TokenBudget(tokens_per_minute)
+        self.cond = threading.Condition()
+
+    def acquire(self, tokens):
+        with self.cond:
+            while self.in_flight >= self.limit or time.monotonic() < self.cooldown_until:
+                self.cond.wait(timeout=max(0.05, self.cooldown_until - time.monotonic()))
+            self.in_flight += 1
+        self.budget.acquire(tokens)
+
+    def release(self, rate_limited=False):
+        with self.cond:
+            self.in_flight -= 1
+            if rate_limited:
+                self.limit = max(1, self.limit // 2)
+                self.successes = 0
+                self.cooldown_until = time.monotonic() + self.backoff * (1 + random.random())
+                self.backoff = min(self.backoff * 2, 60.0)
+            else:
+                self.successes += 1
+                self.backoff = 1.0
+                if self.limit < self.max_concurrency and self.successes >= self.limit:
+                    self.limit += 1
+                    self.successes = 0
+            self.cond.notify_all()
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+def get_scheduler(llm_provider, concurrency=None):
+    """
+    获取（或创建）提供商对应的调度器，按 (提供商, 并发数) 缓存；
+    未指定并发数时使用环境变量中按提供商配置的并发数，token 预算同样按提供商配置
+    """
+    prefix = llm_provider.upper()
+    max_concurrency = concurrency or int(os.getenv(f"{prefix}_CONCURRENCY", LLM_CONCURRENCY))
+    key = (llm_provider, max_concurrency)
+    with _schedulers_lock:
+        if key not in _schedulers:
+            tokens_per_minute = int(os.getenv(f"{prefix}_TPM", "0"))
+            _schedulers[key] = ProviderScheduler(llm_provider, max_concurrency, tokens_per_minute)
+        return _schedulers[key]
+
+def reset_schedulers():
+    """
+    丢弃所有调度器（限流后降低的并发数和退避状态），之后的 get_scheduler 重新创建
+    """
+    with _schedulers_lock:
+        _schedulers.clear()
+
+def analyze_with_retry(pdf_path, scheduler, analyze=None):
+    """
+    在调度器的并发和 token 预算内分析一个 PDF，遇到限流时退避后重试
+    """
+    analyze = analyze or call_llm_analyze_pdf
+    tokens = estimate_tokens(pdf_path)
+    for attempt in range(1, LLM_MAX_RETRIES + 1):
+        scheduler.acquire(tokens)
+        try:
+            result = analyze(pdf_path)
+        except Exception as e:
+            if not is_rate_limit_error(e) or attempt == LLM_MAX_RETRIES:
+                scheduler.release()
+                raise
+            scheduler.release(rate_limited=True)
+            metrics.count("llm_rate_limited", labels={"provider": scheduler.name}, file=Path(pdf_path).name)
+            print(f"⚠️ {scheduler.name} 限流，并发数降为 {scheduler.limit}，稍后重试: {Path(pdf_path).name}")
+            continue
+        scheduler.release()
+        return result
+
+def triage_pdf_files(pdf_files):
+    """
+    快速分拣：只解析每个 PDF 的首末页提取元数据，返回 (需要完整分析的文件, {只分拣的文件: 结果})
+    """
+    analyze_types = load_analyze_types()
+    selected, triaged = [], {}
+    start = time.monotonic()
+    for pdf_path in pdf_files:
+        try:
+            meta = triage.triage_pdf(pdf_path)
+        except Exception as e:
+            # 无法分拣的文件按原流程完整分析
+            print(f"分拣文件 {pdf_path} 时出错: {e}")
+            selected.append(pdf_path)
+            continue
+        analyze = triage.should_analyze(meta, analyze_types)
+        metrics.observe("triage", meta["seconds"], labels={"type": meta["type"]})
+        metrics.count("triage_files", labels={"analyze": analyze})
+        emit_event("triage", **meta, analyze=analyze)
+        if analyze:
+            selected.append(pdf_path)
         else:
-            # 如果没有 config.json，则使用默认请求内容
-            request_content = "请分析此文档并提取关键内容。"
+            triaged[pdf_path] = triage.format_markdown(meta)
+            triage.write_outputs(meta, get_output_path(pdf_path))
+            # 按页数估算省下的 token
+            metrics.count("triage_tokens_saved", meta["pages"] * LLM_TOKENS_PER_PAGE)
+    emit_event(
+        "triage_done",
+        total=len(pdf_files),
+        analyze=len(selected),
+        skipped=len(triaged),
+        seconds=round(time.monotonic() - start, 2),
+    )
+    return selected, triaged
 
-        
-        # 读取PDF文件内容
-        print("正在读取PDF文件内容...")
-        reader = PdfReader(pdf_path)
-        text_content = ""
-        for page in reader.pages:
-            text_content += page.extract_text() + "\n"
-        
-        # 如果PDF内容为空，给出提示
-        if not text_content.strip():
-            print("⚠️ 注意: PDF文件中未提取到文本内容，可能是扫描版PDF")
-            text_content = "[无法从PDF中提取文本内容，可能是扫描版PDF]"
-        
-        # 构建提示内容
-        prompt = f"{request_content}\n\n文档内容如下:\n{text_content}\n\n请分析文档并按以下格式返回结果：\n\n## 公告编号\n[文档内的公告编号] \n\n## 公告日期\n[文档最后的一行的日期]  \n\n## 文档摘要\n[文档的核心内容摘要]\n\n## 关键信息\n- [要点1]\n- [要点2]\n- [要点3]\n\n## 详细内容\n[文档的详细分析]"
-        
-        # 配置DeepSeek API客户端
-        client = OpenAI(
-            api_key=DEEPSEEK_API_KEY,
-            base_url="https://api.deepseek.com",
-        )
-        
-        # 调用DeepSeek API
-        print(f"正在调用 {DEEPSEEK_MODEL_NAME} 分析文档...")
-        response = client.chat.completions.create(
-            model=DEEPSEEK_MODEL_NAME,
-            messages=[
-                {"role": "system", "content": "你是一位专业的文档分析助手，请仔细分析用户提供的文档内容并按要求格式回答。"},
-                {"role": "user", "content": prompt}
-            ],
-            stream=False
-        )
-        
-        # 获取API响应结果
-        result_text = response.choices[0].message.content
-        
-        # 生成输出文件路径
-        output_filename = pdf_path.stem + ".md"
-        output_path = Path("./data") / output_filename
-        
-        # 确保data目录存在
+def dedup_pdf_files(pdf_files):
+    """
+    近似重复分组：返回 (代表文件列表, {代表文件: [(重复文件, 相似度, 方式), ...]})
+    """
+    start = time.monotonic()
+    # 直接接收 PDF 的提供商不需要正文，只读取标题相近的文件的正文
+    provider = get_provider(get_llm_provider())
+    groups = dedup.group_files(pdf_files, compare_text=provider is None or not provider.accepts_pdf)
+    duplicates = {representative: members for representative, members in groups if members}
+    for representative, members in duplicates.items():
+        for member, score, mode in members:
+            metrics.count("dedup_files", labels={"mode": mode})
+            print(f"🔗 {member.name} 与 {representative.name} 近似重复（正文相似度 {score}），{'复用结果' if mode == 'link' else '只分析差异'}")
+    emit_event(
+        "dedup",
+        total=len(pdf_files),
+        groups=len(groups),
+        linked=sum(1 for members in duplicates.values() for _, _, mode in members if mode == "link"),
+        diff=sum(1 for members in duplicates.values() for _, _, mode in members if mode == "diff"),
+        seconds=round(time.monotonic() - start, 2),
+    )
+    return [representative for representative, _ in groups], duplicates
+
+def link_result(pdf_path, representative, result, score):
+    """
+    重复文件直接复用代表文件的分析结果，结果开头注明来源，并记入清单和结果缓存
+    """
+    def link():
+        linked = f"> 与《{representative.stem}》内容相同（正文相似度 {score}），复用其分析结果\n\n{result}"
+        output_path = get_output_path(pdf_path)
         output_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # 写入 Markdown 文件
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(result_text)
-        
-        print(f"✅ 分析完成，结果已保存到: {output_path}")
-        print(f"\n{result_text}")
-            
+        output_path.write_text(linked, encoding='utf-8')
+        return linked
+
+    return cached_analysis(pdf_path, link)
+
+def analyze_diff(pdf_path, representative, representative_result):
+    """
+    只把与代表文件的差异和代表文件的分析结果发给大模型，由其修改出本文件的结果；差异过大时完整分析。
+    结果记入清单和结果缓存，重新运行时不再请求
+    """
+    return cached_analysis(pdf_path, lambda: _analyze_diff(Path(pdf_path), representative, representative_result))
+
+def _analyze_diff(pdf_path, representative, representative_result):
+    provider = get_provider(get_llm_provider())
+    try:
+        added, removed = dedup.diff_text(representative, pdf_path)
     except Exception as e:
-        print(f"❌ 处理过程中发生错误: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        print(f"读取文件 {pdf_path} 时出错: {e}")
+        added = removed = []
+    # 没有正文（如扫描版）时无法比较
+    if not added and not removed:
+        print(f"无法比较正文，完整分析: {pdf_path.name}")
+        return analyze_with_provider(pdf_path, provider)
+    diff_content = "新增或修改后的内容:\n" + "\n".join(added) + "\n\n删除或修改前的内容:\n" + "\n".join(removed)
+    if docChunker.estimate_tokens(diff_content) > dedup.DEDUP_DIFF_MAX_TOKENS:
+        print(f"差异内容过多，完整分析: {pdf_path.name}")
+        return analyze_with_provider(pdf_path, provider)
 
+    prompt = (
+        f"本文档与已分析的《{representative.stem}》内容基本相同，以下是该文档的分析结果和两份文档正文的差异。"
+        f"请根据差异修改分析结果（公告编号、公告日期等以本文档为准），按相同格式输出本文档的完整结果。\n\n"
+        f"已有的分析结果:\n{representative_result}\n\n{diff_content}\n\n输出格式：\n\n{OUTPUT_FORMAT}"
+    )
+    print(f"正在调用 {provider.model_name} 分析差异: {pdf_path.name}")
+    with metrics.timer("llm_request", labels={"provider": provider.name}, file=pdf_path.name, diff=True):
+        return write_streamed_output(pdf_path, provider.generate(SYSTEM_PROMPT, prompt, stream=LLM_STREAM))
 
-def call_llm_analyze_pdf(pdf_path):
+def analyze_pdf_files(pdf_files, concurrency=None, analyze=None):
     """
-    根据环境变量选择的LLM提供商调用相应的分析函数
+    并发分析多个 PDF 文件，每个文件完成时输出一条 file_done 事件，返回 {文件: 结果}；
+    快速分拣模式（TRIAGE_MODE=1）下只有需要关注的类型才调用大模型，
+    近似重复的文件（LLM_DEDUP=1）等代表文件完成后复用其结果或只分析差异；
+    分析顺序由 taskScheduler 按页数、文件大小和公告类型优先级决定（SCHEDULE_POLICY）
     """
+    pdf_files = list(dict.fromkeys(Path(p) for p in pdf_files))
     llm_provider = get_llm_provider()
-    
-    if llm_provider == "gemini":
-        if not GEMINI_API_KEY:
-            print("❌ 未配置 GEMINI_API_KEY")
-            return
-        return call_gemini_analyze_pdf(pdf_path)
-    elif llm_provider == "deepseek":
-        if not DEEPSEEK_API_KEY:
-            print("❌ 未配置 DEEPSEEK_API_KEY")
-            return
-        return call_deepseek_analyze_pdf(pdf_path)
-    # ModelScope support has been removed
-    else:
-        print(f"❌ 不支持的 LLM 提供商: {llm_provider}")
-        return
+    scheduler = get_scheduler(llm_provider, concurrency)
+    results = {}
+    start = time.monotonic()
+    # 分拣后只写出元数据的文件同样计入总数和成功数
+    batch_files = pdf_files
+    triaged = {}
+    if triage.TRIAGE_MODE:
+        pdf_files, triaged = triage_pdf_files(pdf_files)
+        results.update(triaged)
+    duplicates = {}
+    if dedup.LLM_DEDUP and len(pdf_files) > 1:
+        pdf_files, duplicates = dedup_pdf_files(pdf_files)
+    modes = {member: mode for members in duplicates.values() for member, _, mode in members}
+    queue = taskScheduler.TaskQueue(type_priority=load_type_priority())
+    for pdf_path in pdf_files:
+        queue.push(pdf_path, analyze=analyze)
+    emit_event(
+        "batch_start", provider=llm_provider, total=len(batch_files), concurrency=scheduler.max_concurrency,
+        policy=queue.policy,
+    )
 
-def call_gemini_analyze_pdf_test(pdf_path):
-    print("正在上传和处理 PDF 文件...")
-    print(f"'{pdf_path}' 处理完毕！")
+    done = 0
+    for pdf_path in triaged:
+        done += 1
+        emit_event(
+            "file_done", file=pdf_path.name, status="ok", error=None, seconds=0,
+            done=done, total=len(batch_files), triage=True,
+        )
+
+    def run(pdf_path, analyze=analyze):
+        file_start = time.monotonic()
+        try:
+            result = analyze_with_retry(pdf_path, scheduler, analyze)
+            return result, None, time.monotonic() - file_start
+        except Exception as e:
+            return None, e, time.monotonic() - file_start
+
+    with ThreadPoolExecutor(max_workers=scheduler.max_concurrency) as executor:
+        pending = {}
+
+        def submit_ready():
+            # 只提交可以立即执行的数量，其余留在队列中，下一个执行的文件在有空位时才选出
+            while len(pending) < scheduler.max_concurrency:
+                item = queue.pop()
+                if item is None:
+                    return
+                pdf_path, waited, info = item
+                metrics.observe("queue_wait", waited, labels={"policy": queue.policy}, file=pdf_path.name)
+                pending[executor.submit(run, pdf_path, info["extra"]["analyze"])] = pdf_path
 
-def process_pdf_files(directory_path):
+        submit_ready()
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                pdf_path = pending.pop(future)
+                result, error, elapsed = future.result()
+                results[pdf_path] = result
+                done += 1
+                if error:
+                    print(f"处理文件 {pdf_path} 时出错: {error}")
+                else:
+                    print(f"已处理文件: {pdf_path}")
+                emit_event(
+                    "file_done",
+                    file=pdf_path.name,
+                    status="ok" if result else "failed",
+                    error=str(error) if error else None,
+                    seconds=round(elapsed, 2),
+                    done=done,
+                    total=len(batch_files),
+                    dedup=modes.get(pdf_path),
+                )
+
+                # 代表文件完成后处理与它近似重复的文件；代表文件失败时各自完整分析
+                for member, score, mode in duplicates.get(pdf_path, []):
+                    if result and mode == "link":
+                        results[member] = link_result(member, pdf_path, result, score)
+                        done += 1
+                        emit_event(
+                            "file_done", file=member.name, status="ok", error=None, seconds=0,
+                            done=done, total=len(batch_files), dedup=mode,
+                        )
+                    elif result:
+                        analyze_member = lambda p, representative=pdf_path, r=result: analyze_diff(p, representative, r)
+                        queue.push(member, analyze=analyze_member)
+                    else:
+                        queue.push(member, analyze=analyze)
+            submit_ready()
+
+    emit_event(
+        "batch_end",
+        total=len(batch_files),
+        ok=sum(1 for pdf_path in batch_files if results.get(pdf_path)),
+        seconds=round(time.monotonic() - start, 2),
+        cache=llmCache.stats(),
+    )
+    metrics.emit_summary("callLLM.py")
+    return results
+
+def process_pdf_files(directory_path, concurrency=None):
     """
-    处理指定目录下的所有PDF文件，调用call_llm_analyze_pdf函数。
+    处理指定目录下的所有PDF文件，并发调用call_llm_analyze_pdf函数。
 
     参数:
     directory_path (str): 包含PDF文件的目录路径
+    concurrency (int): 并发数，默认按提供商配置
     """
     # 将目录路径转换为Path对象
     dir_path = Path(directory_path)
@@ -243,26 +680,20 @@ def process_pdf_files(directory_path):
         print(f"在目录 {directory_path} 中没有找到PDF文件")
         return
 
-    # 遍历每个PDF文件并调用函数
-    for pdf_file in pdf_files:
-        try:
-            # 调用函数处理PDF文件
-            call_llm_analyze_pdf(pdf_file)
-            print(f"已处理文件: {pdf_file}")
-        except Exception as e:
-            print(f"处理文件 {pdf_file} 时出错: {e}")
+    return analyze_pdf_files(pdf_files, concurrency)
 
-def main(pdf_file_path=None):
+def main(*pdf_file_paths):
     """
-    主函数，用于处理单个PDF文件
+    主函数，用于处理一个或多个PDF文件（或目录）
     
     参数:
-    pdf_file_path (str): PDF文件路径
+    pdf_file_paths (str): PDF文件或目录路径，多个文件会并发分析
     """
-    if pdf_file_path:
+    if len(pdf_file_paths) == 1 and Path(pdf_file_paths[0]).is_dir():
+        process_pdf_files(pdf_file_paths[0])
+    elif pdf_file_paths:
         # 处理指定的PDF文件
-        pdf_path = Path(pdf_file_path)
-        call_llm_analyze_pdf(pdf_path)
+        analyze_pdf_files(pdf_file_paths)
         # call_gemini_analyze_pdf_test(pdf_file_path)
 
     else:
@@ -270,4 +701,4 @@ def main(pdf_file_path=None):
         process_pdf_files("./data/")
 
 if __name__ == "__main__":
-        main()
\ No newline at end of file
+    main(*sys.argv[1:])
\ No newline at end of file
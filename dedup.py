@@ -0,0 +1,215 @@
+import os
+import re
+import sys
+import json
+import heapq
+from pathlib import Path
+import pdfText
+import textCleaner
+
+# 近似重复检测：同一批公告中的全文和摘要、英文版、更正后重新发布的版本、内容基本相同的补充公告，
+# 只完整分析其中一个代表文件。判断依据：标题只差版本标记（摘要、英文版、更正后等），
+# 或正文的 MinHash（bottom-k 草图）估算的 Jaccard 相似度达到阈值。
+# 正文几乎相同的文件直接复用代表文件的结果（link），其余相近的文件（包括标题只差“补充”“更正”等的公告）
+# 只把与代表文件的差异连同代表文件的结果发给大模型（diff）
+LLM_DEDUP = os.getenv("LLM_DEDUP", "1") == "1"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.85"))
+# 相似度达到该值时视为相同内容，直接复用结果
+DEDUP_LINK_THRESHOLD = float(os.getenv("DEDUP_LINK_THRESHOLD", "0.97"))
+# diff 提示词中差异内容的 token 上限，超过时改为完整分析
+DEDUP_DIFF_MAX_TOKENS = int(os.getenv("DEDUP_DIFF_MAX_TOKENS", "8000"))
+# 正文按连续几个字符切分为片段（shingle）
+DEDUP_SHINGLE = int(os.getenv("DEDUP_SHINGLE", "5"))
+# 每个文档保留的最小哈希值个数，越大估算越准
+DEDUP_SKETCH_SIZE = int(os.getenv("DEDUP_SKETCH_SIZE", "128"))
+
+HASH_MASK = (1 << 64) - 1
+# 标题中表示同一公告不同版本的词
+VARIANT_RE = re.compile(r"[（(]?(英文版|英文|摘要|全文|更正后|更新后|修订稿|修订版|修订后|补充后|更正|补充)[)）]?")
+PUNCT_RE = re.compile(r"[\s（）()《》〈〉“”\"'：:、，,。.\-—－_]+")
+# 代表文件的优先级：更正后的版本优先，其次是中文全文，最后按页数
+CORRECTED_RE = re.compile(r"更正后|更新后|修订稿|修订版|修订后")
+SUMMARY_RE = re.compile(r"摘要")
+ENGLISH_RE = re.compile(r"英文")
+
+
+def normalize_title(title, keep_variant=False):
+    """
+    去掉证券简称前缀、版本标记和标点后的标题，同一公告的不同版本得到相同的结果
+    """
+    title = title.split("：", 1)[-1] if "：" in title[:12] else title
+    return PUNCT_RE.sub("", title if keep_variant else VARIANT_RE.sub("", title))
+
+
+def sketch(text):
+    """
+    计算正文的 bottom-k MinHash 草图：所有片段哈希值中最小的 DEDUP_SKETCH_SIZE 个（升序）。
+    哈希使用进程内的 hash()，草图只在同一进程内比较
+    """
+    text = re.sub(r"\s+", "", text)
+    shingles = {text[i:i + DEDUP_SHINGLE] for i in range(max(1, len(text) - DEDUP_SHINGLE + 1))}
+    return heapq.nsmallest(DEDUP_SKETCH_SIZE, {hash(s) & HASH_MASK for s in shingles}), len(shingles)
+
+
+def similarity(a, b):
+    """
+    由两个草图估算 Jaccard 相似度：合并后最小的 k 个哈希值中两者共有的比例
+    """
+    if not a or not b:
+        return 0.0
+    set_a, set_b = set(a), set(b)
+    union = heapq.nsmallest(min(DEDUP_SKETCH_SIZE, len(set_a | set_b)), set_a | set_b)
+    return sum(1 for h in union if h in set_a and h in set_b) / len(union)
+
+
+def clean_lines(text):
+    """
+    去掉页眉页脚等之后的非空行
+    """
+    if not text.strip():
+        return []
+    cleaned, _ = textCleaner.clean_text(text)
+    return [line for line in cleaned.splitlines() if line.strip()]
+
+
+def diff_text(representative, pdf_path):
+    """
+    比较两个 PDF 的正文，返回 (pdf_path 中新增的行, 代表文件中被删除的行)
+    """
+    base = clean_lines(pdfText.extract_text(representative)[0])
+    other = clean_lines(pdfText.extract_text(pdf_path)[0])
+    base_set, other_set = set(base), set(other)
+    return [line for line in other if line not in base_set], [line for line in base if line not in other_set]
+
+
+def describe(pdf_path, with_text=True):
+    """
+    返回比较所需的信息；with_text 为 True 时读取（缓存的）正文、清理页眉页脚并计算草图
+    """
+    pdf_path = Path(pdf_path)
+    doc = {
+        "path": pdf_path,
+        "title": normalize_title(pdf_path.stem),
+        "raw_title": normalize_title(pdf_path.stem, keep_variant=True),
+        "sketch": [],
+        "size": 0,
+        "pages": 0,
+        "loaded": False,
+    }
+    return load_text(doc) if with_text else doc
+
+
+def load_text(doc):
+    """
+    读取正文并计算草图（只读取一次）
+    """
+    if not doc["loaded"]:
+        text, stats = pdfText.extract_text(doc["path"])
+        cleaned = clean_lines(text)
+        doc["sketch"], doc["size"] = sketch("".join(cleaned)) if cleaned else ([], 0)
+        doc["pages"] = stats["pages"]
+        doc["loaded"] = True
+    return doc
+
+
+def _rank(doc):
+    stem = doc["path"].stem
+    return (
+        not CORRECTED_RE.search(stem),
+        bool(ENGLISH_RE.search(stem)),
+        bool(SUMMARY_RE.search(stem)),
+        -doc["pages"],
+        stem,
+    )
+
+
+def group_files(pdf_files, threshold=None, compare_text=True):
+    """
+    对一批 PDF 分组，返回 [(代表文件, [(重复文件, 相似度, "link" 或 "diff"), ...]), ...]，不重复的文件单独成组；
+    无法读取正文的文件只按标题比较。compare_text 为 False 时（提供商直接接收 PDF，不需要正文）
+    只读取标题只差版本标记的文件的正文，不按正文查找其余的近似重复
+    """
+    threshold = DEDUP_THRESHOLD if threshold is None else threshold
+    docs = []
+
+    def load(doc):
+        try:
+            return load_text(doc)
+        except Exception as e:
+            print(f"读取文件 {doc['path']} 时出错，只按标题比较: {e}")
+            doc["loaded"] = True
+            return doc
+
+    for pdf_path in pdf_files:
+        doc = describe(pdf_path, with_text=False)
+        docs.append(load(doc) if compare_text else doc)
+
+    parent = list(range(len(docs)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        parent[find(j)] = find(i)
+
+    def is_variant(a, b):
+        return a["title"] and a["title"] == b["title"] and a["raw_title"] != b["raw_title"]
+
+    # 标题只差版本标记（摘要、英文版、更正后等）的直接归为一组，是否复用结果仍按正文相似度决定；
+    # 完全相同的标题（例如每月的质押公告）内容可能不同，只按正文比较
+    by_title = {}
+    for i, doc in enumerate(docs):
+        if not doc["title"]:
+            continue
+        for j in by_title.setdefault(doc["title"], []):
+            if is_variant(docs[j], doc):
+                union(j, i)
+                break
+        by_title[doc["title"]].append(i)
+
+    # Jaccard 相似度达到阈值要求片段数之比也不低于阈值，按片段数排序后只比较大小相近的文档
+    order = sorted((i for i, doc in enumerate(docs) if doc["sketch"]), key=lambda i: docs[i]["size"])
+    for a, i in enumerate(order if compare_text else []):
+        for j in order[a + 1:]:
+            if docs[i]["size"] < docs[j]["size"] * threshold:
+                break
+            if similarity(docs[i]["sketch"], docs[j]["sketch"]) >= threshold:
+                union(i, j)
+
+    clusters = {}
+    for i in range(len(docs)):
+        clusters.setdefault(find(i), []).append(docs[i])
+    groups = []
+    for members in clusters.values():
+        if len(members) > 1:
+            members = [load(doc) for doc in members]
+        members.sort(key=_rank)
+        representative = members[0]
+        duplicates = []
+        for doc in members[1:]:
+            # 与代表文件（而不是组内其他文件）比较：只有正文几乎相同才复用结果，
+            # 补充、更正公告的新内容正是需要分析的部分，标题相同也要发送差异
+            score = round(similarity(representative["sketch"], doc["sketch"]), 3)
+            duplicates.append((doc["path"], score, "link" if score >= DEDUP_LINK_THRESHOLD else "diff"))
+        groups.append((representative["path"], duplicates))
+    # 保持原来的文件顺序
+    position = {Path(p): n for n, p in enumerate(pdf_files)}
+    groups.sort(key=lambda group: position[group[0]])
+    return groups
+
+
+if __name__ == "__main__":
+    # python dedup.py data/   输出目录中 PDF 的近似重复分组（JSON）
+    paths = []
+    for arg in sys.argv[1:] or ["./data/"]:
+        path = Path(arg)
+        paths.extend(sorted(path.glob("*.pdf")) + sorted(path.glob("*.PDF")) if path.is_dir() else [path])
+    for representative, duplicates in group_files(paths):
+        if duplicates:
+            print(json.dumps({
+                "representative": representative.name,
+                "duplicates": [{"file": p.name, "similarity": s, "mode": mode} for p, s, mode in duplicates],
+            }, ensure_ascii=False))
@@ -0,0 +1,88 @@
+import re
+
+# 公告常见的章节标题：第一节 / 一、 / （一） / 1. / 1.1
+HEADING_RE = re.compile(
+    r"^\s*(第[一二三四五六七八九十百零\d]+[节章条部分]|[一二三四五六七八九十]+、|[（(][一二三四五六七八九十]+[)）]|\d+(\.\d+)*[、.．]\s*\S)"
+)
+CJK_RE = re.compile(r"[　-〿一-鿿＀-￯]")
+
+
+def estimate_tokens(text):
+    """
+    粗略估算 token 数：中文字符按 1 个 token，其余字符按 4 个字符 1 个 token
+    """
+    cjk = len(CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def split_sections(text):
+    """
+    按章节标题把文本切分为若干段，每段以标题行开头（第一段可能没有标题）
+    """
+    sections = []
+    current = []
+    for line in text.splitlines():
+        if HEADING_RE.match(line) and current:
+            sections.append("\n".join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append("\n".join(current))
+    return [section for section in sections if section.strip()]
+
+
+def _split_oversized(section, max_tokens):
+    """
+    单个章节超过预算时先按行切分，单行仍超过预算时按字符切分
+    """
+    pieces = []
+    current = []
+    current_tokens = 0
+    for line in section.splitlines():
+        line_tokens = estimate_tokens(line)
+        if line_tokens > max_tokens:
+            # 按预算估算每段字符数（中文约 1 字 1 token，保守处理）
+            step = max(1, max_tokens)
+            pieces.extend(line[i:i + step] for i in range(0, len(line), step))
+            continue
+        if current and current_tokens + line_tokens > max_tokens:
+            pieces.append("\n".join(current))
+            current = []
+            current_tokens = 0
+        current.append(line)
+        current_tokens += line_tokens
+    if current:
+        pieces.append("\n".join(current))
+    return pieces
+
+
+def chunk_text(text, max_tokens):
+    """
+    按章节标题和 token 预算切分文本：尽量把相邻章节合并到同一块，返回 (块列表, 统计信息)
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    for section in split_sections(text):
+        section_tokens = estimate_tokens(section)
+        parts = [section] if section_tokens <= max_tokens else _split_oversized(section, max_tokens)
+        for part in parts:
+            part_tokens = estimate_tokens(part)
+            if current and current_tokens + part_tokens > max_tokens:
+                chunks.append("\n".join(current))
+                current = []
+                current_tokens = 0
+            current.append(part)
+            current_tokens += part_tokens
+    if current:
+        chunks.append("\n".join(current))
+
+    chunk_tokens = [estimate_tokens(chunk) for chunk in chunks]
+    stats = {
+        "chunks": len(chunks),
+        "total_tokens": sum(chunk_tokens),
+        "max_chunk_tokens": max(chunk_tokens, default=0),
+        "chunk_tokens": chunk_tokens,
+        "budget": max_tokens,
+    }
+    return chunks, stats
@@ -2,28 +2,185 @@ import asyncio
 import os
 import sys
 import json
+import time
+import random
+import hashlib
+from urllib.parse import urlparse
+import httpx
 from dotenv import load_dotenv
-from stagehand import Stagehand
+import pdfStore
+import manifest
+import metrics
+import browserSession
 
 # 加载.env文件中的环境变量到系统环境中
 load_dotenv()
 save_dir = "downloads"
 os.makedirs(save_dir, exist_ok=True)
 
-async def save_pdf(stagehand, title, pdf_url):
-    page = stagehand.page
+# 并发下载数量和每个主机每秒最多发起的请求数
+DOWNLOAD_CONCURRENCY = int(os.getenv("DOWNLOAD_CONCURRENCY", "4"))
+DOWNLOAD_RATE_LIMIT = float(os.getenv("DOWNLOAD_RATE_LIMIT", "2"))
+DOWNLOAD_TIMEOUT = float(os.getenv("DOWNLOAD_TIMEOUT", "120"))
+DOWNLOAD_RETRIES = int(os.getenv("DOWNLOAD_RETRIES", "3"))
+# 下载中断后重试前的等待时间（秒），每次翻倍并加随机抖动，上限 DOWNLOAD_RETRY_MAX_SECONDS
+DOWNLOAD_RETRY_BASE_SECONDS = float(os.getenv("DOWNLOAD_RETRY_BASE_SECONDS", "1"))
+DOWNLOAD_RETRY_MAX_SECONDS = float(os.getenv("DOWNLOAD_RETRY_MAX_SECONDS", "30"))
 
-    # 等待页面加载完成
-    await page.wait_for_timeout(30000)
 
+class HostRateLimiter:
+    """
+    按主机限制请求发起速率，保证同一主机两次请求之间至少间隔 1/rate 秒
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, url):
+        if not self.interval:
+            return
+        host = urlparse(url).netloc
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+async def wait_page_ready(page, timeout=15000):
+    """
+    等待页面就绪（网络空闲），代替固定时长的等待
+    """
+    try:
+        await page.wait_for_load_state("networkidle", timeout=timeout)
+    except Exception:
+        # 页面上可能存在长连接导致网络一直不空闲，DOM 加载完成即可
+        await page.wait_for_load_state("domcontentloaded")
+
+
+async def create_http_client(page, referer):
+    """
+    基于 Stagehand 会话创建共享的 HTTP 客户端，复用浏览器中的 cookies 和 User-Agent
+    """
+    return http_client_from_cookies(await page.context.cookies(), await page.evaluate("navigator.userAgent"), referer)
+
+
+def http_client_from_cookies(browser_cookies, user_agent, referer):
+    """
+    用浏览器导出的 cookies 和 User-Agent 创建 HTTP 客户端（也可来自 browserSession 保存的会话状态）
+    """
+    cookies = httpx.Cookies()
+    for cookie in browser_cookies:
+        cookies.set(cookie["name"], cookie["value"], domain=cookie["domain"], path=cookie["path"])
+
+    return httpx.AsyncClient(
+        cookies=cookies,
+        headers={"User-Agent": user_agent, "Referer": referer},
+        follow_redirects=True,
+        timeout=DOWNLOAD_TIMEOUT,
+        limits=httpx.Limits(max_connections=DOWNLOAD_CONCURRENCY, max_keepalive_connections=DOWNLOAD_CONCURRENCY),
+    )
+
+
+async def stream_to_partial(client, pdf_url, part):
+    """
+    将 PDF 分块写入未完成文件，已有部分时通过 HTTP Range 续传，返回边下载边计算的 sha256
+    """
+    offset = part.stat().st_size if part.exists() else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+    async with client.stream("GET", pdf_url, headers=headers) as response:
+        if response.status_code == 416:
+            # 请求范围超出文件大小，说明上次已经下载完整
+            return pdfStore.hash_file(part).hexdigest()
+        response.raise_for_status()
+
+        if offset and response.status_code == 206:
+            hasher = pdfStore.hash_file(part)
+            mode = "ab"
+        else:
+            # 服务器不支持续传，从头开始
+            hasher = hashlib.sha256()
+            mode = "wb"
+
+        with open(part, mode) as f:
+            async for chunk in response.aiter_bytes(pdfStore.CHUNK_SIZE):
+                f.write(chunk)
+                hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def retry_delay(attempt):
+    """
+    第 attempt 次失败后的等待时间：指数退避加随机抖动，避免同时失败的下载一起重试
+    """
+    delay = min(DOWNLOAD_RETRY_MAX_SECONDS, DOWNLOAD_RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+    return delay * (0.5 + random.random() / 2)
+
+
+async def save_pdf(client, title, pdf_url, filename):
     # 下载 PDF
     print(f"📥 开始下载: {title}")
     print(f"🔗 URL: {pdf_url}")
-    pdf_data = await page.request.get(pdf_url)
-    filepath = os.path.join(save_dir, f"{title}.pdf")
-    with open(filepath, "wb") as f:
-        f.write(await pdf_data.body())
-    print(f"✅ 已保存: {filepath}")
+    part = pdfStore.partial_path(pdf_url)
+    with metrics.timer("download", file=filename) as m:
+        for attempt in range(1, DOWNLOAD_RETRIES + 1):
+            try:
+                sha256 = await stream_to_partial(client, pdf_url, part)
+                break
+            except httpx.TransportError as e:
+                if attempt == DOWNLOAD_RETRIES:
+                    raise
+                delay = retry_delay(attempt)
+                print(f"⚠️ 下载中断，{delay:.1f} 秒后从 {part.stat().st_size if part.exists() else 0} 字节处续传: {e}")
+                await asyncio.sleep(delay)
+        m.update(bytes=part.stat().st_size, attempts=attempt)
+    metrics.count("download_bytes", m["bytes"])
+
+    # 移入内容寻址存储（重复内容只保留一份），再链接到 downloads 目录
+    pdfStore.put_file(part, sha256)
+    filepath = os.path.join(save_dir, filename)
+    pdfStore.link_object(sha256, filepath)
+    print(f"✅ 已保存: {filepath} (sha256={sha256[:12]})")
+    return filepath, sha256
+
+
+async def download_all(client, titles, hrefs, filenames=None, concurrency=DOWNLOAD_CONCURRENCY, rate_limit=DOWNLOAD_RATE_LIMIT):
+    """
+    使用有界并发池下载所有 PDF 文件，返回每个文件的 (保存路径, sha256)，失败为 (None, None)
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    limiter = HostRateLimiter(rate_limit)
+    if filenames is None:
+        used = set()
+        filenames = [pdfStore.unique_filename(title, used) for title in titles]
+    # 同一地址只下载一次，避免并发写同一个未完成文件
+    in_flight = {}
+
+    async def fetch(title, href, filename):
+        async with semaphore:
+            await limiter.wait(href)
+            return await save_pdf(client, title, href, filename)
+
+    async def worker(title, href, filename):
+        try:
+            if href not in in_flight:
+                in_flight[href] = asyncio.ensure_future(fetch(title, href, filename))
+                result = await in_flight[href]
+                metrics.count("downloads_ok")
+                return result
+            _, sha256 = await in_flight[href]
+            return str(pdfStore.link_object(sha256, os.path.join(save_dir, filename))), sha256
+        except Exception as e:
+            print(f"❌ 下载失败: {title}，错误: {e}")
+            metrics.count("downloads_failed", file=filename, error=str(e))
+            return None, None
+
+    return await asyncio.gather(*(worker(*args) for args in zip(titles, hrefs, filenames)))
+
 
 async def main(configJson):
     with open(configJson, 'r', encoding='utf-8') as f:
@@ -34,34 +191,65 @@ async def main(configJson):
     if not target_url.startswith('https://www.cninfo.com.cn'):
         print("错误: 本项目能够处理的target_url是受限的，目前仅能处理针对https://www.cninfo.com.cn网站的请求")
         return
-        
+
     titles = config_data['titles']
     hrefs = config_data['hrefs']
+    used = set()
+    filenames = [pdfStore.unique_filename(title, used) for title in titles]
 
-    # 初始化 Stagehand（不使用 AI）
-    stagehand = Stagehand(
-        env="LOCAL",
-        model_name=None,
-        model_client_options=None,
-        local_browser_launch_options={"headless": True},
-        verbose=3
-    )
-    await stagehand.init()
-    page = stagehand.page
-
-    # 打开公告列表页面
-    await page.goto(target_url)
-    await page.wait_for_timeout(20000)
+    # 清单中已下载且存储中仍有文件的公告直接链接，不再重新下载
+    results = [(None, None)] * len(titles)
+    pending = []
+    for i, (href, filename) in enumerate(zip(hrefs, filenames)):
+        sha256 = manifest.downloaded_sha256(href)
+        if pdfStore.has_object(sha256):
+            results[i] = (str(pdfStore.link_object(sha256, os.path.join(save_dir, filename))), sha256)
+        else:
+            pending.append(i)
+    print(f"共 {len(titles)} 个公告，已下载 {len(titles) - len(pending)} 个，待下载 {len(pending)} 个")
+    metrics.count("downloads_skipped", len(titles) - len(pending))
 
-    # 遍历titles和hrefs列表，下载对应的PDF文件
-    for title, href in zip(titles, hrefs):
+    if pending:
+        # 并发下载 titles 和 hrefs 对应的 PDF 文件
+        async def download_pending(client):
+            start = time.monotonic()
+            async with client:
+                downloaded = await download_all(
+                    client,
+                    [titles[i] for i in pending],
+                    [hrefs[i] for i in pending],
+                    [filenames[i] for i in pending],
+                )
+            for i, (path, sha256) in zip(pending, downloaded):
+                results[i] = (path, sha256)
+                manifest.record_download(hrefs[i], sha256, titles[i])
+            succeeded = sum(1 for path, _ in downloaded if path)
+            print(f"📦 下载完成: 成功 {succeeded}/{len(downloaded)}，耗时 {time.monotonic() - start:.1f} 秒")
 
-        await save_pdf(stagehand, title, href)
+        state = browserSession.load_state()
+        if state and state.get("cookies") and state.get("userAgent"):
+            # 列表阶段或之前的运行保存的会话仍在有效期内，直接复用，不启动浏览器
+            print("♻️ 复用已保存的浏览器会话")
+            metrics.count("browser_state_reused")
+            await download_pending(http_client_from_cookies(state["cookies"], state["userAgent"], target_url))
+        else:
+            # 打开共享的浏览器会话（不使用 AI），访问公告列表页面获取会话 cookies
+            async with browserSession.open_session() as stagehand:
+                page = stagehand.page
+                with metrics.timer("page_navigation", url=target_url):
+                    await page.goto(target_url)
+                    await wait_page_ready(page)
+                await download_pending(await create_http_client(page, target_url))
 
-    await stagehand.close()
+    # 记录每个标题对应的文件名和内容哈希
+    config_data['files'] = [os.path.basename(path) if path else None for path, _ in results]
+    config_data['hashes'] = [sha256 for _, sha256 in results]
+    with open(configJson, 'w', encoding='utf-8') as f:
+        json.dump(config_data, f, ensure_ascii=False, indent=4)
+    metrics.emit_summary("getPdfFiles.py", files=len(titles))
 
 
 if __name__ == "__main__":
     # 获取命令行参数，如果没有提供则使用默认的config.json
     config_file = sys.argv[1] if len(sys.argv) > 1 else 'config.json'
-    asyncio.run(main(config_file))
\ No newline at end of file
+    asyncio.run(main(config_file))
@@ -2,60 +2,457 @@ import os
 import asyncio
 import sys
 import json
-from urllib.parse import urljoin
+import re
+import time
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urljoin, urlparse, parse_qs, urlencode, quote
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+import httpx
 from dotenv import load_dotenv
-from stagehand import Stagehand, StagehandConfig
+import manifest
+import metrics
+import browserSession
 
 load_dotenv()
 api_key = os.getenv("GEMINI_API_KEY")
-
-config = StagehandConfig(
-    env="LOCAL",
-    model_name="google/gemini-2.0-flash",
-    model_api_key=api_key,
-    local_browser_launch_options={"headless": True},
-    verbose=3,
-    debug_dom=True
-)
+MODEL_NAME = "google/gemini-2.0-flash"
 
 BASE = "https://www.cninfo.com.cn"
 
-async def main(configJson):
-    async with Stagehand(config) as sh:
-        # 读取配置文件
-        with open(configJson, 'r', encoding='utf-8') as f:
-            config_data = json.load(f)
+# 列表获取方式：browser 通过浏览器翻页抓取，api 直接调用页面使用的公告查询接口
+LISTING_BACKEND = os.getenv("LISTING_BACKEND", "browser").lower()
+# 公告查询接口地址，可指向本地回放服务器
+CNINFO_API_BASE = os.getenv("CNINFO_API_BASE", BASE)
+API_PAGE_SIZE = 30
+API_RETRIES = 3
+# 批量模式下同时抓取的公司数
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+# 翻页进度目录：每完成一页就把公告追加到 JSONL 文件并更新检查点，中断后重新运行从最后完成的页继续
+LISTING_CHECKPOINT_DIR = Path(os.getenv("LISTING_CHECKPOINT_DIR", Path(__file__).resolve().parent / "cache" / "listing"))
 
-        config_data['titles'] = []
-        config_data['hrefs'] = []
+# 北京时间，用于转换接口返回的毫秒时间戳
+CST = timezone(timedelta(hours=8))
 
-        # 验证target_url是否以https://www.cninfo.com.cn开头
-        target_url = config_data['target_url']
-        if not target_url.startswith('https://www.cninfo.com.cn'):
-            print("错误: 本项目能够处理的target_url是受限的，目前仅能处理针对https://www.cninfo.com.cn网站的请求")
+
+def make_record(title, href, when):
+    """
+    构造一条公告记录，两种列表方式输出相同的字段和格式
+    """
+    return {
+        "title": normalize_title(title),
+        "href": href,
+        "date": when.strip()[:10],
+        "announcementId": manifest.announcement_id(href),
+    }
+
+
+def normalize_title(title):
+    """
+    统一标题格式：去掉搜索高亮标签，连续空白合并为一个空格（页面上“证券简称：”和标题分属两个元素，之间有一个空格）
+    """
+    return re.sub(r"\s+", " ", re.sub(r"</?em>", "", title)).strip()
+
+
+def detail_href(org_id, announcement_id, announcement_time):
+    """
+    构造与页面上完全一致的公告详情链接（清单按 href 记录，两种列表方式必须相同）；
+    页面链接中 announcementTime 的空格和冒号不编码
+    """
+    query = urlencode({
+        "orgId": org_id,
+        "announcementId": announcement_id,
+        "announcementTime": announcement_time,
+    }, quote_via=quote, safe=": ")
+    return f"{BASE}/new/disclosure/detail?{query}"
+
+
+def dom_row_to_record(row):
+    """
+    将页面表格中的一行（标题、链接、时间）转换为公告记录，链接按 detail_href 重新构造
+    """
+    query = parse_qs(urlparse(urljoin(BASE, row["href"])).query)
+    if not query.get("announcementId"):
+        return make_record(row["title"], urljoin(BASE, row["href"]), row["when"])
+    href = detail_href(
+        query.get("orgId", [""])[0],
+        query["announcementId"][0],
+        query.get("announcementTime", [""])[0],
+    )
+    return make_record(row["title"], href, row["when"])
+
+
+def parse_target_url(target_url):
+    """
+    从公告页面地址中解析 orgId 和 stockCode
+    """
+    query = parse_qs(urlparse(target_url).query)
+    org_id = query.get("orgId", [""])[0]
+    stock_code = query.get("stockCode", [""])[0]
+    return org_id, stock_code
+
+
+def get_column(stock_code):
+    """
+    根据证券代码判断交易所栏目（深市 szse、沪市 sse、北交所 bj）
+    """
+    if stock_code.startswith(("6", "9")):
+        return "sse"
+    if stock_code.startswith(("4", "8")):
+        return "bj"
+    return "szse"
+
+
+def api_item_to_record(item, org_id):
+    """
+    将查询接口返回的一条公告转换为与页面一致的标题和详情链接（页面上的标题为“证券简称： 标题”）
+    """
+    title = item.get("announcementTitle") or ""
+    sec_name = (item.get("secName") or "").strip()
+    if sec_name:
+        title = f"{sec_name}： {title}"
+
+    published = datetime.fromtimestamp(item["announcementTime"] / 1000, tz=CST)
+    href = detail_href(item.get("orgId") or org_id, item["announcementId"], published.strftime("%Y-%m-%d %H:%M"))
+    return make_record(title, href, published.strftime("%Y-%m-%d"))
+
+
+def try_lock_file(path):
+    """
+    以非阻塞方式对文件加排他锁，成功时返回打开的文件（关闭即释放，进程退出时自动释放），已被占用时返回 None
+    """
+    f = open(path, "a+b")
+    try:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+class ListingStream:
+    """
+    公告列表的流式输出和检查点：<键>.jsonl 逐页追加公告（按 announcementId 去重），
+    <键>.checkpoint.json 记录最后完成的页码和该页首行指纹；列表抓取完成后下一次运行重新开始。
+    使用期间持有 <键>.lock 的排他锁；同一键的列表正在被另一个任务抓取时，本次只在内存中去重，不读写检查点
+    """
+
+    def __init__(self, target_url, startDate, endDate, backend=None):
+        _, stock_code = parse_target_url(target_url)
+        key = f"{stock_code}_{startDate}_{endDate}_{backend or LISTING_BACKEND}"
+        LISTING_CHECKPOINT_DIR.mkdir(parents=True, exist_ok=True)
+        self.jsonl_path = LISTING_CHECKPOINT_DIR / f"{key}.jsonl"
+        self.checkpoint_path = LISTING_CHECKPOINT_DIR / f"{key}.checkpoint.json"
+        self.checkpoint = None
+        self.seen = set()
+        self.rows = []
+
+        self.lock = try_lock_file(LISTING_CHECKPOINT_DIR / f"{key}.lock")
+        if self.lock is None:
+            print(f"⚠️ {key} 的列表正在被其他任务抓取，本次不使用检查点")
             return
+        try:
+            checkpoint = json.loads(self.checkpoint_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            checkpoint = None
+        if checkpoint and not checkpoint.get("done"):
+            self.checkpoint = checkpoint
+            self.rows = self._read_rows()
+            self.seen = {self.row_key(row) for row in self.rows}
+        else:
+            # 没有检查点或上次已完成：清空之前的输出
+            self.jsonl_path.unlink(missing_ok=True)
+            self.checkpoint_path.unlink(missing_ok=True)
 
-        startDate = config_data['startDate']
-        endDate = config_data['endDate']
+    @staticmethod
+    def row_key(record):
+        return record.get("announcementId") or record["href"]
 
-        page = sh.page
+    def _read_rows(self):
+        rows = []
+        try:
+            with open(self.jsonl_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rows.append(json.loads(line))
+                    except ValueError:
+                        # 写入一半中断的最后一行
+                        break
+        except FileNotFoundError:
+            pass
+        return rows
 
-        # 1. 打开公告页面
-        await page.goto(target_url)
+    def resume_page(self):
+        """
+        返回应开始抓取的页码：重新读取最后完成的页（其中已写入的公告会被去重），没有检查点时为 1
+        """
+        if not self.checkpoint:
+            return 1
+        print(f"♻️ 从第 {self.checkpoint['page']} 页继续（已保存 {len(self.rows)} 条公告）")
+        return self.checkpoint["page"]
 
-        # 2. 输入日期并点击查询
-        await page.fill('input[placeholder="开始日期"]', startDate)
-        await page.fill('input[placeholder="结束日期"]', endDate)
-        await page.click('button:has-text("查询")')
+    def check_fingerprint(self, page_no, records):
+        """
+        比较续传页的首行与检查点记录的指纹；不一致说明列表在两次运行之间有变化（新公告插入使后面的公告整体后移，
+        或有公告被撤回），检查点已不可信，返回 False，调用方应 reset() 后从第 1 页重新抓取
+        """
+        if not self.checkpoint or page_no != self.checkpoint["page"] or not records:
+            return True
+        matched = self.row_key(records[0]) == self.checkpoint.get("fingerprint")
+        if not matched:
+            print(f"⚠️ 第 {page_no} 页首行与检查点不一致，列表已更新，丢弃检查点并从第 1 页重新抓取")
+        return matched
 
-        # 3. 等待表格行加载
-        await page.wait_for_selector('tr.el-table__row', timeout=20000)
+    def reset(self):
+        """
+        丢弃检查点和已写入的公告
+        """
+        self.checkpoint = None
+        self.seen = set()
+        self.rows = []
+        if self.lock:
+            self.jsonl_path.unlink(missing_ok=True)
+            self.checkpoint_path.unlink(missing_ok=True)
 
-        titleList = []
-        hrefList = []
-        page_no = 1
+    def write_page(self, page_no, records):
+        """
+        追加一页公告（跳过已写入的），然后更新检查点
+        """
+        fresh = []
+        for record in records:
+            key = self.row_key(record)
+            if key in self.seen:
+                continue
+            self.seen.add(key)
+            fresh.append(record)
+        if not self.lock:
+            self.rows.extend(fresh)
+            self.checkpoint = {"page": page_no, "fingerprint": self.row_key(records[0]) if records else None, "done": False}
+            return len(fresh)
+        if fresh:
+            with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in fresh)
+                f.flush()
+                os.fsync(f.fileno())
+            self.rows.extend(fresh)
+        self._save_checkpoint(page=page_no, fingerprint=self.row_key(records[0]) if records else None, done=False)
+        return len(fresh)
+
+    def finish(self):
+        """
+        标记列表抓取完成并释放锁，返回去重后的全部公告
+        """
+        if self.lock:
+            self._save_checkpoint(page=(self.checkpoint or {}).get("page"), fingerprint=(self.checkpoint or {}).get("fingerprint"), done=True)
+            self.close()
+        return list(self.rows)
+
+    def close(self):
+        """
+        释放检查点的锁（抓取失败时检查点保留，下一次运行从最后完成的页继续）
+        """
+        if self.lock:
+            self.lock.close()
+            self.lock = None
+
+    def _save_checkpoint(self, **fields):
+        self.checkpoint = {**fields, "rows": len(self.rows), "updatedAt": time.time()}
+        tmp_path = self.checkpoint_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(self.checkpoint, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, self.checkpoint_path)
+
+
+async def fetch_listing_page(client, form):
+    for attempt in range(1, API_RETRIES + 1):
+        try:
+            response = await client.post(f"{CNINFO_API_BASE}/new/hisAnnouncement/query", data=form)
+            response.raise_for_status()
+            return response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            if attempt == API_RETRIES:
+                raise
+            print(f"查询接口请求失败，第 {attempt} 次重试: {e}")
+            await asyncio.sleep(attempt)
+
+
+def build_query_form(target_url, startDate, endDate):
+    """
+    构造公告查询接口的表单（第 1 页），同时返回 orgId、证券代码和交易所栏目
+    """
+    org_id, stock_code = parse_target_url(target_url)
+    column = get_column(stock_code)
+    form = {
+        "stock": f"{stock_code},{org_id}",
+        "tabName": "fulltext",
+        "pageSize": API_PAGE_SIZE,
+        "pageNum": 1,
+        "column": column,
+        "category": "",
+        "plate": "",
+        "seDate": f"{startDate}~{endDate}",
+        "searchkey": "",
+        "secid": "",
+        "sortName": "",
+        "sortType": "",
+        "isHLtitle": "true",
+    }
+    return form, org_id, stock_code, column
+
+
+async def fetch_listing_api(target_url, startDate, endDate, client=None, label="", stream=None):
+    """
+    直接调用公告查询接口分页获取公告列表，无需启动浏览器；
+    传入 stream（ListingStream）时从检查点继续，并在每页完成后写入
+    """
+    form, org_id, stock_code, column = build_query_form(target_url, startDate, endDate)
+    if stream:
+        form["pageNum"] = stream.resume_page()
+
+    own_client = client is None
+    if own_client:
+        client = httpx.AsyncClient(
+            headers={
+                "User-Agent": "Mozilla/5.0",
+                "X-Requested-With": "XMLHttpRequest",
+                "Referer": target_url,
+            },
+            timeout=30,
+        )
+
+    records = []
+    try:
         while True:
-            print(f"\n=== 第 {page_no} 页 ===")
+            print(f"\n=== {label}第 {form['pageNum']} 页 ===")
+            with metrics.timer("listing_page", labels={"backend": "api"}, page=form["pageNum"], stock=stock_code) as m:
+                data = await fetch_listing_page(client, form)
+                items = data.get("announcements") or []
+                m["rows"] = len(items)
+            page_records = [api_item_to_record(item, org_id) for item in items]
+            for record in page_records:
+                print(record["date"], record["title"], record["href"])
+            if stream:
+                if not stream.check_fingerprint(form["pageNum"], page_records):
+                    stream.reset()
+                    form["pageNum"] = 1
+                    continue
+                stream.write_page(form["pageNum"], page_records)
+            else:
+                records.extend(page_records)
+
+            total_pages = data.get("totalpages") or 0
+            if not items or not data.get("hasMore", form["pageNum"] < total_pages):
+                break
+            form["pageNum"] += 1
+    finally:
+        if own_client:
+            await client.aclose()
+    return stream.finish() if stream else records
+
+
+# 页面指纹：行数 + 首行和末行链接，用于判断翻页后表格是否已更新
+PAGE_FINGERPRINT_JS = """() => {
+    const links = document.querySelectorAll('tr.el-table__row td a.ahover');
+    if (!links.length) return '';
+    return links.length + '|' + links[0].getAttribute('href') + '|' + links[links.length - 1].getAttribute('href');
+}"""
+
+# 一次性读取本页所有公告行，避免逐行逐字段的往返调用
+PAGE_SNAPSHOT_JS = f"""() => {{
+    const rows = Array.from(document.querySelectorAll('tr.el-table__row')).map(row => {{
+        const a = row.querySelector('td a.ahover');
+        const t = row.querySelector('span.time');
+        return {{
+            title: a ? a.innerText.trim() : '',
+            href: a ? (a.getAttribute('href') || '') : '',
+            when: t ? t.innerText.trim() : '',
+        }};
+    }});
+    const next = document.querySelector('button.btn-next');
+    return {{
+        rows,
+        hasNext: !!next,
+        nextDisabled: !!next && (next.disabled || next.classList.contains('disabled')),
+        fingerprint: ({PAGE_FINGERPRINT_JS})(),
+    }};
+}}"""
+
+
+async def scrape_listing_browser(target_url, startDate, endDate, stream=None):
+    """
+    启动浏览器，在公告页面输入日期后逐页抓取公告列表
+    """
+    async with browserSession.open_session(MODEL_NAME, api_key) as sh:
+        return await scrape_listing_page(sh.page, target_url, startDate, endDate, stream=stream)
+
+
+async def click_next_page(page, fingerprint):
+    """
+    点击下一页，并等待表格内容真正变化
+    """
+    await page.click("button.btn-next")
+
+    # 等待页面内容真正变化：优先等待页面指纹变化；若超时则等待行出现
+    try:
+        await page.wait_for_function(
+            f"(prev) => ({PAGE_FINGERPRINT_JS})() !== prev",
+            arg=fingerprint,
+            timeout=10000
+        )
+    except Exception:
+        # 兜底：等待新行出现（或 loading mask 消失）
+        try:
+            await page.wait_for_selector(".el-loading-mask", state="detached", timeout=3000)
+        except Exception:
+            pass
+        try:
+            await page.wait_for_selector("tr.el-table__row", timeout=8000)
+        except Exception:
+            # 如果仍然没有数据，打印提示并退出或继续重试
+            print("等待下一页的 tr.el-table__row 超时，尝试继续（可能是网络/渲染慢）。")
+            # 你可以选择 break，这里我们继续循环再尝试读取
+            # break
+
+
+async def scrape_listing_page(page, target_url, startDate, endDate, label="", stream=None):
+    """
+    在给定的页面中打开公告页面、输入日期并逐页抓取公告列表；
+    传入 stream（ListingStream）时先翻到检查点所在的页，并在每页完成后写入
+    """
+    # 1. 打开公告页面
+    with metrics.timer("page_navigation", url=target_url):
+        await page.goto(target_url)
+
+    # 2. 输入日期并点击查询
+    await page.fill('input[placeholder="开始日期"]', startDate)
+    await page.fill('input[placeholder="结束日期"]', endDate)
+    await page.click('button:has-text("查询")')
+
+    # 3. 等待表格行加载
+    await page.wait_for_selector('tr.el-table__row', timeout=20000)
+
+    records = []
+    page_no = 1
+    # 从检查点继续：只翻页不读取，直到最后完成的页
+    start_page = stream.resume_page() if stream else 1
+    while page_no < start_page:
+        snapshot = await page.evaluate(PAGE_SNAPSHOT_JS)
+        if not snapshot["hasNext"] or snapshot["nextDisabled"]:
+            break
+        await click_next_page(page, snapshot["fingerprint"])
+        page_no += 1
+
+    while True:
+        # 每一页的耗时包括读取本页和等待翻页完成
+        with metrics.timer("listing_page", labels={"backend": "browser"}, page=page_no) as m:
+            print(f"\n=== {label}第 {page_no} 页 ===")
 
             # 等到至少有一条行可见（稳健）
             try:
@@ -63,99 +460,206 @@ async def main(configJson):
             except Exception:
                 print("等待 tr.el-table__row 超时，检测到本页无数据。")
                 # 仍尝试读取一次
-            rows_loc = page.locator("tr.el-table__row")
-            row_count = await rows_loc.count()
-            if row_count == 0:
+
+            # 一次 evaluate 读取本页所有行、下一页按钮状态和页面指纹
+            snapshot = await page.evaluate(PAGE_SNAPSHOT_JS)
+            rows = snapshot["rows"]
+            m["rows"] = len(rows)
+            if not rows:
                 print("本页没有检测到任何公告行（count=0）。")
+            page_records = [dom_row_to_record(row) for row in rows]
+            for row in rows:
+                print(row["when"], row["title"], row["href"])
+            if stream:
+                if not stream.check_fingerprint(page_no, page_records):
+                    # 重新打开页面从第 1 页抓取
+                    stream.reset()
+                    return await scrape_listing_page(page, target_url, startDate, endDate, label, stream)
+                stream.write_page(page_no, page_records)
             else:
-                for i in range(row_count):
-                    row = rows_loc.nth(i)
-                    title_loc = row.locator("td a.ahover").first
-                    time_loc = row.locator("span.time").first
-
-                    # 先检查元素是否存在
-                    title = ""
-                    href = ""
-                    when = ""
-                    try:
-                        if await title_loc.count() > 0:
-                            title = (await title_loc.inner_text()).strip()
-                            href = await title_loc.get_attribute("href") or ""
-                    except Exception as e:
-                        # 元素可能在渲染中被替换，打印并继续
-                        print(f"读取标题出错（row {i}）：{e}")
-
-                    try:
-                        if await time_loc.count() > 0:
-                            when = (await time_loc.inner_text()).strip()
-                    except Exception:
-                        pass
-
-                    titleList.append(title)
-                    hrefList.append(urljoin(BASE, href))
-
-                    print(when, title, href)
-
-            # 取当前页第一条标题（用于等待下一页加载时判断是否变化）
-            prev_first = ""
-            try:
-                first_title_loc = page.locator("tr.el-table__row td a.ahover").first
-                if await first_title_loc.count() > 0:
-                    prev_first = (await first_title_loc.inner_text()).strip()
-            except Exception:
-                prev_first = ""
+                records.extend(page_records)
 
             # 找“下一页”按钮
-            next_btn = page.locator("button.btn-next")
-            if await next_btn.count() == 0:
+            if not snapshot["hasNext"]:
                 print("没有找到下一页按钮，结束。")
                 break
 
             # 如果按钮已经不可用，则退出
-            try:
-                if await next_btn.is_disabled():
-                    print("下一页按钮已禁用，已到最后一页。")
-                    break
-            except Exception:
-                # 某些情况下 is_disabled 可能抛异常，退而检查 class
-                cls = (await next_btn.get_attribute("class")) or ""
-                if "disabled" in cls:
-                    print("下一页按钮 class 显示为 disabled，已到最后一页。")
-                    break
+            if snapshot["nextDisabled"]:
+                print("下一页按钮已禁用，已到最后一页。")
+                break
 
             # 点击下一页
-            await next_btn.click()
+            await click_next_page(page, snapshot["fingerprint"])
 
-            # 等待页面内容真正变化：优先等待 first title 变化；若超时则等待行出现
-            try:
-                await page.wait_for_function(
-                    "(prev) => { const el = document.querySelector('tr.el-table__row td a.ahover'); return el && el.textContent.trim() !== prev; }",
-                    arg=prev_first,
-                    timeout=10000
-                )
-            except Exception:
-                # 兜底：等待新行出现（或 loading mask 消失）
-                try:
-                    await page.wait_for_selector(".el-loading-mask", state="detached", timeout=3000)
-                except Exception:
-                    pass
-                try:
-                    await page.wait_for_selector("tr.el-table__row", timeout=8000)
-                except Exception:
-                    # 如果仍然没有数据，打印提示并退出或继续重试
-                    print("等待下一页的 tr.el-table__row 超时，尝试继续（可能是网络/渲染慢）。")
-                    # 你可以选择 break，这里我们继续循环再尝试读取
-                    # break
+        page_no += 1
+
+    return stream.finish() if stream else records
+
+
+def apply_records(config_data, records):
+    """
+    将公告记录写入配置数据，并登记到流水线清单
+    """
+    config_data['titles'] = [r['title'] for r in records]
+    config_data['hrefs'] = [r['href'] for r in records]
+    config_data['dates'] = [r['date'] for r in records]
+    config_data['announcementIds'] = [r['announcementId'] for r in records]
 
-            page_no += 1
+    # 登记到流水线清单，后续阶段据此跳过已处理的公告
+    is_new = manifest.record_listing(config_data['titles'], config_data['hrefs'], config_data['dates'])
+    return sum(is_new)
 
-        config_data['titles'] = titleList
-        config_data['hrefs']= hrefList
 
-        with open(configJson, 'w', encoding='utf-8') as f:
+async def main(configJson):
+    # 读取配置文件
+    with open(configJson, 'r', encoding='utf-8') as f:
+        config_data = json.load(f)
+
+    config_data['titles'] = []
+    config_data['hrefs'] = []
+
+    # 验证target_url是否以https://www.cninfo.com.cn开头
+    target_url = config_data['target_url']
+    if not target_url.startswith('https://www.cninfo.com.cn'):
+        print("错误: 本项目能够处理的target_url是受限的，目前仅能处理针对https://www.cninfo.com.cn网站的请求")
+        return
+
+    startDate = config_data['startDate']
+    endDate = config_data['endDate']
+
+    # 每页完成后写入 JSONL 并更新检查点，中断后重新运行从最后完成的页继续
+    stream = ListingStream(target_url, startDate, endDate)
+    if LISTING_BACKEND == "api":
+        records = await fetch_listing_api(target_url, startDate, endDate, stream=stream)
+    else:
+        records = await scrape_listing_browser(target_url, startDate, endDate, stream=stream)
+
+    new_count = apply_records(config_data, records)
+    print(f"共抓取 {len(records)} 条公告，其中新公告 {new_count} 条")
+
+    with open(configJson, 'w', encoding='utf-8') as f:
+        json.dump(config_data, f, ensure_ascii=False, indent=4)
+    metrics.emit_summary("inputJson.py", announcements=len(records), new=new_count)
+
+
+def build_target_url(stock_code, org_id=None):
+    """
+    根据证券代码（和 orgId）构造公告页面地址；未提供 orgId 时按沪深交易所规则推断
+    """
+    if not org_id:
+        column = get_column(stock_code)
+        if column == "bj":
+            raise ValueError(f"北交所证券 {stock_code} 需要在批量配置中提供 orgId")
+        org_id = f"{'gssh' if column == 'sse' else 'gssz'}0{stock_code}"
+    return f"{BASE}/new/disclosure/stock?orgId={org_id}&stockCode={stock_code}#latestAnnouncement"
+
+
+def load_batch_jobs(batch_data):
+    """
+    将批量配置展开为 (公司, 日期范围) 任务列表，公司未指定日期时使用顶层的日期范围
+    """
+    jobs = []
+    for company in batch_data['companies']:
+        target_url = company.get('target_url') or build_target_url(company['stockCode'], company.get('orgId'))
+        if not target_url.startswith('https://www.cninfo.com.cn'):
+            print(f"错误: 跳过不受支持的target_url: {target_url}")
+            continue
+        _, stock_code = parse_target_url(target_url)
+        ranges = company.get('ranges') or [{
+            'startDate': company.get('startDate', batch_data.get('startDate')),
+            'endDate': company.get('endDate', batch_data.get('endDate')),
+        }]
+        for date_range in ranges:
+            jobs.append({
+                'target_url': target_url,
+                'stockCode': stock_code,
+                'startDate': date_range['startDate'],
+                'endDate': date_range['endDate'],
+            })
+    return jobs
+
+
+async def run_batch(batchJson):
+    """
+    批量模式：多个公司、多个日期范围共用一个浏览器（或一个 HTTP 客户端），按并发上限同时抓取，
+    每个任务输出一个与 config.json 格式相同的列表文件
+    """
+    with open(batchJson, 'r', encoding='utf-8') as f:
+        batch_data = json.load(f)
+
+    jobs = load_batch_jobs(batch_data)
+    concurrency = max(1, int(batch_data.get('concurrency', BATCH_CONCURRENCY)))
+    output_dir = batch_data.get('output_dir', 'listings')
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"批量任务: {len(jobs)} 个，并发数 {concurrency}，列表方式 {LISTING_BACKEND}")
+
+    async def run_job(job, fetch):
+        label = f"{job['stockCode']} {job['startDate']}~{job['endDate']} "
+        try:
+            records = await fetch(job, label)
+        except Exception as e:
+            print(f"❌ {label}抓取失败: {e}")
+            return None
+
+        config_data = {
+            'target_url': job['target_url'],
+            'startDate': job['startDate'],
+            'endDate': job['endDate'],
+            'require': batch_data.get('require', "请分析此文档，提取关键内容并进行总结。"),
+        }
+        new_count = apply_records(config_data, records)
+        output_path = os.path.join(output_dir, f"{job['stockCode']}_{job['startDate']}_{job['endDate']}.json")
+        with open(output_path, 'w', encoding='utf-8') as f:
             json.dump(config_data, f, ensure_ascii=False, indent=4)
+        print(f"✅ {label}共 {len(records)} 条公告，新公告 {new_count} 条，已保存到 {output_path}")
+        return output_path
+
+    if LISTING_BACKEND == "api":
+        semaphore = asyncio.Semaphore(concurrency)
+        async with httpx.AsyncClient(
+            headers={"User-Agent": "Mozilla/5.0", "X-Requested-With": "XMLHttpRequest"},
+            timeout=30,
+            limits=httpx.Limits(max_connections=concurrency),
+        ) as client:
+            async def fetch(job, label):
+                async with semaphore:
+                    stream = ListingStream(job['target_url'], job['startDate'], job['endDate'])
+                    try:
+                        return await fetch_listing_api(job['target_url'], job['startDate'], job['endDate'], client, label, stream)
+                    finally:
+                        stream.close()
+
+            results = await asyncio.gather(*(run_job(job, fetch) for job in jobs))
+    else:
+        # 只启动一次浏览器，预先创建与并发数相同的页面组成页面池
+        async with browserSession.open_session(MODEL_NAME, api_key) as sh:
+            pages = asyncio.Queue()
+            pages.put_nowait(sh.page)
+            for _ in range(min(concurrency, len(jobs)) - 1):
+                pages.put_nowait(await sh.page.context.new_page())
+
+            async def fetch(job, label):
+                page = await pages.get()
+                stream = ListingStream(job['target_url'], job['startDate'], job['endDate'])
+                try:
+                    return await scrape_listing_page(page, job['target_url'], job['startDate'], job['endDate'], label, stream)
+                finally:
+                    stream.close()
+                    pages.put_nowait(page)
+
+            results = await asyncio.gather(*(run_job(job, fetch) for job in jobs))
+
+    succeeded = [path for path in results if path]
+    print(f"批量任务完成: 成功 {len(succeeded)}/{len(jobs)}")
+    metrics.emit_summary("inputJson.py", jobs=len(jobs), succeeded=len(succeeded))
+    return succeeded
 
 if __name__ == "__main__":
     # 获取命令行参数，如果没有提供则使用默认的config_1.json
-    config_file = sys.argv[1] if len(sys.argv) > 1 else 'config.json'
-    asyncio.run(main(config_file))
\ No newline at end of file
+    # 批量模式: python inputJson.py --batch batch.json
+    if len(sys.argv) > 2 and sys.argv[1] == '--batch':
+        asyncio.run(run_batch(sys.argv[2]))
+    else:
+        config_file = sys.argv[1] if len(sys.argv) > 1 else 'config.json'
+        asyncio.run(main(config_file))
\ No newline at end of file
@@ -0,0 +1,711 @@
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import shutil
+import socket
+import sqlite3
+import threading
+import subprocess
+from pathlib import Path
+from contextlib import contextmanager
+from datetime import datetime
+from dotenv import load_dotenv
+import pdfStore
+import taskScheduler
+
+load_dotenv()
+
+# 持久化任务队列：每次运行是一个 job，拆分为 列表 → 下载 → 分析 三个阶段任务，按顺序执行；
+# 任务状态和进度事件保存在 SQLite 中，worker 进程崩溃或重启后由租约过期的任务自动恢复
+ROOT = Path(__file__).resolve().parent
+JOBS_DB_PATH = Path(os.getenv("JOBS_DB_PATH", ROOT / "jobs.db"))
+# 每个 job 使用独立的工作目录 jobs/<id>/（config.json、downloads/、data/），互不干扰
+JOBS_DIR = Path(os.getenv("JOBS_DIR", ROOT / "jobs"))
+# 分析完成后结果复制到共享的 data 目录，网页的打包下载从这里读取
+JOBS_PUBLISH_DIR = Path(os.getenv("JOBS_PUBLISH_DIR", ROOT / "data"))
+
+# worker 进程同时执行的任务数，以及各阶段同时执行的任务数上限
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+STAGE_LIMITS = {
+    "list": int(os.getenv("JOB_LIST_CONCURRENCY", "2")),
+    "download": int(os.getenv("JOB_DOWNLOAD_CONCURRENCY", "2")),
+    "analyze": int(os.getenv("JOB_ANALYZE_CONCURRENCY", "1")),
+}
+# 失败重试：最多执行次数，第 n 次失败后等待 JOB_RETRY_BASE * 2^(n-1) 秒（上限 JOB_RETRY_MAX）
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE = float(os.getenv("JOB_RETRY_BASE", "30"))
+JOB_RETRY_MAX = float(os.getenv("JOB_RETRY_MAX", "600"))
+# 租约时长（秒）：执行中的任务定期续约，超过租约未续约的任务视为 worker 已崩溃，重新执行
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+# job 结束后删除的进度事件：流式输出的片段和逐条的指标事件（只在执行时有用，运行汇总 run_summary 保留）
+JOB_COMPACT_EVENTS = ("llm_delta", "metric")
+# 结束超过该天数的 job 的进度事件全部删除，0 表示一直保留
+JOB_EVENTS_RETENTION_DAYS = float(os.getenv("JOB_EVENTS_RETENTION_DAYS", "30"))
+# 结束超过该天数的 job 删除其工作目录 jobs/<jobID>/（结果已发布到 data 目录），0 表示一直保留
+JOB_DIR_RETENTION_DAYS = float(os.getenv("JOB_DIR_RETENTION_DAYS", "7"))
+
+STAGES = ["list", "download", "analyze"]
+STAGE_SCRIPTS = {"list": "inputJson.py", "download": "getPdfFiles.py", "analyze": "callLLM.py"}
+# 阶段开始时的提示文字（前端据此切换各阶段的状态指示）
+STAGE_MESSAGES = {
+    "list": "执行 预处理阶段 任务...",
+    "download": "执行 从服务器获取pdf文件 任务...",
+    "analyze": "处理data目录下的PDF文件 (大语言模型分析)...",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    status TEXT,
+    force INTEGER,
+    created_at REAL,
+    updated_at REAL,
+    finished_at REAL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT,
+    stage TEXT,
+    seq INTEGER,
+    status TEXT,
+    attempts INTEGER DEFAULT 0,
+    max_attempts INTEGER,
+    run_after REAL,
+    lease_until REAL,
+    worker TEXT,
+    error TEXT,
+    started_at REAL,
+    finished_at REAL,
+    cost REAL,
+    UNIQUE (job_id, stage)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, run_after);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT,
+    stage TEXT,
+    kind TEXT,
+    created_at REAL,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_job ON events (job_id, id);
+"""
+# 已建表的数据库路径
+_schema_ready = set()
+
+
+def connect():
+    """
+    打开任务队列数据库（WAL 模式，server.js 查询进度和 worker 写入可同时进行）
+    """
+    JOBS_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    ready = JOBS_DB_PATH in _schema_ready and JOBS_DB_PATH.exists()
+    conn = sqlite3.connect(JOBS_DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    if not ready:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        # 早期创建的数据库没有 cost 列
+        if "cost" not in {row["name"] for row in conn.execute("PRAGMA table_info(tasks)")}:
+            conn.execute("ALTER TABLE tasks ADD COLUMN cost REAL")
+        _schema_ready.add(JOBS_DB_PATH)
+    return conn
+
+
+@contextmanager
+def transaction():
+    """
+    打开一个连接，退出时提交（出错时回滚）并关闭
+    """
+    conn = connect()
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def job_dir(job_id):
+    return JOBS_DIR / job_id
+
+
+def add_event(conn, job_id, stage, kind, data):
+    """
+    记录一条进度事件：kind 为 event（脚本输出的结构化事件）、stdout、stderr 或 info
+    """
+    conn.execute(
+        "INSERT INTO events (job_id, stage, kind, created_at, data) VALUES (?, ?, ?, ?, ?)",
+        (job_id, stage, kind, time.time(), json.dumps(data, ensure_ascii=False)),
+    )
+
+
+def compact_events(conn, job_id):
+    """
+    job 结束时压缩进度事件：删除该 job 的流式输出片段和逐条指标事件，以及超过保留期的已结束 job 的所有事件
+    """
+    placeholders = ",".join("?" for _ in JOB_COMPACT_EVENTS)
+    conn.execute(
+        f"DELETE FROM events WHERE job_id = ? AND kind = 'event' AND json_extract(data, '$.event') IN ({placeholders})",
+        (job_id, *JOB_COMPACT_EVENTS),
+    )
+    if JOB_EVENTS_RETENTION_DAYS > 0:
+        cutoff = time.time() - JOB_EVENTS_RETENTION_DAYS * 86400
+        conn.execute("DELETE FROM events WHERE job_id IN (SELECT id FROM jobs WHERE finished_at < ?)", (cutoff,))
+
+
+def cleanup_job_dirs():
+    """
+    删除结束超过 JOB_DIR_RETENTION_DAYS 天的 job 的工作目录，返回删除的目录数
+    """
+    if JOB_DIR_RETENTION_DAYS <= 0:
+        return 0
+    cutoff = time.time() - JOB_DIR_RETENTION_DAYS * 86400
+    with transaction() as conn:
+        rows = conn.execute("SELECT id FROM jobs WHERE finished_at < ?", (cutoff,)).fetchall()
+    removed = 0
+    for row in rows:
+        directory = job_dir(row["id"])
+        if directory.exists():
+            shutil.rmtree(directory, ignore_errors=True)
+            removed += 1
+    return removed
+
+
+def enqueue(config_path, force=False, name=None, stages=None):
+    """
+    新建一个 job：复制配置文件到独立的工作目录，并登记各阶段任务，返回 job ID；
+    配置文件中已有公告列表时可以只执行 stages 中的阶段（例如跳过列表阶段）
+    """
+    job_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    directory = job_dir(job_id)
+    directory.mkdir(parents=True)
+    shutil.copyfile(config_path, directory / "config.json")
+
+    now = time.time()
+    with transaction() as conn:
+        conn.execute(
+            "INSERT INTO jobs (id, name, status, force, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?, ?)",
+            (job_id, name or Path(config_path).name, int(force), now, now),
+        )
+        for seq, stage in enumerate(STAGES):
+            if stages and stage not in stages:
+                continue
+            conn.execute(
+                "INSERT INTO tasks (job_id, stage, seq, status, max_attempts, run_after) VALUES (?, ?, ?, 'pending', ?, ?)",
+                (job_id, stage, seq, JOB_MAX_ATTEMPTS, now),
+            )
+        add_event(conn, job_id, None, "info", {"message": f"任务已加入队列: {job_id}（{name or Path(config_path).name}）"})
+    return job_id
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def recover_orphans():
+    """
+    worker 启动时立即回收本机上已退出的 worker 留下的执行中任务，不必等待租约过期
+    """
+    host = socket.gethostname()
+    recovered = 0
+    with transaction() as conn:
+        rows = conn.execute("SELECT id, job_id, stage, worker FROM tasks WHERE status = 'running'").fetchall()
+        for row in rows:
+            worker_host, _, rest = (row["worker"] or "").partition(":")
+            pid = rest.split(":")[0]
+            if worker_host != host or not pid.isdigit() or _pid_alive(int(pid)):
+                continue
+            conn.execute("UPDATE tasks SET lease_until = 0 WHERE id = ? AND status = 'running'", (row["id"],))
+            recovered += 1
+    return recovered
+
+
+def claim(worker_id, stages):
+    """
+    领取一个可执行的任务：前序阶段已完成、到达重试时间，或执行中但租约已过期（worker 崩溃）；
+    已估算耗时的任务（分析阶段）按最高响应比优先，小批次不会排在大批次之后，大批次等待越久越靠前
+    """
+    now = time.time()
+    placeholders = ",".join("?" for _ in stages)
+    conn = connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        while True:
+            row = conn.execute(
+                f"""
+                SELECT t.* FROM tasks t JOIN jobs j ON j.id = t.job_id
+                WHERE j.status IN ('queued', 'running') AND t.stage IN ({placeholders})
+                  AND ((t.status = 'pending' AND t.run_after <= ?) OR (t.status = 'running' AND t.lease_until < ?))
+                  AND NOT EXISTS (
+                      SELECT 1 FROM tasks p WHERE p.job_id = t.job_id AND p.seq < t.seq AND p.status != 'done'
+                  )
+                ORDER BY t.cost IS NOT NULL, (? - t.run_after + t.cost) / t.cost DESC, t.cost, j.created_at, t.seq
+                LIMIT 1
+                """,
+                (*stages, now, now, now),
+            ).fetchone()
+            if row is None:
+                conn.commit()
+                return None
+
+            task = dict(row)
+            if task["status"] == "running":
+                add_event(conn, task["job_id"], task["stage"], "info", {"message": f"⚠️ {task['stage']} 阶段的 worker 已失去响应，重新执行"})
+                if task["attempts"] >= task["max_attempts"]:
+                    _finish_failed(conn, task, "worker 多次中断")
+                    continue
+            conn.execute(
+                """
+                UPDATE tasks SET status = 'running', attempts = attempts + 1, worker = ?, lease_until = ?,
+                    started_at = ?, error = NULL
+                WHERE id = ?
+                """,
+                (worker_id, now + JOB_LEASE_SECONDS, now, task["id"]),
+            )
+            conn.execute("UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ?", (now, task["job_id"]))
+            force = conn.execute("SELECT force FROM jobs WHERE id = ?", (task["job_id"],)).fetchone()["force"]
+            conn.commit()
+            task.update(attempts=task["attempts"] + 1, worker=worker_id, force=bool(force))
+            return task
+    finally:
+        conn.close()
+
+
+def heartbeat(task):
+    """
+    续约执行中的任务，返回 job 是否仍需继续（已取消时返回 False）
+    """
+    with transaction() as conn:
+        conn.execute(
+            "UPDATE tasks SET lease_until = ? WHERE id = ? AND worker = ?",
+            (time.time() + JOB_LEASE_SECONDS, task["id"], task["worker"]),
+        )
+        row = conn.execute("SELECT status FROM jobs WHERE id = ?", (task["job_id"],)).fetchone()
+    return row is not None and row["status"] != "cancelled"
+
+
+def _finish_failed(conn, task, error):
+    now = time.time()
+    conn.execute(
+        "UPDATE tasks SET status = 'failed', error = ?, finished_at = ?, lease_until = NULL WHERE id = ?",
+        (error, now, task["id"]),
+    )
+    conn.execute(
+        "UPDATE jobs SET status = 'failed', error = ?, updated_at = ?, finished_at = ? WHERE id = ?",
+        (f"{task['stage']}: {error}", now, now, task["job_id"]),
+    )
+    conn.execute(
+        "UPDATE tasks SET status = 'cancelled' WHERE job_id = ? AND status = 'pending'",
+        (task["job_id"],),
+    )
+    add_event(conn, task["job_id"], task["stage"], "info", {"message": f"❌ 任务失败: {task['stage']} 阶段 {error}", "status": "failed"})
+    compact_events(conn, task["job_id"])
+
+
+def complete(task, error=None):
+    """
+    记录任务结果：成功时推进到下一阶段（最后一个阶段完成时 job 完成）；
+    失败时按指数退避安排重试，超过最多执行次数后 job 失败
+    """
+    now = time.time()
+    with transaction() as conn:
+        # 任务已被其他 worker 接管（本 worker 曾失去响应）时不再写入结果
+        current = conn.execute("SELECT worker, status FROM tasks WHERE id = ?", (task["id"],)).fetchone()
+        if current["worker"] != task["worker"] or current["status"] != "running":
+            return
+        job_status = conn.execute("SELECT status FROM jobs WHERE id = ?", (task["job_id"],)).fetchone()["status"]
+        if job_status == "cancelled":
+            conn.execute(
+                "UPDATE tasks SET status = 'cancelled', finished_at = ?, lease_until = NULL WHERE id = ?",
+                (now, task["id"]),
+            )
+            compact_events(conn, task["job_id"])
+            return
+        if error is None:
+            conn.execute(
+                "UPDATE tasks SET status = 'done', finished_at = ?, lease_until = NULL WHERE id = ?",
+                (now, task["id"]),
+            )
+            remaining = conn.execute(
+                "SELECT COUNT(*) FROM tasks WHERE job_id = ? AND status != 'done'", (task["job_id"],)
+            ).fetchone()[0]
+            if remaining == 0:
+                conn.execute(
+                    "UPDATE jobs SET status = 'done', updated_at = ?, finished_at = ? WHERE id = ?",
+                    (now, now, task["job_id"]),
+                )
+                add_event(conn, task["job_id"], task["stage"], "info", {"message": "所有任务执行完成", "status": "done"})
+                compact_events(conn, task["job_id"])
+            return
+
+        if task["attempts"] >= task["max_attempts"]:
+            _finish_failed(conn, task, error)
+            return
+        delay = min(JOB_RETRY_MAX, JOB_RETRY_BASE * 2 ** (task["attempts"] - 1)) * (1 + random.random() * 0.2)
+        conn.execute(
+            "UPDATE tasks SET status = 'pending', error = ?, run_after = ?, lease_until = NULL WHERE id = ?",
+            (error, now + delay, task["id"]),
+        )
+        add_event(
+            conn, task["job_id"], task["stage"], "info",
+            {"message": f"⚠️ {task['stage']} 阶段失败（第 {task['attempts']}/{task['max_attempts']} 次）: {error}，{delay:.0f} 秒后重试"},
+        )
+
+
+def cancel(job_id):
+    """
+    取消 job：未开始的任务不再执行，执行中的脚本在下一次续约时终止
+    """
+    now = time.time()
+    with transaction() as conn:
+        updated = conn.execute(
+            "UPDATE jobs SET status = 'cancelled', updated_at = ?, finished_at = ? WHERE id = ? AND status IN ('queued', 'running')",
+            (now, now, job_id),
+        ).rowcount
+        if updated:
+            conn.execute("UPDATE tasks SET status = 'cancelled' WHERE job_id = ? AND status = 'pending'", (job_id,))
+            add_event(conn, job_id, None, "info", {"message": "任务已取消", "status": "cancelled"})
+            compact_events(conn, job_id)
+    return bool(updated)
+
+
+def get_job(job_id):
+    with transaction() as conn:
+        job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if job is None:
+            return None
+        tasks = conn.execute("SELECT * FROM tasks WHERE job_id = ? ORDER BY seq", (job_id,)).fetchall()
+    return {**dict(job), "tasks": [dict(task) for task in tasks]}
+
+
+def list_jobs(limit=20):
+    with transaction() as conn:
+        rows = conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+    return [dict(row) for row in rows]
+
+
+def get_events(job_id, after=0, limit=500):
+    """
+    返回 job 在 after 之后的进度事件，以及 job 当前状态（前端据此轮询或断线后续传）
+    """
+    with transaction() as conn:
+        job = conn.execute("SELECT id, status, error FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        rows = conn.execute(
+            "SELECT id, stage, kind, created_at, data FROM events WHERE job_id = ? AND id > ? ORDER BY id LIMIT ?",
+            (job_id, after, limit),
+        ).fetchall()
+    events = [{**dict(row), "data": json.loads(row["data"])} for row in rows]
+    return {"job": dict(job) if job else None, "events": events}
+
+
+def move_pdf_files(directory):
+    """
+    把下载目录中的 PDF 移到 data 目录，返回本次移动的文件名（与 server.js 原有的移动逻辑一致）
+    """
+    downloads = directory / "downloads"
+    data = directory / "data"
+    data.mkdir(exist_ok=True)
+    moved = []
+    if not downloads.exists():
+        return moved
+    for source in sorted(downloads.iterdir()):
+        if source.suffix.lower() != ".pdf":
+            continue
+        dest = data / source.name
+        # 目标文件是同一存储对象的硬链接时内容未变化
+        if dest.exists() and dest.stat().st_ino == source.stat().st_ino:
+            source.unlink()
+            continue
+        os.replace(source, dest)
+        moved.append(source.name)
+    return moved
+
+
+def estimate_analyze_cost(directory):
+    """
+    估算分析阶段的耗时（秒）：data 目录中尚未生成结果的 PDF 的预计耗时之和
+    """
+    data = directory / "data"
+    if not data.exists():
+        return 0.0
+    return sum(
+        taskScheduler.estimate_cost(path)[0] for path in data.glob("*")
+        if path.suffix.lower() == ".pdf" and not path.with_suffix(".md").exists()
+    )
+
+
+def publish_results(directory):
+    """
+    把分析结果（.md、快速分拣的 .triage.json）和对应的 PDF 复制到共享的 data 目录（先写临时文件再替换，不会出现写了一半的文件）；
+    data 中已有同名但内容不同的 PDF（其他 job 的同名公告）时，这一组文件加上 job ID 后缀发布，不覆盖对方的结果
+    """
+    JOBS_PUBLISH_DIR.mkdir(parents=True, exist_ok=True)
+    published = 0
+    renamed = {}
+    for source in sorted((directory / "data").iterdir()):
+        if source.suffix.lower() not in (".md", ".pdf", ".json"):
+            continue
+        base, extension = split_result_name(source.name)
+        if base not in renamed:
+            renamed[base] = is_other_pdf(directory / "data" / f"{base}.pdf", JOBS_PUBLISH_DIR / f"{base}.pdf")
+        dest = JOBS_PUBLISH_DIR / (f"{base}_{directory.name}{extension}" if renamed[base] else source.name)
+        tmp_path = dest.with_name(f".{dest.name}.{os.getpid()}.tmp")
+        try:
+            # PDF 是内容寻址存储对象的硬链接，同一文件系统上直接链接即可
+            os.link(source, tmp_path)
+        except OSError:
+            shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, dest)
+        published += 1
+    return published
+
+
+def split_result_name(name):
+    """
+    把结果文件名拆成公告名和扩展名（<公告名>.pdf / .md / .triage.json）
+    """
+    if name.lower().endswith(".triage.json"):
+        return name[:-len(".triage.json")], name[-len(".triage.json"):]
+    path = Path(name)
+    return path.stem, path.suffix
+
+
+def is_other_pdf(source, dest):
+    """
+    判断 data 中的同名 PDF 是否是另一份公告（内容不同）
+    """
+    if not source.exists() or not dest.exists():
+        return False
+    if source.stat().st_ino == dest.stat().st_ino:
+        return False
+    return pdfStore.hash_file(source).digest() != pdfStore.hash_file(dest).digest()
+
+
+def run_script(task, args):
+    """
+    在 job 的工作目录中运行阶段脚本，逐行记录输出，期间定期续约；job 被取消时终止脚本
+    """
+    env = {**os.environ, "PYTHONUNBUFFERED": "1"}
+    if task["force"]:
+        env["PIPELINE_FORCE"] = "1"
+    process = subprocess.Popen(
+        [sys.executable, str(ROOT / STAGE_SCRIPTS[task["stage"]]), *args],
+        cwd=job_dir(task["job_id"]),
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+
+    def pump(stream, kind):
+        # 每个读取线程使用自己的数据库连接
+        conn = connect()
+        try:
+            for line in stream:
+                line = line.rstrip("\n")
+                if not line.strip():
+                    continue
+                event = None
+                if kind == "stdout" and line.startswith('{"event"'):
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        pass
+                with conn:
+                    if event:
+                        add_event(conn, task["job_id"], task["stage"], "event", event)
+                    else:
+                        add_event(conn, task["job_id"], task["stage"], kind, {"message": line})
+        finally:
+            conn.close()
+
+    readers = [threading.Thread(target=pump, args=(process.stdout, "stdout"), daemon=True),
+               threading.Thread(target=pump, args=(process.stderr, "stderr"), daemon=True)]
+    for reader in readers:
+        reader.start()
+    while True:
+        try:
+            code = process.wait(timeout=JOB_LEASE_SECONDS / 3)
+            break
+        except subprocess.TimeoutExpired:
+            if not heartbeat(task):
+                process.terminate()
+    for reader in readers:
+        reader.join()
+    return code
+
+
+def run_task(task):
+    """
+    执行一个阶段任务，返回错误信息（成功时为 None）
+    """
+    directory = job_dir(task["job_id"])
+
+    def log(kind, data):
+        with transaction() as conn:
+            add_event(conn, task["job_id"], task["stage"], kind, data)
+
+    log("info", {"message": STAGE_MESSAGES[task["stage"]], "attempt": task["attempts"]})
+    if task["stage"] == "analyze":
+        # 只分析尚未生成结果的 PDF；内容未变化的文件由清单和结果缓存直接复用
+        data = directory / "data"
+        pdf_files = sorted(
+            str(path.relative_to(directory)) for path in data.glob("*")
+            if path.suffix.lower() == ".pdf" and not path.with_suffix(".md").exists()
+        ) if data.exists() else []
+        log("info", {"message": f"找到 {len(pdf_files)} 个待分析的PDF文件"})
+        if pdf_files:
+            code = run_script(task, pdf_files)
+            if code != 0:
+                return f"{STAGE_SCRIPTS['analyze']} 退出码 {code}"
+        log("info", {"message": f"已发布 {publish_results(directory)} 个结果文件到 {JOBS_PUBLISH_DIR}"})
+        return None
+
+    code = run_script(task, ["config.json"])
+    if code != 0:
+        return f"{STAGE_SCRIPTS[task['stage']]} 退出码 {code}"
+    if task["stage"] == "download":
+        moved = move_pdf_files(directory)
+        log("info", {"message": f"PDF文件移动完成: {len(moved)} 个"})
+        with transaction() as conn:
+            analyze = conn.execute(
+                "SELECT 1 FROM tasks WHERE job_id = ? AND stage = 'analyze'", (task["job_id"],)
+            ).fetchone()
+        if not analyze:
+            # 只下载的 job 没有分析阶段，下载完成后直接发布 PDF
+            log("info", {"message": f"已发布 {publish_results(directory)} 个文件到 {JOBS_PUBLISH_DIR}"})
+            return None
+        # 分析任务从现在开始等待，按预计耗时参与调度
+        cost = max(taskScheduler.MIN_COST_SECONDS, taskScheduler.SCHEDULE_BASE_SECONDS, estimate_analyze_cost(directory))
+        with transaction() as conn:
+            conn.execute(
+                "UPDATE tasks SET cost = ?, run_after = MAX(run_after, ?) WHERE job_id = ? AND stage = 'analyze'",
+                (cost, time.time(), task["job_id"]),
+            )
+    return None
+
+
+def work(workers=None):
+    """
+    常驻 worker：多个线程循环领取任务执行，各阶段同时执行的任务数不超过 STAGE_LIMITS
+    """
+    workers = max(1, workers or JOB_WORKERS)
+    host = socket.gethostname()
+    running = {stage: 0 for stage in STAGES}
+    lock = threading.Lock()
+    recovered = recover_orphans()
+    print(f"🚀 任务队列 worker 已启动: {workers} 个线程，各阶段并发上限 {STAGE_LIMITS}，回收中断的任务 {recovered} 个", flush=True)
+
+    def loop(n):
+        worker_id = f"{host}:{os.getpid()}:{n}"
+        while True:
+            with lock:
+                stages = [stage for stage in STAGES if running[stage] < STAGE_LIMITS[stage]]
+            task = claim(worker_id, stages) if stages else None
+            if task is None:
+                time.sleep(JOB_POLL_INTERVAL)
+                continue
+            with lock:
+                running[task["stage"]] += 1
+            print(f"▶️ {task['job_id']} {task['stage']}（第 {task['attempts']} 次）", flush=True)
+            try:
+                error = run_task(task)
+            except Exception as e:
+                error = str(e)
+            finally:
+                with lock:
+                    running[task["stage"]] -= 1
+            complete(task, error)
+            print(f"{'✅' if error is None else '❌'} {task['job_id']} {task['stage']}{'' if error is None else f': {error}'}", flush=True)
+
+    threads = [threading.Thread(target=loop, args=(n,), daemon=True) for n in range(workers)]
+    for thread in threads:
+        thread.start()
+    try:
+        # 每小时清理一次过期的 job 工作目录
+        while True:
+            removed = cleanup_job_dirs()
+            if removed:
+                print(f"🧹 已删除 {removed} 个过期的 job 工作目录", flush=True)
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        # 执行中的任务在租约过期（或下次启动回收）后由 worker 重新执行
+        print("worker 已停止", flush=True)
+
+
+def run_command(command, args):
+    """
+    执行一条查询或管理命令（enqueue、status、events、cancel、list），返回可序列化为 JSON 的结果
+    """
+    if command == "enqueue":
+        # --stages list,download 只执行指定阶段
+        stages = None
+        if "--stages" in args:
+            index = args.index("--stages")
+            stages = args[index + 1].split(",")
+            args = args[:index] + args[index + 2:]
+        paths = [arg for arg in args if arg != "--force"]
+        return {"id": enqueue(paths[0] if paths else "config.json", force="--force" in args, stages=stages)}
+    if command == "status":
+        return get_job(args[0])
+    if command == "events":
+        return get_events(args[0], int(args[1]) if len(args) > 1 else 0)
+    if command == "cancel":
+        return {"cancelled": cancel(args[0])}
+    if command == "list":
+        return list_jobs()
+    raise ValueError(f"未知命令: {command}")
+
+
+def serve():
+    """
+    常驻查询进程：从标准输入逐行读取 {"id": ..., "command": ..., "args": [...]}，
+    结果以 {"id": ..., "result": ...}（出错时为 "error"）写回标准输出；server.js 启动一次后复用，查询不必每次启动 Python
+    """
+    sys.stdout.reconfigure(line_buffering=True)
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            reply = {"id": request_id, "result": run_command(request["command"], [str(arg) for arg in request.get("args", [])])}
+        except Exception as e:
+            reply = {"id": request_id, "error": str(e)}
+        print(json.dumps(reply, ensure_ascii=False), flush=True)
+
+
+if __name__ == "__main__":
+    # python jobQueue.py enqueue <配置文件> [--force] [--stages list,download]
+    #                                                   新建 job，输出 job ID；--stages 只执行指定阶段
+    # python jobQueue.py work [线程数]                  启动常驻 worker
+    # python jobQueue.py serve                          启动常驻查询进程（server.js 使用）
+    # python jobQueue.py status <jobID> | events <jobID> [起始事件ID] | cancel <jobID> | list
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+    args = sys.argv[2:]
+    if command == "work":
+        work(int(args[0]) if args else None)
+    elif command == "serve":
+        serve()
+    else:
+        try:
+            result = run_command(command, args)
+        except ValueError as e:
+            print(e)
+            sys.exit(1)
+        print(json.dumps(result, ensure_ascii=False))
@@ -0,0 +1,282 @@
+import os
+import sys
+import json
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+from dotenv import load_dotenv
+from openai import OpenAI
+import pdfStore
+import manifest
+import llmCache
+import docChunker
+import callLLM
+import llmProviders
+
+# 加载 .env 中的 API Keys
+load_dotenv()
+
+# 批量接口模式：把大量分析请求写成 JSONL 一次提交给提供商的 Batch API（OpenAI 兼容接口），
+# 适合离线回补历史公告，费用更低且不占用同步接口的限流额度
+# Batch API 地址必须设置（可指向本地的 mockBatchServer.py）；提供商由地址确定，API Key 和模型默认使用该提供商的配置
+BATCH_API_BASE_URL = os.getenv("BATCH_API_BASE_URL")
+BATCH_DIR = Path(os.getenv("BATCH_DIR", "batch"))
+BATCH_POLL_INTERVAL = float(os.getenv("BATCH_POLL_INTERVAL", "30"))
+BATCH_COMPLETION_WINDOW = os.getenv("BATCH_COMPLETION_WINDOW", "24h")
+# 单个批量任务的最大请求数，超出时拆分为多个任务
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "50000"))
+
+DONE_STATES = ("completed", "failed", "expired", "cancelled")
+
+
+def resolve_provider(base_url):
+    """
+    由 Batch API 地址确定提供商，返回 (提供商名称, 默认 API Key, 默认模型)：
+    域名与已注册的提供商相同时使用其名称和配置（结果登记到清单和缓存后与同步分析互相复用），
+    否则以接口的域名（含端口）作为提供商名称
+    """
+    if not base_url:
+        return None, None, None
+    host = urlparse(base_url).netloc
+    for name, cls in llmProviders.PROVIDERS.items():
+        provider_url = getattr(cls, "base_url", None)
+        if provider_url and urlparse(provider_url).netloc == host:
+            return name, os.getenv(cls.api_key_env), os.getenv(cls.model_env, cls.default_model)
+    return host, None, None
+
+
+BATCH_PROVIDER, _default_api_key, _default_model = resolve_provider(BATCH_API_BASE_URL)
+BATCH_API_KEY = os.getenv("BATCH_API_KEY") or _default_api_key
+BATCH_MODEL_NAME = os.getenv("BATCH_MODEL_NAME") or _default_model
+
+
+def get_client():
+    if not BATCH_API_BASE_URL:
+        raise RuntimeError("未设置 BATCH_API_BASE_URL")
+    if not BATCH_MODEL_NAME:
+        raise RuntimeError(f"未设置 BATCH_MODEL_NAME（{BATCH_PROVIDER} 不是已注册的提供商）")
+    return OpenAI(api_key=BATCH_API_KEY, base_url=BATCH_API_BASE_URL)
+
+
+def list_pdf_files(paths):
+    """
+    展开命令行参数中的目录，返回所有 PDF 文件
+    """
+    pdf_files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            pdf_files += sorted(list(path.glob("*.pdf")) + list(path.glob("*.PDF")))
+        elif path.exists():
+            pdf_files.append(path)
+        else:
+            print(f"❌ 错误: 找不到 PDF 文件 {path}")
+    return list(dict.fromkeys(pdf_files))
+
+
+def write_result(pdf_path, sha256, request_content, result, provider=None, model=None):
+    """
+    写入 data/<文件名>.md，并按提交任务时的提供商和模型登记到清单和结果缓存
+    """
+    provider = provider or BATCH_PROVIDER
+    model = model or BATCH_MODEL_NAME
+    key = manifest.analysis_key(request_content, provider, model)
+    output_path = callLLM.get_output_path(pdf_path)
+    if result:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path.write_text(result, encoding='utf-8')
+        llmCache.put(llmCache.make_key(sha256, request_content, provider, model), result, provider, model)
+    manifest.record_analysis(sha256, key, output_path, result)
+    return output_path
+
+
+def build_requests(pdf_files, request_content):
+    """
+    生成批量请求：相同内容的 PDF 只请求一次（custom_id 为内容哈希）；已分析过的直接写出结果，
+    超过分块阈值的大文件留给同步模式分块分析。返回 (请求列表, {sha256: [PDF 路径]})
+    """
+    requests = []
+    items = {}
+    for pdf_path in pdf_files:
+        sha256 = pdfStore.hash_file(pdf_path).hexdigest()
+        if sha256 in items:
+            items[sha256].append(str(pdf_path))
+            continue
+
+        cached = None if manifest.FORCE else llmCache.get(llmCache.make_key(sha256, request_content, BATCH_PROVIDER, BATCH_MODEL_NAME))
+        if cached:
+            write_result(pdf_path, sha256, request_content, cached)
+            print(f"⏭️ 已分析过相同内容，跳过: {pdf_path.name}")
+            continue
+
+        text_content = callLLM.read_pdf_text(pdf_path)
+        if docChunker.estimate_tokens(text_content) > callLLM.LLM_CHUNK_THRESHOLD_TOKENS:
+            print(f"⚠️ 文档超过分块阈值，请使用同步模式分块分析: {pdf_path.name}")
+            continue
+
+        items[sha256] = [str(pdf_path)]
+        requests.append({
+            "custom_id": sha256,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": BATCH_MODEL_NAME,
+                "messages": [
+                    {"role": "system", "content": callLLM.SYSTEM_PROMPT},
+                    {"role": "user", "content": callLLM.build_text_prompt(request_content, text_content)},
+                ],
+            },
+        })
+    return requests, items
+
+
+def state_path(batch_id):
+    return BATCH_DIR / f"{batch_id}.json"
+
+
+def load_state(batch_id):
+    return json.loads(state_path(batch_id).read_text(encoding='utf-8'))
+
+
+def submit(paths):
+    """
+    提交批量分析任务，返回任务 ID 列表；输入 JSONL 和任务状态保存在 batch/ 目录
+    """
+    request_content = callLLM.load_request_content()
+    if request_content is None:
+        return []
+    pdf_files = list_pdf_files(paths)
+    requests, items = build_requests(pdf_files, request_content)
+    if not requests:
+        print("没有需要提交的分析请求")
+        return []
+
+    client = get_client()
+    BATCH_DIR.mkdir(parents=True, exist_ok=True)
+    batch_ids = []
+    for start in range(0, len(requests), BATCH_MAX_REQUESTS):
+        part = requests[start:start + BATCH_MAX_REQUESTS]
+        input_path = BATCH_DIR / f"input_{time.strftime('%Y%m%d_%H%M%S')}_{start // BATCH_MAX_REQUESTS}.jsonl"
+        with open(input_path, 'w', encoding='utf-8') as f:
+            for request in part:
+                f.write(json.dumps(request, ensure_ascii=False) + "\n")
+
+        with open(input_path, 'rb') as f:
+            input_file = client.files.create(file=f, purpose="batch")
+        batch = client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window=BATCH_COMPLETION_WINDOW,
+        )
+        state = {
+            "id": batch.id,
+            "input_path": str(input_path),
+            "input_file_id": input_file.id,
+            "created_at": time.time(),
+            "request_content": request_content,
+            "provider": BATCH_PROVIDER,
+            "model": BATCH_MODEL_NAME,
+            "items": {request["custom_id"]: items[request["custom_id"]] for request in part},
+        }
+        state_path(batch.id).write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding='utf-8')
+        callLLM.emit_event("batch_api_submitted", batch=batch.id, requests=len(part))
+        print(f"📤 已提交批量任务 {batch.id}，共 {len(part)} 个请求")
+        batch_ids.append(batch.id)
+    return batch_ids
+
+
+def wait(batch_id, client=None):
+    """
+    轮询批量任务直到结束，返回最终的任务对象
+    """
+    client = client or get_client()
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        callLLM.emit_event(
+            "batch_api_status",
+            batch=batch_id,
+            status=batch.status,
+            completed=counts.completed if counts else None,
+            failed=counts.failed if counts else None,
+            total=counts.total if counts else None,
+        )
+        if batch.status in DONE_STATES:
+            return batch
+        time.sleep(BATCH_POLL_INTERVAL)
+
+
+def collect(batch_id, client=None):
+    """
+    下载已结束任务的结果，写回 data/<文件名>.md 并登记到清单和缓存，返回 (成功数, 失败数)
+    """
+    client = client or get_client()
+    state = load_state(batch_id)
+    batch = client.batches.retrieve(batch_id)
+    if batch.status not in DONE_STATES:
+        print(f"批量任务 {batch_id} 尚未结束，当前状态: {batch.status}")
+        return 0, 0
+
+    lines = []
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if file_id:
+            lines += client.files.content(file_id).text.splitlines()
+    output_path = BATCH_DIR / f"{batch_id}_output.jsonl"
+    output_path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+
+    results = {}
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        response = record.get("response") or {}
+        if response.get("status_code") == 200:
+            results[record["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+        else:
+            print(f"❌ 请求失败 {record['custom_id'][:12]}: {record.get('error') or response.get('body')}")
+
+    ok = failed = 0
+    for sha256, pdf_paths in state["items"].items():
+        result = results.get(sha256)
+        for pdf_path in pdf_paths:
+            output = write_result(pdf_path, sha256, state["request_content"], result, state.get("provider"), state.get("model"))
+            if result:
+                ok += 1
+                print(f"✅ 分析完成，结果已保存到: {output}")
+            else:
+                failed += 1
+    callLLM.emit_event("batch_api_collected", batch=batch_id, status=batch.status, ok=ok, failed=failed)
+    print(f"📥 批量任务 {batch_id} ({batch.status}): 成功 {ok}，失败 {failed}")
+    return ok, failed
+
+
+def run(paths):
+    """
+    提交、等待并收集结果
+    """
+    client = get_client()
+    for batch_id in submit(paths):
+        wait(batch_id, client)
+        collect(batch_id, client)
+
+
+if __name__ == "__main__":
+    # python llmBatch.py run [PDF文件或目录...]      提交并等待完成后写回结果（默认 ./data/）
+    # python llmBatch.py submit [PDF文件或目录...]   只提交，输出任务 ID
+    # python llmBatch.py status|wait|collect <任务ID>
+    command = sys.argv[1] if len(sys.argv) > 1 else "run"
+    args = sys.argv[2:]
+    if not BATCH_API_BASE_URL:
+        print("错误: 未设置 BATCH_API_BASE_URL")
+        sys.exit(1)
+    if command in ("run", "submit"):
+        (run if command == "run" else submit)(args or ["./data/"])
+    elif command == "status":
+        batch = get_client().batches.retrieve(args[0])
+        print(json.dumps(batch.model_dump(), ensure_ascii=False, indent=2))
+    elif command == "wait":
+        wait(args[0])
+    elif command == "collect":
+        collect(args[0])
+    else:
+        print(f"未知命令: {command}")
+        sys.exit(1)
@@ -0,0 +1,151 @@
+import os
+import sys
+import time
+import json
+import sqlite3
+import hashlib
+from pathlib import Path
+from contextlib import contextmanager
+
+# LLM 分析结果缓存：按 (PDF 内容哈希, 提示词, 提供商, 模型) 缓存模型输出，
+# 总大小超过上限时按最近最少使用淘汰，可选过期时间
+CACHE_PATH = Path(os.getenv("LLM_CACHE_PATH", Path(__file__).resolve().parent / "cache" / "llm_cache.db"))
+CACHE_MAX_BYTES = int(float(os.getenv("LLM_CACHE_MAX_MB", "200")) * 1024 * 1024)
+CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "0"))
+CACHE_ENABLED = os.getenv("LLM_CACHE", "1") == "1"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    provider TEXT,
+    model TEXT,
+    result TEXT,
+    size INTEGER,
+    created_at REAL,
+    accessed_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER
+);
+"""
+# 已建表的数据库路径
+_schema_ready = set()
+
+
+def connect():
+    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    ready = CACHE_PATH in _schema_ready and CACHE_PATH.exists()
+    conn = sqlite3.connect(CACHE_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    if not ready:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        _schema_ready.add(CACHE_PATH)
+    return conn
+
+
+@contextmanager
+def transaction():
+    """
+    打开一个连接，退出时提交（出错时回滚）并关闭
+    """
+    conn = connect()
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def make_key(pdf_sha256, prompt, provider, model):
+    return hashlib.sha256(json.dumps([pdf_sha256, prompt, provider, model], ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _count(conn, name, n=1):
+    conn.execute(
+        "INSERT INTO counters (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+        (name, n),
+    )
+
+
+def get(key):
+    """
+    查找缓存结果，命中时更新访问时间；过期条目视为未命中并删除
+    """
+    if not CACHE_ENABLED:
+        return None
+    now = time.time()
+    with transaction() as conn:
+        row = conn.execute("SELECT result, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row and CACHE_TTL and now - row["created_at"] > CACHE_TTL:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            _count(conn, "expired")
+            row = None
+        if row is None:
+            _count(conn, "misses")
+            return None
+        conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        _count(conn, "hits")
+        return row["result"]
+
+
+def put(key, result, provider=None, model=None):
+    """
+    写入缓存，并按最近最少使用淘汰直到总大小不超过上限
+    """
+    if not CACHE_ENABLED or not result:
+        return
+    now = time.time()
+    size = len(result.encode("utf-8"))
+    with transaction() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, provider, model, result, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, provider, model, result, size, now, now),
+        )
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        evicted = 0
+        for row in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            if total <= CACHE_MAX_BYTES:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (row["key"],))
+            total -= row["size"]
+            evicted += 1
+        if evicted:
+            _count(conn, "evictions", evicted)
+
+
+def stats():
+    """
+    返回缓存条目数、总大小和命中/未命中/淘汰计数
+    """
+    with transaction() as conn:
+        entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        counters = {row["name"]: row["value"] for row in conn.execute("SELECT name, value FROM counters")}
+    hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+    return {
+        "entries": entries,
+        "bytes": size,
+        "hits": hits,
+        "misses": misses,
+        "expired": counters.get("expired", 0),
+        "evictions": counters.get("evictions", 0),
+        "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+    }
+
+
+def clear():
+    with transaction() as conn:
+        conn.execute("DELETE FROM responses")
+        conn.execute("DELETE FROM counters")
+
+
+if __name__ == "__main__":
+    # python llmCache.py stats | clear
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "clear":
+        clear()
+        print("已清空LLM结果缓存")
+    else:
+        print(json.dumps(stats(), ensure_ascii=False, indent=2))
@@ -0,0 +1,379 @@
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+from pathlib import Path
+import httpx
+import google.generativeai as genai
+from openai import OpenAI
+import pdfStore
+import metrics
+import docChunker
+
+# LLM 提供商：统一的调用接口和注册表，新增提供商只需继承 Provider 并用 @register 注册
+
+# 连接池大小：同一提供商的所有并发请求共用一个 HTTP 客户端
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "20"))
+LLM_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "600"))
+
+# Gemini 文件上传：处理状态轮询间隔（秒）按指数退避，已上传文件按内容哈希登记以便复用
+GEMINI_POLL_INITIAL = float(os.getenv("GEMINI_POLL_INITIAL", "0.5"))
+GEMINI_POLL_MAX = float(os.getenv("GEMINI_POLL_MAX", "8"))
+GEMINI_UPLOAD_TIMEOUT = float(os.getenv("GEMINI_UPLOAD_TIMEOUT", "600"))
+GEMINI_UPLOADS_PATH = Path(os.getenv("GEMINI_UPLOADS_PATH", Path(__file__).resolve().parent / "cache" / "gemini_uploads.json"))
+# Gemini 上传的文件保存 48 小时；复用时至少保留 10 分钟余量
+GEMINI_DEFAULT_TTL = 47 * 3600
+GEMINI_EXPIRY_MARGIN = 600
+
+PROVIDERS = {}
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def register(name):
+    """
+    注册提供商类的装饰器
+    """
+    def decorator(cls):
+        cls.name = name
+        PROVIDERS[name] = cls
+        return cls
+    return decorator
+
+
+def get_provider(name):
+    """
+    返回提供商实例（进程内只创建一次，复用其中的 API 客户端），未注册的名称返回 None
+    """
+    with _instances_lock:
+        if name not in _instances and name in PROVIDERS:
+            _instances[name] = PROVIDERS[name]()
+        return _instances.get(name)
+
+
+def is_rate_limit_error(e):
+    """
+    判断异常是否为提供商的限流错误：按 HTTP 状态码（429）或异常类型判断，不匹配错误信息中的文字
+    """
+    if getattr(e, "status_code", None) == 429 or getattr(e, "code", None) == 429:
+        return True
+    response = getattr(e, "response", None)
+    if getattr(response, "status_code", None) == 429:
+        return True
+    return type(e).__name__ in ("RateLimitError", "ResourceExhausted", "TooManyRequests")
+
+
+def call_with_retries(call, retries=0):
+    """
+    调用 call()；retries 大于 0 时遇到限流按指数退避（带随机抖动）重试
+    """
+    for attempt in range(retries + 1):
+        try:
+            return call()
+        except Exception as e:
+            if not is_rate_limit_error(e) or attempt == retries:
+                raise
+            time.sleep(2 ** attempt + random.random())
+
+
+class Provider:
+    """
+    提供商基类：accepts_pdf 为 True 的提供商直接接收 PDF 文件，否则由调用方提取文本后通过 generate 发送
+    """
+    name = None
+    api_key_env = None
+    model_env = None
+    default_model = None
+    accepts_pdf = False
+
+    def __init__(self):
+        self.model_name = os.getenv(self.model_env, self.default_model) if self.model_env else self.default_model
+
+    @property
+    def api_key(self):
+        return os.getenv(self.api_key_env) if self.api_key_env else None
+
+    def is_configured(self):
+        return not self.api_key_env or bool(self.api_key)
+
+    def generate(self, system_prompt, prompt, retries=0, stream=True):
+        """
+        发送文本提示词，逐段产出生成的文本；stream 为 False 时一次产出完整文本
+        """
+        raise NotImplementedError
+
+    def generate_pdf(self, prompt, pdf_path, stream=True):
+        """
+        直接发送 PDF 文件和提示词，逐段产出生成的文本
+        """
+        raise NotImplementedError
+
+    def chat(self, system_prompt, prompt, retries=0):
+        return "".join(self.generate(system_prompt, prompt, retries, stream=False))
+
+    def record_usage(self, prompt_tokens, completion_tokens):
+        """
+        记录一次请求的 token 用量（按提供商汇总到本次运行的指标中）
+        """
+        labels = {"provider": self.name}
+        metrics.count("llm_prompt_tokens", prompt_tokens or 0, labels=labels)
+        metrics.count("llm_completion_tokens", completion_tokens or 0, labels=labels)
+
+
+class OpenAICompatibleProvider(Provider):
+    """
+    OpenAI 兼容接口的提供商，使用带连接池的 HTTP 客户端
+    """
+    base_url = None
+
+    def __init__(self):
+        super().__init__()
+        self.client = OpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            http_client=httpx.Client(
+                timeout=LLM_HTTP_TIMEOUT,
+                limits=httpx.Limits(max_connections=LLM_HTTP_MAX_CONNECTIONS, max_keepalive_connections=LLM_HTTP_MAX_CONNECTIONS),
+            ),
+        )
+
+    def _create(self, system_prompt, prompt, retries=0, stream=False):
+        """
+        发起对话请求；retries 大于 0 时遇到限流会在本次调用内退避重试
+        """
+        return call_with_retries(lambda: self.client.chat.completions.create(
+            model=self.model_name,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            stream=stream,
+            # 流式响应的最后一个片段附带本次请求的 token 用量
+            **({"stream_options": {"include_usage": True}} if stream else {})
+        ), retries)
+
+    def generate(self, system_prompt, prompt, retries=0, stream=True):
+        if not stream:
+            response = self._create(system_prompt, prompt, retries)
+            if response.usage:
+                self.record_usage(response.usage.prompt_tokens, response.usage.completion_tokens)
+            yield response.choices[0].message.content
+            return
+        for chunk in self._create(system_prompt, prompt, retries, stream=True):
+            if getattr(chunk, "usage", None):
+                self.record_usage(chunk.usage.prompt_tokens, chunk.usage.completion_tokens)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+@register("deepseek")
+class DeepSeekProvider(OpenAICompatibleProvider):
+    api_key_env = "DEEPSEEK_API_KEY"
+    model_env = "DEEPSEEK_MODEL_NAME"
+    default_model = "deepseek-chat"
+    base_url = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
+
+
+@register("gemini")
+class GeminiProvider(Provider):
+    api_key_env = "GEMINI_API_KEY"
+    model_env = "GEMINI_MODEL_NAME"
+    default_model = "gemini-2.0-flash"
+    accepts_pdf = True
+
+    def __init__(self):
+        super().__init__()
+        if self.api_key:
+            genai.configure(api_key=self.api_key)
+        self.model = genai.GenerativeModel(self.model_name)
+        self._uploads_lock = threading.Lock()
+        # 内容哈希 → [锁, 等待或持有该锁的线程数]，没有线程使用时删除，常驻进程中不会越积越多
+        self._file_locks = {}
+
+    def generate(self, system_prompt, prompt, retries=0, stream=True):
+        # retries 大于 0 时遇到限流（ResourceExhausted）在本次调用内退避重试
+        response = call_with_retries(lambda: self.model.generate_content(f"{system_prompt}\n\n{prompt}", stream=stream), retries)
+        yield from self._iter_text(response, stream)
+        self._record_response_usage(response)
+
+    def generate_pdf(self, prompt, pdf_path, stream=True):
+        # 上传 PDF 文件（相同内容且未过期的上传直接复用）
+        pdf_file = self.get_or_upload_file(pdf_path)
+        response = self.model.generate_content([prompt, pdf_file], stream=stream)
+        yield from self._iter_text(response, stream)
+        self._record_response_usage(response)
+
+    def _record_response_usage(self, response):
+        # 流式响应在全部片段接收完成后才有完整的 usage_metadata
+        usage = getattr(response, "usage_metadata", None)
+        if usage:
+            self.record_usage(usage.prompt_token_count, usage.candidates_token_count)
+
+    @staticmethod
+    def _iter_text(response, stream):
+        if not stream:
+            yield response.text
+            return
+        for chunk in response:
+            try:
+                yield chunk.text
+            except ValueError:
+                # 没有文本内容的片段（例如只包含结束原因）
+                continue
+
+    def wait_for_file(self, pdf_file):
+        """
+        等待上传的文件处理完成：首次间隔很短，之后按指数退避，避免固定长时间等待
+        """
+        interval = GEMINI_POLL_INITIAL
+        deadline = time.monotonic() + GEMINI_UPLOAD_TIMEOUT
+        while pdf_file.state.name == "PROCESSING":
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"PDF 文件处理超时: {pdf_file.name}")
+            print(".", end="", flush=True)
+            time.sleep(interval)
+            interval = min(interval * 2, GEMINI_POLL_MAX)
+            pdf_file = genai.get_file(pdf_file.name)
+
+        if pdf_file.state.name == "FAILED":
+            raise ValueError("PDF 文件处理失败")
+        return pdf_file
+
+    def _load_uploads(self):
+        if GEMINI_UPLOADS_PATH.exists():
+            try:
+                return json.loads(GEMINI_UPLOADS_PATH.read_text(encoding='utf-8'))
+            except ValueError:
+                return {}
+        return {}
+
+    def _save_upload(self, sha256, pdf_file):
+        """
+        记录 PDF 哈希与已上传文件的对应关系及过期时间
+        """
+        expiration = getattr(pdf_file, "expiration_time", None)
+        expires_at = expiration.timestamp() if expiration else time.time() + GEMINI_DEFAULT_TTL
+        with self._uploads_lock:
+            uploads = self._load_uploads()
+            # 顺便清理已过期的记录
+            uploads = {k: v for k, v in uploads.items() if v["expires_at"] > time.time()}
+            uploads[sha256] = {"name": pdf_file.name, "expires_at": expires_at}
+            GEMINI_UPLOADS_PATH.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = GEMINI_UPLOADS_PATH.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(uploads, ensure_ascii=False, indent=2), encoding='utf-8')
+            os.replace(tmp_path, GEMINI_UPLOADS_PATH)
+
+    def get_or_upload_file(self, pdf_path):
+        """
+        返回可用于生成内容的 Gemini 文件：同一内容未过期的上传直接复用，否则重新上传；
+        同一内容的并发上传只进行一次
+        """
+        sha256 = pdfStore.hash_file(pdf_path).hexdigest()
+        with self._uploads_lock:
+            entry = self._file_locks.setdefault(sha256, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                return self._get_or_upload_file(pdf_path, sha256)
+        finally:
+            with self._uploads_lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._file_locks[sha256]
+
+    def _get_or_upload_file(self, pdf_path, sha256):
+        with self._uploads_lock:
+            entry = self._load_uploads().get(sha256)
+        # 留出余量，避免分析过程中文件过期
+        if entry and entry["expires_at"] - GEMINI_EXPIRY_MARGIN > time.time():
+            try:
+                pdf_file = self.wait_for_file(genai.get_file(entry["name"]))
+                print(f"♻️ 复用已上传的 PDF 文件: {entry['name']}")
+                return pdf_file
+            except Exception as e:
+                print(f"已上传的文件不可用，重新上传: {e}")
+
+        print("正在上传和处理 PDF 文件...")
+        pdf_file = genai.upload_file(path=pdf_path, display_name="Analysis Document")
+        pdf_file = self.wait_for_file(pdf_file)
+        self._save_upload(sha256, pdf_file)
+        print("\n✅ PDF 文件上传完成")
+        return pdf_file
+
+
+class MockRateLimitError(Exception):
+    status_code = 429
+
+
+@register("mock")
+class MockProvider(Provider):
+    """
+    本地模拟提供商：不调用任何接口，按配置的延迟、错误率和限流率返回结果；
+    同一提示词第 n 次调用的结果由 (种子, 提示词, n) 决定，便于复现压测结果
+    """
+    default_model = "mock"
+    model_env = "MOCK_LLM_MODEL_NAME"
+
+    def __init__(self):
+        super().__init__()
+        # 平均耗时（秒）及上下浮动比例
+        self.latency = float(os.getenv("MOCK_LLM_LATENCY", "1.0"))
+        self.jitter = float(os.getenv("MOCK_LLM_JITTER", "0.5"))
+        # 首段内容前的等待占总耗时的比例
+        self.first_token_ratio = float(os.getenv("MOCK_LLM_FIRST_TOKEN_RATIO", "0.3"))
+        self.error_rate = float(os.getenv("MOCK_LLM_ERROR_RATE", "0"))
+        self.rate_limit_rate = float(os.getenv("MOCK_LLM_429_RATE", "0"))
+        self.chunks = int(os.getenv("MOCK_LLM_CHUNKS", "20"))
+        self.seed = os.getenv("MOCK_LLM_SEED", "0")
+        self._calls = {}
+        self._calls_lock = threading.Lock()
+
+    def reset(self):
+        """
+        清空调用计数，使下一轮压测得到与上一轮相同的结果序列
+        """
+        with self._calls_lock:
+            self._calls.clear()
+
+    def _rng(self, prompt):
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        with self._calls_lock:
+            n = self._calls.get(digest, 0)
+            self._calls[digest] = n + 1
+        return random.Random(f"{self.seed}:{digest}:{n}"), digest
+
+    def generate(self, system_prompt, prompt, retries=0, stream=True):
+        for attempt in range(retries + 1):
+            rng, digest = self._rng(prompt)
+            roll = rng.random()
+            if roll < self.rate_limit_rate:
+                time.sleep(self.latency * 0.05)
+                if attempt == retries:
+                    raise MockRateLimitError("429 模拟的限流错误")
+                time.sleep(2 ** attempt * 0.01)
+                continue
+            break
+        if roll < self.rate_limit_rate + self.error_rate:
+            time.sleep(self.latency * 0.1)
+            raise RuntimeError("模拟的接口错误")
+
+        total = max(0.0, self.latency * (1 + self.jitter * (rng.random() * 2 - 1)))
+        text = (
+            f"## 公告编号\nMOCK-{digest[:8]}\n\n## 公告日期\n2024-01-01\n\n## 文档摘要\n模拟分析结果（提示词 {len(prompt)} 字）\n\n"
+            "## 关键信息\n- 要点1\n- 要点2\n- 要点3\n\n## 详细内容\n模拟提供商返回的内容\n"
+        )
+        time.sleep(total * self.first_token_ratio)
+        # 模拟提供商没有真实的计费，按字符数估算 token 用量
+        self.record_usage(docChunker.estimate_tokens(system_prompt + prompt), docChunker.estimate_tokens(text))
+        if not stream:
+            time.sleep(total * (1 - self.first_token_ratio))
+            yield text
+            return
+        step = -(-len(text) // max(1, self.chunks))
+        pieces = [text[i:i + step] for i in range(0, len(text), step)]
+        for i, piece in enumerate(pieces):
+            if i:
+                time.sleep(total * (1 - self.first_token_ratio) / max(1, len(pieces) - 1))
+            yield piece
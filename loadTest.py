@@ -0,0 +1,173 @@
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+
+# 压测工具：用本地模拟提供商（LLM_PROVIDER=mock）驱动完整的分析流程（读取 PDF、调度、流式写入结果），
+# 比较不同并发数下的吞吐量和延迟分位数，不消耗任何 token：
+#   python loadTest.py --files 100 --concurrency 1,4,16 --latency 0.5 --rate-limit-rate 0.05
+# 模块级配置在导入 callLLM 之前设置，结果缓存和清单使用临时目录，避免命中已有结果
+
+
+def make_pdf(pages):
+    """
+    生成一个简单的文本 PDF，pages 为每页的文本行列表（仅支持 ASCII 字符）
+    """
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(len(pages)))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>")
+    font = 3 + 2 * len(pages)
+    for i, lines in enumerate(pages):
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 {font} 0 R >> >> /Contents {4 + 2 * i} 0 R >>"
+        )
+        body = "BT /F1 12 Tf 14 TL 50 750 Td " + " ".join(f"({line}) Tj T*" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(body)} >>\nstream\n{body}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for i, obj in enumerate(objects):
+        offsets.append(len(out))
+        out += f"{i + 1} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += b"".join(f"{offset:010d} 00000 n \n".encode("latin-1") for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return out
+
+
+def generate_pdfs(directory, count, pages):
+    """
+    生成 count 个内容互不相同的 PDF
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for n in range(count):
+        content = [[f"Announcement {n} page {p + 1} line {line}" for line in range(20)] for p in range(pages)]
+        path = directory / f"doc_{n:04d}.pdf"
+        path.write_bytes(make_pdf(content))
+        paths.append(path)
+    return paths
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(q / 100 * len(values) + 0.5) - 1))
+    return round(values[index], 3)
+
+
+def run_level(callLLM, pdf_files, concurrency):
+    """
+    以指定并发数分析所有文件，返回吞吐量和延迟统计
+    """
+    # 每个并发级别使用新的调度器，模拟提供商从相同的结果序列开始
+    callLLM.reset_schedulers()
+    callLLM.get_provider("mock").reset()
+    batch_start = time.monotonic()
+    service = []
+    completion = []
+
+    def analyze(pdf_path):
+        start = time.monotonic()
+        result = callLLM.call_llm_analyze_pdf(pdf_path, force=True)
+        end = time.monotonic()
+        service.append(end - start)
+        completion.append(end - batch_start)
+        return result
+
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        results = callLLM.analyze_pdf_files(pdf_files, concurrency=concurrency, analyze=analyze)
+    wall = time.monotonic() - batch_start
+    ok = sum(1 for result in results.values() if result)
+    return {
+        "concurrency": concurrency,
+        "files": len(pdf_files),
+        "ok": ok,
+        "failed": len(pdf_files) - ok,
+        "wall_seconds": round(wall, 3),
+        "throughput_per_second": round(len(pdf_files) / wall, 3) if wall else None,
+        "latency_seconds": {q: percentile(service, int(q[1:])) for q in ("p50", "p95", "p99")},
+        "completion_seconds": {
+            "first": percentile(completion, 0),
+            "mean": round(sum(completion) / len(completion), 3) if completion else None,
+            "p99": percentile(completion, 99),
+        },
+        "final_concurrency_limit": callLLM.get_scheduler("mock", concurrency).limit,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="使用模拟提供商压测分析流程")
+    parser.add_argument("--files", type=int, default=50, help="生成的 PDF 数量")
+    parser.add_argument("--pages", type=int, default=2, help="每个 PDF 的页数")
+    parser.add_argument("--dir", help="使用已有目录中的 PDF，而不是生成")
+    parser.add_argument("--concurrency", default="1,4,16", help="逗号分隔的并发数列表")
+    parser.add_argument("--latency", type=float, default=0.5, help="模拟的平均响应时间（秒）")
+    parser.add_argument("--jitter", type=float, default=0.5, help="响应时间上下浮动比例")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="模拟的接口错误比例")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="模拟的 429 比例")
+    parser.add_argument("--seed", default="0", help="随机种子，相同种子结果可复现")
+    parser.add_argument("--output", help="把 JSON 报告写入文件")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="loadtest_"))
+    os.environ.update({
+        "LLM_PROVIDER": "mock",
+        "LLM_CACHE": "0",
+        # 生成的文档内容相近，关闭近似重复检测，保证每个文件都调用一次提供商
+        "LLM_DEDUP": "0",
+        "MANIFEST_PATH": str(workdir / "manifest.db"),
+        "PDF_TEXT_CACHE_DIR": str(workdir / "text"),
+        "MOCK_LLM_LATENCY": str(args.latency),
+        "MOCK_LLM_JITTER": str(args.jitter),
+        "MOCK_LLM_ERROR_RATE": str(args.error_rate),
+        "MOCK_LLM_429_RATE": str(args.rate_limit_rate),
+        "MOCK_LLM_SEED": args.seed,
+    })
+    pdf_dir = Path(args.dir).resolve() if args.dir else None
+    # 相对路径按调用时的目录解析（之后会切换到临时目录）
+    output = Path(args.output).resolve() if args.output else None
+    # 结果写入临时目录下的 data/
+    os.chdir(workdir)
+    import callLLM
+
+    if pdf_dir:
+        pdf_files = sorted(list(pdf_dir.glob("*.pdf")) + list(pdf_dir.glob("*.PDF")))
+    else:
+        pdf_files = generate_pdfs(workdir / "data", args.files, args.pages)
+
+    report = {
+        "provider": "mock",
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "error_rate": args.error_rate,
+        "rate_limit_rate": args.rate_limit_rate,
+        "workdir": str(workdir),
+        "levels": [],
+    }
+    for concurrency in (int(c) for c in args.concurrency.split(",")):
+        level = run_level(callLLM, pdf_files, concurrency)
+        report["levels"].append(level)
+        print(
+            f"并发 {concurrency:>3}: 吞吐 {level['throughput_per_second']}/秒，"
+            f"p50 {level['latency_seconds']['p50']}s p95 {level['latency_seconds']['p95']}s p99 {level['latency_seconds']['p99']}s，"
+            f"失败 {level['failed']}",
+            file=sys.stderr,
+        )
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if output:
+        output.write_text(text, encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
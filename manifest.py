@@ -0,0 +1,155 @@
+import os
+import time
+import json
+import sqlite3
+import hashlib
+from pathlib import Path
+from contextlib import contextmanager
+from urllib.parse import urlparse, parse_qs
+
+# 流水线清单：按公告 href 记录每个阶段（列表、下载、分析）的状态，重复运行时跳过已完成的条目
+MANIFEST_PATH = Path(os.getenv("MANIFEST_PATH", Path(__file__).resolve().parent / "manifest.db"))
+
+# 设置 PIPELINE_FORCE=1 时忽略清单，所有条目重新处理
+FORCE = os.getenv("PIPELINE_FORCE", "0") == "1"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS announcements (
+    href TEXT PRIMARY KEY,
+    announcement_id TEXT,
+    title TEXT,
+    announcement_time TEXT,
+    listed_at REAL,
+    pdf_sha256 TEXT,
+    download_status TEXT,
+    downloaded_at REAL,
+    analysis_status TEXT,
+    analysis_sha256 TEXT,
+    analysis_key TEXT,
+    analysis_output TEXT,
+    analysis_result TEXT,
+    analyzed_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_announcements_sha256 ON announcements (pdf_sha256);
+"""
+# 已建表的数据库路径
+_schema_ready = set()
+
+
+def connect():
+    """
+    打开清单数据库（WAL 模式，允许多个进程同时读写）；建表只在进程内第一次打开时执行
+    """
+    MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    ready = MANIFEST_PATH in _schema_ready and MANIFEST_PATH.exists()
+    conn = sqlite3.connect(MANIFEST_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    if not ready:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        _schema_ready.add(MANIFEST_PATH)
+    return conn
+
+
+@contextmanager
+def transaction():
+    """
+    打开一个连接，退出时提交（出错时回滚）并关闭
+    """
+    conn = connect()
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def announcement_id(href):
+    """
+    从公告详情链接中解析 announcementId
+    """
+    values = parse_qs(urlparse(href).query).get("announcementId")
+    return values[0] if values else None
+
+
+def analysis_key(*parts):
+    """
+    计算分析结果的键（提示词、提供商、模型等任一变化都会导致重新分析）
+    """
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def get(href):
+    with transaction() as conn:
+        row = conn.execute("SELECT * FROM announcements WHERE href = ?", (href,)).fetchone()
+    return dict(row) if row else None
+
+
+def record_listing(titles, hrefs, times=None):
+    """
+    登记列表阶段抓取到的公告，返回每条是否为新公告
+    """
+    times = times or [None] * len(hrefs)
+    now = time.time()
+    is_new = []
+    with transaction() as conn:
+        for title, href, when in zip(titles, hrefs, times):
+            exists = conn.execute("SELECT 1 FROM announcements WHERE href = ?", (href,)).fetchone()
+            is_new.append(exists is None)
+            conn.execute(
+                """
+                INSERT INTO announcements (href, announcement_id, title, announcement_time, listed_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(href) DO UPDATE SET
+                    title = excluded.title,
+                    announcement_time = COALESCE(excluded.announcement_time, announcement_time),
+                    listed_at = excluded.listed_at
+                """,
+                (href, announcement_id(href), title, when, now),
+            )
+    return is_new
+
+
+def downloaded_sha256(href):
+    """
+    返回已成功下载的公告的 sha256，未下载或强制刷新时返回 None
+    """
+    if FORCE:
+        return None
+    row = get(href)
+    if row and row["download_status"] == "done":
+        return row["pdf_sha256"]
+    return None
+
+
+def record_download(href, sha256, title=None):
+    status = "done" if sha256 else "failed"
+    with transaction() as conn:
+        conn.execute(
+            """
+            INSERT INTO announcements (href, announcement_id, title, pdf_sha256, download_status, downloaded_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(href) DO UPDATE SET
+                pdf_sha256 = COALESCE(excluded.pdf_sha256, pdf_sha256),
+                download_status = excluded.download_status,
+                downloaded_at = excluded.downloaded_at
+            """,
+            (href, announcement_id(href), title, sha256, status, time.time()),
+        )
+
+
+def record_analysis(sha256, key, output_path, result):
+    """
+    记录分析结果，更新所有内容为该 sha256 的公告
+    """
+    status = "done" if result else "failed"
+    with transaction() as conn:
+        conn.execute(
+            """
+            UPDATE announcements SET
+                analysis_status = ?, analysis_sha256 = ?, analysis_key = ?,
+                analysis_output = ?, analysis_result = ?, analyzed_at = ?
+            WHERE pdf_sha256 = ?
+            """,
+            (status, sha256, key, str(output_path), result, time.time(), sha256),
+        )
@@ -0,0 +1,225 @@
+import os
+import sys
+import json
+import time
+import threading
+import contextlib
+from pathlib import Path
+
+# 结构化计时和计数：每次测量以 {"event": "metric", ...} JSON 行输出（server.js 转发到前端），
+# 同时按名称和标签汇总，运行结束时输出 run_summary 事件，并可写入 Prometheus 文本格式的文件
+METRICS_EVENTS = os.getenv("METRICS_EVENTS", "1") == "1"
+# 设置后每次汇总写入 <目录>/<脚本名>.prom，可由 node_exporter 的 textfile collector 采集
+METRICS_PROMETHEUS_DIR = os.getenv("METRICS_PROMETHEUS_DIR")
+METRICS_PREFIX = "cninfo_"
+
+# 事件本身使用的字段，调用方传入的字段不能与之同名
+RESERVED_FIELDS = ("event", "name", "value", "seconds")
+
+_stdout_lock = threading.Lock()
+
+
+def emit(event, /, **fields):
+    """
+    以 JSON 行的形式输出结构化事件，server.js 会将其转发到前端；fields 中不能有 event 字段
+    """
+    if "event" in fields:
+        raise ValueError("事件字段不能命名为 event")
+    line = json.dumps({"event": event, **fields}, ensure_ascii=False)
+    with _stdout_lock:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+
+class Registry:
+    """
+    进程内的指标汇总：计数器和耗时分布，按 (名称, 标签) 区分
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.counters = {}
+        self.timings = {}
+
+    def count(self, name, value=1, labels=None):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, labels=None):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self.lock:
+            self.timings.setdefault(key, []).append(seconds)
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.counters.clear()
+            self.timings.clear()
+
+
+registry = Registry()
+
+
+def _label_text(labels):
+    return ",".join(f"{k}={v}" for k, v in labels)
+
+
+def _quantile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _event_fields(labels, fields):
+    """
+    合并标签和附加字段；与保留字段重名或标签和字段重名时抛出 ValueError，而不是在输出事件时出错
+    """
+    labels = labels or {}
+    clashes = sorted(set(RESERVED_FIELDS) & (set(labels) | set(fields)) | set(labels) & set(fields))
+    if clashes:
+        raise ValueError(f"指标字段与保留字段或标签重名: {', '.join(clashes)}")
+    return {**labels, **fields}
+
+
+def count(name, value=1, /, labels=None, **fields):
+    """
+    计数器加 value；fields 只出现在事件中，不参与汇总，不能使用 RESERVED_FIELDS 中的名称
+    """
+    extra = _event_fields(labels, fields)
+    registry.count(name, value, labels)
+    if METRICS_EVENTS:
+        emit("metric", name=name, value=value, **extra)
+
+
+def observe(name, seconds, /, labels=None, **fields):
+    """
+    记录一次耗时（秒），fields 的要求同 count
+    """
+    extra = _event_fields(labels, fields)
+    registry.observe(name, seconds, labels)
+    if METRICS_EVENTS:
+        emit("metric", name=name, seconds=round(seconds, 4), **extra)
+
+
+class _TimerFields(dict):
+    """
+    timer 块内使用的字段：写入时立即检查是否与保留字段或标签重名，
+    不会等到块结束时才抛出 ValueError（那时可能掩盖块内原本的异常）
+    """
+
+    def __init__(self, labels, fields):
+        self.labels = labels or {}
+        _event_fields(self.labels, fields)
+        super().__init__(fields)
+
+    def __setitem__(self, key, value):
+        _event_fields(self.labels, {key: value})
+        super().__setitem__(key, value)
+
+    def update(self, *args, **kwargs):
+        fields = dict(*args, **kwargs)
+        _event_fields(self.labels, fields)
+        super().update(fields)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+
+@contextlib.contextmanager
+def timer(name, /, labels=None, **fields):
+    """
+    计时上下文：with timer("download", file=...) as m: ... m["bytes"] = n
+    块内写入 m 的字段会随事件一起输出（与保留字段或标签重名时写入即抛出 ValueError）；块内抛出异常时事件带上 error 字段
+    """
+    extra = _TimerFields(labels, fields)
+    start = time.perf_counter()
+    try:
+        yield extra
+    except BaseException as e:
+        if "error" not in extra.labels:
+            dict.__setitem__(extra, "error", type(e).__name__)
+        raise
+    finally:
+        observe(name, time.perf_counter() - start, labels, **extra)
+
+
+def summary():
+    """
+    汇总本进程的计数器和各阶段耗时（次数、总计、平均、p50/p95、最大值）
+    """
+    with registry.lock:
+        counters = dict(registry.counters)
+        timings = {key: list(values) for key, values in registry.timings.items()}
+    stages = {}
+    for (name, labels), values in sorted(timings.items()):
+        key = f"{name}{{{_label_text(labels)}}}" if labels else name
+        stages[key] = {
+            "count": len(values),
+            "total_seconds": round(sum(values), 3),
+            "mean_seconds": round(sum(values) / len(values), 4),
+            "p50_seconds": round(_quantile(values, 0.5), 4),
+            "p95_seconds": round(_quantile(values, 0.95), 4),
+            "max_seconds": round(max(values), 4),
+        }
+    return {
+        "elapsed_seconds": round(time.time() - registry.started, 3),
+        "stages": stages,
+        "counters": {
+            (f"{name}{{{_label_text(labels)}}}" if labels else name): value
+            for (name, labels), value in sorted(counters.items())
+        },
+    }
+
+
+def prometheus_text(script=None):
+    """
+    以 Prometheus 文本格式输出所有指标（耗时为 summary 类型，计数器为 counter 类型），
+    指定 script 时每条指标带上 script 标签，便于区分各脚本写出的文件
+    """
+    common = [("script", script)] if script else []
+
+    def fmt_labels(labels, extra=()):
+        items = common + list(labels) + list(extra)
+        if not items:
+            return ""
+        return "{" + ",".join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in items) + "}"
+
+    with registry.lock:
+        counters = dict(registry.counters)
+        timings = {key: list(values) for key, values in registry.timings.items()}
+    lines = []
+    typed = set()
+    for (name, labels), values in sorted(timings.items()):
+        metric = f"{METRICS_PREFIX}{name}_seconds"
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} summary")
+            typed.add(metric)
+        for q in (0.5, 0.95, 0.99):
+            lines.append(f"{metric}{fmt_labels(labels, [('quantile', q)])} {_quantile(values, q):.6f}")
+        lines.append(f"{metric}_sum{fmt_labels(labels)} {sum(values):.6f}")
+        lines.append(f"{metric}_count{fmt_labels(labels)} {len(values)}")
+    for (name, labels), value in sorted(counters.items()):
+        metric = f"{METRICS_PREFIX}{name}_total"
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} counter")
+            typed.add(metric)
+        lines.append(f"{metric}{fmt_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def emit_summary(script, **fields):
+    """
+    输出本次运行的汇总事件；设置了 METRICS_PROMETHEUS_DIR 时同时写入 Prometheus 文本文件
+    """
+    data = summary()
+    emit("run_summary", script=script, **data, **fields)
+    if METRICS_PROMETHEUS_DIR:
+        path = Path(METRICS_PROMETHEUS_DIR) / f"{Path(script).stem}.prom"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + f".{os.getpid()}.tmp")
+        tmp_path.write_text(prometheus_text(Path(script).stem), encoding="utf-8")
+        os.replace(tmp_path, path)
+    return data
@@ -0,0 +1,166 @@
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import threading
+from email.parser import BytesParser
+from email.policy import default
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# 本地模拟的 OpenAI 兼容 Batch API（/v1/files、/v1/batches），用于在不消耗额度的情况下调试 llmBatch.py：
+#   python mockBatchServer.py 8765
+#   BATCH_API_BASE_URL=http://127.0.0.1:8765/v1 BATCH_API_KEY=mock BATCH_MODEL_NAME=mock python llmBatch.py run
+# 任务提交后 MOCK_BATCH_SECONDS 秒完成；custom_id 的哈希落在 MOCK_BATCH_FAIL_RATE 比例内的请求返回错误（结果是确定的）
+MOCK_BATCH_SECONDS = float(os.getenv("MOCK_BATCH_SECONDS", "3"))
+MOCK_BATCH_FAIL_RATE = float(os.getenv("MOCK_BATCH_FAIL_RATE", "0"))
+
+files = {}
+batches = {}
+lock = threading.RLock()
+
+
+def mock_response(request):
+    """
+    按 custom_id 生成确定的模拟结果
+    """
+    custom_id = request["custom_id"]
+    bucket = int(hashlib.sha256(custom_id.encode("utf-8")).hexdigest()[:8], 16) / 0xFFFFFFFF
+    if bucket < MOCK_BATCH_FAIL_RATE:
+        return {"id": f"resp-{custom_id[:12]}", "custom_id": custom_id, "response": {"status_code": 500, "body": {"error": {"message": "mock error"}}}, "error": None}
+    prompt = request["body"]["messages"][-1]["content"]
+    content = (
+        f"## 公告编号\nMOCK-{custom_id[:8]}\n\n## 公告日期\n2024-01-01\n\n## 文档摘要\n模拟分析结果（提示词 {len(prompt)} 字）\n\n"
+        "## 关键信息\n- 要点1\n- 要点2\n- 要点3\n\n## 详细内容\n模拟批量接口返回的内容"
+    )
+    body = {
+        "id": f"chatcmpl-{custom_id[:12]}",
+        "object": "chat.completion",
+        "model": request["body"]["model"],
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": len(prompt), "completion_tokens": len(content), "total_tokens": len(prompt) + len(content)},
+    }
+    return {"id": f"resp-{custom_id[:12]}", "custom_id": custom_id, "response": {"status_code": 200, "body": body}, "error": None}
+
+
+def add_file(content, filename, purpose):
+    with lock:
+        file_id = f"file-{len(files) + 1}"
+        files[file_id] = {"content": content, "filename": filename, "purpose": purpose, "created_at": int(time.time())}
+    return file_object(file_id)
+
+
+def file_object(file_id):
+    entry = files[file_id]
+    return {
+        "id": file_id,
+        "object": "file",
+        "bytes": len(entry["content"]),
+        "created_at": entry["created_at"],
+        "filename": entry["filename"],
+        "purpose": entry["purpose"],
+        "status": "processed",
+    }
+
+
+def batch_object(batch_id):
+    """
+    按提交后经过的时间推进任务状态，完成时一次性生成结果文件
+    """
+    batch = batches[batch_id]
+    elapsed = time.time() - batch["created_at"]
+    if batch["status"] != "completed":
+        batch["status"] = "validating" if elapsed < MOCK_BATCH_SECONDS / 3 else "in_progress"
+        if elapsed >= MOCK_BATCH_SECONDS:
+            lines = files[batch["input_file_id"]]["content"].decode("utf-8").splitlines()
+            results = [mock_response(json.loads(line)) for line in lines if line.strip()]
+            ok = [r for r in results if r["response"]["status_code"] == 200]
+            failed = [r for r in results if r["response"]["status_code"] != 200]
+            output = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in ok).encode("utf-8")
+            batch["output_file_id"] = add_file(output, f"{batch_id}_output.jsonl", "batch_output")["id"]
+            if failed:
+                errors = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in failed).encode("utf-8")
+                batch["error_file_id"] = add_file(errors, f"{batch_id}_error.jsonl", "batch_output")["id"]
+            batch["request_counts"] = {"total": len(results), "completed": len(ok), "failed": len(failed)}
+            batch["status"] = "completed"
+            batch["completed_at"] = int(time.time())
+    return {
+        "id": batch_id,
+        "object": "batch",
+        "endpoint": batch["endpoint"],
+        "completion_window": batch["completion_window"],
+        "input_file_id": batch["input_file_id"],
+        "output_file_id": batch.get("output_file_id"),
+        "error_file_id": batch.get("error_file_id"),
+        "status": batch["status"],
+        "created_at": int(batch["created_at"]),
+        "completed_at": batch.get("completed_at"),
+        "request_counts": batch.get("request_counts", {"total": 0, "completed": 0, "failed": 0}),
+    }
+
+
+class Handler(BaseHTTPRequestHandler):
+    def send_json(self, data, status=200):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_POST(self):
+        if self.path == "/v1/files":
+            # multipart/form-data: file + purpose
+            message = BytesParser(policy=default).parsebytes(
+                f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8") + self.read_body()
+            )
+            fields = {part.get_param("name", header="content-disposition"): part for part in message.iter_parts()}
+            upload = fields["file"]
+            purpose = fields["purpose"].get_content().strip() if "purpose" in fields else "batch"
+            self.send_json(add_file(upload.get_payload(decode=True), upload.get_filename(), purpose))
+        elif self.path == "/v1/batches":
+            data = json.loads(self.read_body())
+            if data.get("input_file_id") not in files:
+                self.send_json({"error": {"message": "input file not found"}}, 404)
+                return
+            with lock:
+                batch_id = f"batch_{len(batches) + 1}"
+                batches[batch_id] = {
+                    "endpoint": data.get("endpoint"),
+                    "completion_window": data.get("completion_window", "24h"),
+                    "input_file_id": data["input_file_id"],
+                    "status": "validating",
+                    "created_at": time.time(),
+                }
+                self.send_json(batch_object(batch_id))
+        else:
+            self.send_json({"error": {"message": "not found"}}, 404)
+
+    def do_GET(self):
+        batch_match = re.fullmatch(r"/v1/batches/([\w-]+)", self.path)
+        content_match = re.fullmatch(r"/v1/files/([\w-]+)/content", self.path)
+        if batch_match and batch_match.group(1) in batches:
+            with lock:
+                self.send_json(batch_object(batch_match.group(1)))
+        elif content_match and content_match.group(1) in files:
+            body = files[content_match.group(1)]["content"]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_json({"error": {"message": "not found"}}, 404)
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    print(f"模拟 Batch API 已启动: http://127.0.0.1:{port}/v1")
+    ThreadingHTTPServer(("127.0.0.1", port), Handler).serve_forever()
@@ -0,0 +1,83 @@
+import os
+import hashlib
+import shutil
+from pathlib import Path
+
+# 内容寻址存储目录：所有 PDF 按 sha256 保存一份，downloads/ 中的文件只是指向它的硬链接
+STORE_DIR = Path(os.getenv("PDF_STORE_DIR", Path(__file__).resolve().parent / "pdf_store"))
+OBJECTS_DIR = STORE_DIR / "objects"
+PARTIAL_DIR = STORE_DIR / "partial"
+
+CHUNK_SIZE = 64 * 1024
+
+
+def object_path(sha256):
+    """
+    返回指定哈希值在存储中的路径（按前两位分目录）
+    """
+    return OBJECTS_DIR / sha256[:2] / f"{sha256}.pdf"
+
+
+def partial_path(url):
+    """
+    返回某个下载地址对应的未完成文件路径，用于断点续传
+    """
+    PARTIAL_DIR.mkdir(parents=True, exist_ok=True)
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    return PARTIAL_DIR / f"{key}.part"
+
+
+def hash_file(path, hasher=None):
+    """
+    分块计算文件的 sha256，可传入已有的 hasher 继续累加
+    """
+    hasher = hasher or hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher
+
+
+def has_object(sha256):
+    return bool(sha256) and object_path(sha256).exists()
+
+
+def put_file(src, sha256):
+    """
+    将已下载完成的文件移入存储；如果相同内容已存在则直接丢弃源文件
+    """
+    dest = object_path(sha256)
+    if dest.exists():
+        os.remove(src)
+    else:
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(src, dest)
+    return dest
+
+
+def link_object(sha256, dest):
+    """
+    将存储中的文件链接到目标路径，不支持硬链接时退化为复制
+    """
+    dest = Path(dest)
+    if dest.exists():
+        dest.unlink()
+    try:
+        os.link(object_path(sha256), dest)
+    except OSError:
+        shutil.copyfile(object_path(sha256), dest)
+    return dest
+
+
+def unique_filename(title, used):
+    """
+    生成不重复的文件名，去掉路径分隔符，同名标题依次追加 _2、_3 ...
+    """
+    base = "".join("_" if c in '\\/:*?"<>|' else c for c in title).strip() or "untitled"
+    name = base
+    n = 2
+    while name.lower() in used:
+        name = f"{base}_{n}"
+        n += 1
+    used.add(name.lower())
+    return f"{name}.pdf"
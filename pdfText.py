@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from PyPDF2 import PdfReader
+import pdfStore
+
+# 提取出的文本按 PDF 内容哈希缓存，重复分析时跳过解析
+TEXT_CACHE_DIR = Path(os.getenv("PDF_TEXT_CACHE_DIR", Path(__file__).resolve().parent / "cache" / "text"))
+# 页数达到该值时使用多进程并行解析
+PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "50"))
+EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 2)))
+# 页与页之间以换页符分隔，清理页眉页脚时据此还原每一页
+PAGE_BREAK = "\f"
+
+_pool = None
+_pool_lock = threading.Lock()
+# 已知的页数和内容哈希，按 (路径, 修改时间, 大小) 记录；分拣、调度、token 估算和文本提取共用，同一文件只打开一次 PdfReader
+_file_info = {}
+_file_info_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    进程池在首次需要时创建，所有线程共用
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS)
+        return _pool
+
+
+def _file_key(pdf_path):
+    stat = Path(pdf_path).stat()
+    return str(Path(pdf_path).resolve()), stat.st_mtime_ns, stat.st_size
+
+
+def _remember(pdf_path, **info):
+    try:
+        key = _file_key(pdf_path)
+    except OSError:
+        return
+    with _file_info_lock:
+        _file_info.setdefault(key, {}).update(info)
+
+
+def _recall(pdf_path, name):
+    try:
+        key = _file_key(pdf_path)
+    except OSError:
+        return None
+    with _file_info_lock:
+        return _file_info.get(key, {}).get(name)
+
+
+def file_sha256(pdf_path):
+    """
+    返回 PDF 的 sha256，同一文件在进程内只计算一次
+    """
+    sha256 = _recall(pdf_path, "sha256")
+    if sha256 is None:
+        sha256 = pdfStore.hash_file(pdf_path).hexdigest()
+        _remember(pdf_path, sha256=sha256)
+    return sha256
+
+
+def page_count(pdf_path, reader=None):
+    """
+    返回 PDF 的页数：依次使用已记录的页数、传入的 reader、文本缓存中的统计信息，最后才打开 PdfReader
+    """
+    pages = _recall(pdf_path, "pages")
+    if pages is not None:
+        return pages
+    if reader is None:
+        _, stats_path = cache_paths(file_sha256(pdf_path))
+        if stats_path.exists():
+            pages = json.loads(stats_path.read_text(encoding="utf-8")).get("pages")
+    if pages is None:
+        pages = len((reader or PdfReader(pdf_path)).pages)
+    _remember(pdf_path, pages=pages)
+    return pages
+
+
+def iter_page_texts(pdf_path, start=0, stop=None, reader=None):
+    """
+    逐页解析 PDF，依次产出 (页码, 文本, 耗时秒数)；无法提取文本的页返回空字符串
+    """
+    reader = reader or PdfReader(pdf_path)
+    stop = len(reader.pages) if stop is None else min(stop, len(reader.pages))
+    for index in range(start, stop):
+        page_start = time.perf_counter()
+        text = reader.pages[index].extract_text() or ""
+        yield index, text, time.perf_counter() - page_start
+
+
+def extract_page_range(pdf_path, start, stop):
+    """
+    进程池任务：解析指定范围的页
+    """
+    return list(iter_page_texts(pdf_path, start, stop))
+
+
+def _extract_pages(pdf_path, page_count, reader=None):
+    if page_count < PARALLEL_MIN_PAGES or EXTRACT_WORKERS < 2:
+        return list(iter_page_texts(pdf_path, reader=reader))
+
+    # 按进程数切分页码范围，每个进程各自打开 PDF 解析自己的部分
+    step = -(-page_count // EXTRACT_WORKERS)
+    pool = get_pool()
+    futures = [pool.submit(extract_page_range, str(pdf_path), start, start + step) for start in range(0, page_count, step)]
+    pages = []
+    for future in futures:
+        pages.extend(future.result())
+    return pages
+
+
+def cache_paths(sha256):
+    return TEXT_CACHE_DIR / f"{sha256}.txt", TEXT_CACHE_DIR / f"{sha256}.json"
+
+
+def extract_text(pdf_path, sha256=None):
+    """
+    提取 PDF 全文，返回 (文本, 统计信息)；统计信息包含页数、总耗时和每页耗时
+    """
+    pdf_path = Path(pdf_path)
+    sha256 = sha256 or file_sha256(pdf_path)
+    text_path, stats_path = cache_paths(sha256)
+    if text_path.exists() and stats_path.exists():
+        stats = json.loads(stats_path.read_text(encoding="utf-8"))
+        # 旧版本的缓存没有分页符，重新解析
+        if stats.get("page_break"):
+            _remember(pdf_path, pages=stats["pages"])
+            stats["cached"] = True
+            return text_path.read_text(encoding="utf-8"), stats
+
+    start = time.perf_counter()
+    reader = PdfReader(pdf_path)
+    pages_total = len(reader.pages)
+    _remember(pdf_path, pages=pages_total)
+    pages = _extract_pages(pdf_path, pages_total, reader)
+    text = PAGE_BREAK.join(page_text + "\n" for _, page_text, _ in pages)
+    page_seconds = [round(seconds, 4) for _, _, seconds in pages]
+    stats = {
+        "pages": pages_total,
+        "seconds": round(time.perf_counter() - start, 3),
+        "parallel": pages_total >= PARALLEL_MIN_PAGES and EXTRACT_WORKERS >= 2,
+        "page_seconds": page_seconds,
+        "page_break": True,
+        "cached": False,
+    }
+
+    # 先写临时文件再改名，避免并发或中断时留下不完整的缓存
+    TEXT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    for path, content in ((text_path, text), (stats_path, json.dumps(stats))):
+        tmp_path = path.with_suffix(path.suffix + f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(content, encoding="utf-8")
+        os.replace(tmp_path, path)
+    return text, stats
+
+
+def split_pages(text):
+    """
+    把 extract_text 返回的全文按分页符拆回每一页的文本
+    """
+    return text.split(PAGE_BREAK)
+
+
+def join_pages(text):
+    """
+    去掉 extract_text 全文中的分页符，得到各页直接以换行连接的文本（与加入分页符之前的提取结果相同）
+    """
+    return "".join(split_pages(text))
+
+
+def describe_stats(stats):
+    """
+    生成一行解析统计说明（包括最慢的一页）
+    """
+    if stats.get("cached"):
+        return f"📄 使用缓存的文本（{stats['pages']} 页）"
+    slowest = max(range(len(stats["page_seconds"])), key=stats["page_seconds"].__getitem__, default=None)
+    message = f"📄 解析 {stats['pages']} 页，耗时 {stats['seconds']} 秒{'（多进程）' if stats['parallel'] else ''}"
+    if slowest is not None:
+        message += f"，最慢: 第 {slowest + 1} 页 {stats['page_seconds'][slowest]} 秒"
+    return message
@@ -4,6 +4,7 @@ const bodyParser = require('body-parser');
 const { spawn } = require('child_process');
 const fs = require('fs');
 const path = require('path');
+const readline = require('readline');
 const session = require('express-session');
 require('dotenv').config();
 
@@ -235,6 +236,11 @@ app.get('/api/config-content', (req, res) => {
   }
 });
 
+// 获取各脚本最近一次运行的各阶段耗时和计数
+app.get('/api/metrics', (req, res) => {
+  res.json(runSummaries);
+});
+
 // 获取当前.env文件中的LLM_PROVIDER值
 app.get('/api/current-llm', (req, res) => {
   try {
@@ -316,193 +322,219 @@ app.post('/api/update-config', (req, res) => {
   }
 });
 
-// 清空目录的辅助函数
-const clearDirectory = (dirPath) => {
-  try {
-    if (fs.existsSync(dirPath)) {
-      const files = fs.readdirSync(dirPath);
-      for (const file of files) {
-        const filePath = path.join(dirPath, file);
-        fs.unlinkSync(filePath);
-      }
-      console.log(`已清空目录: ${dirPath}`);
-    }
-  } catch (error) {
-    console.error(`清空目录 ${dirPath} 失败:`, error);
-    throw error;
-  }
-};
-
-// 运行所有任务
+// 运行所有任务：加入持久化任务队列，由常驻的 jobQueue.py worker 执行，这里只按 job ID 推送进度；
+// 关闭页面不会中断任务，多个任务各自使用独立的工作目录，可以同时执行
 app.post('/api/run-tasks', async (req, res) => {
-  // 设置SSE响应头
-  res.writeHead(200, {
-    'Content-Type': 'text/event-stream',
-    'Cache-Control': 'no-cache',
-    'Connection': 'keep-alive',
-    'Access-Control-Allow-Origin': '*'
-  });
-  
-  // 存储响应对象用于发送实时日志
-  currentResponse = res;
+  // 检查config.json文件是否存在
+  const configFile = 'config.json';
+  if (!fs.existsSync(configFile)) {
+    return res.status(400).json({ error: '没有找到配置文件 config.json' });
+  }
   
+  // 默认增量运行：已下载、已分析的公告由流水线清单跳过；fullRefresh 时强制重新处理
+  const fullRefresh = Boolean(req.body && req.body.fullRefresh);
   try {
-    // 发送开始消息
-    res.write(`data: ${JSON.stringify({ type: 'start', message: '开始执行所有任务...' })}\n\n`);
-    
-    // 清空downloads和data目录
-    res.write(`data: ${JSON.stringify({ type: 'info', message: '清空downloads目录...' })}\n\n`);
-    clearDirectory('./downloads');
-    res.write(`data: ${JSON.stringify({ type: 'info', message: '清空data目录...' })}\n\n`);
-    clearDirectory('./data');
+    const { id } = await runJobQueue(['enqueue', configFile, ...(fullRefresh ? ['--force'] : [])]);
     
-    // 检查config.json文件是否存在
-    const configFile = 'config.json';
-    if (!fs.existsSync(configFile)) {
-      res.write(`data: ${JSON.stringify({ type: 'error', message: '没有找到配置文件 config.json' })}\n\n`);
-      res.end();
-      return;
-    }
-    
-    res.write(`data: ${JSON.stringify({ type: 'info', message: `处理配置文件: ${configFile}` })}\n\n`);
-    
-    // 1. 运行 inputJson.py (预处理阶段)
-    res.write(`data: ${JSON.stringify({ type: 'info', message: '执行 预处理阶段 任务...' })}\n\n`);
-    await runPythonScript('inputJson.py', [configFile]);
-    res.write(`data: ${JSON.stringify({ type: 'info', message: '预处理阶段 任务完成' })}\n\n`);
-    
-    // 2. 运行 getPdfFiles.py (从服务器获取pdf文件)
-    res.write(`data: ${JSON.stringify({ type: 'info', message: '执行 从服务器获取pdf文件 任务...' })}\n\n`);
-    await runPythonScript('getPdfFiles.py', [configFile]);
-    res.write(`data: ${JSON.stringify({ type: 'info', message: '从服务器获取pdf文件 任务完成' })}\n\n`);
-    
-    // 3. 移动PDF文件从downloads到data目录
-    res.write(`data: ${JSON.stringify({ type: 'info', message: '移动PDF文件从downloads到data目录...' })}\n\n`);
-    movePdfFiles();
-    res.write(`data: ${JSON.stringify({ type: 'info', message: 'PDF文件移动完成' })}\n\n`);
-    
-    // 4. 处理data目录下的PDF文件 (大语言模型分析)
-    res.write(`data: ${JSON.stringify({ type: 'info', message: '处理data目录下的PDF文件 (大语言模型分析)...' })}\n\n`);
-    const pdfFiles = fs.readdirSync('./data')
-      .filter(file => file.endsWith('.pdf') || file.endsWith('.PDF'));
-    
-    res.write(`data: ${JSON.stringify({ type: 'info', message: `找到 ${pdfFiles.length} 个PDF文件` })}\n\n`);
-    
-    for (const pdfFile of pdfFiles) {
-      const fullPath = path.join('./data', pdfFile);
-      res.write(`data: ${JSON.stringify({ type: 'info', message: `处理PDF文件: ${pdfFile}` })}\n\n`);
-      await runPythonScript('callLLM.py', [fullPath]);
-      res.write(`data: ${JSON.stringify({ type: 'info', message: `PDF文件处理完成: ${pdfFile}` })}\n\n`);
-    }
-    
-    res.write(`data: ${JSON.stringify({ type: 'end', message: '所有任务执行完成' })}\n\n`);
-    res.end();
+    // 设置SSE响应头
+    res.writeHead(200, {
+      'Content-Type': 'text/event-stream',
+      'Cache-Control': 'no-cache',
+      'Connection': 'keep-alive',
+      'Access-Control-Allow-Origin': '*'
+    });
+    res.write(`data: ${JSON.stringify({ type: 'start', message: '开始执行所有任务...' })}\n\n`);
+    res.write(`data: ${JSON.stringify({ type: 'job', jobId: id })}\n\n`);
+    res.write(`data: ${JSON.stringify({ type: 'info', message: fullRefresh ? '全量刷新：重新下载、分析所有公告' : '增量运行：跳过已处理的公告' })}\n\n`);
+    await streamJob(id, req, res, 0);
   } catch (error) {
     console.error('任务执行失败:', error);
-    if (currentResponse) {
-      currentResponse.write(`data: ${JSON.stringify({ type: 'error', message: `任务执行失败: ${error.message}` })}\n\n`);
-      currentResponse.end();
+    if (res.headersSent) {
+      res.write(`data: ${JSON.stringify({ type: 'error', message: `任务执行失败: ${error.message}` })}\n\n`);
+      res.end();
+    } else {
+      res.status(500).json({ error: error.message });
     }
-  } finally {
-    // 清除当前响应对象
-    currentResponse = null;
   }
 });
 
-// 存储客户端响应对象以发送实时日志
-let currentResponse = null;
+// 持久化任务队列（jobQueue.py）：常驻 worker 执行列表、下载、分析三个阶段，任务状态和进度保存在 jobs.db 中
+const JOB_STAGE_SCRIPTS = { list: 'inputJson.py', download: 'getPdfFiles.py', analyze: 'callLLM.py' };
+// 查询在常驻的 jobQueue.py serve 进程中执行（只读一次 SQLite），可以频繁轮询
+const JOB_POLL_INTERVAL = 200;
+let jobWorker = null;
 
-// 运行Python脚本的辅助函数
-const runPythonScript = (scriptName, args = []) => {
-  return new Promise((resolve, reject) => {
-    console.log(`启动Python脚本: ${scriptName} ${args.join(' ')}`);
-    
-    const child = spawn('python', [scriptName, ...args]);
-    
-    child.stdout.on('data', (data) => {
-      const output = data.toString().trim();
-      console.log(`[stdout] ${output}`);
-      // 发送实时日志到前端
-      if (currentResponse) {
-        currentResponse.write(`data: ${JSON.stringify({ type: 'stdout', message: output })}\n\n`);
-      }
-    });
-    
-    child.stderr.on('data', (data) => {
-      const error = data.toString().trim();
-      console.error(`[stderr] ${error}`);
-      // 发送错误日志到前端
-      if (currentResponse) {
-        currentResponse.write(`data: ${JSON.stringify({ type: 'stderr', message: error })}\n\n`);
-      }
-    });
-    
-    child.on('close', (code) => {
-      console.log(`${scriptName} 执行完成，退出码: ${code}`);
-      if (currentResponse) {
-        currentResponse.write(`data: ${JSON.stringify({ type: 'close', code: code, script: scriptName })}\n\n`);
-      }
-      if (code === 0) {
-        resolve();
-      } else {
-        reject(new Error(`${scriptName} 执行失败，退出码: ${code}`));
-      }
-    });
-    
-    child.on('error', (error) => {
-      console.error(`${scriptName} 启动失败:`, error);
-      if (currentResponse) {
-        currentResponse.write(`data: ${JSON.stringify({ type: 'error', message: `${scriptName} 启动失败: ${error.message}` })}\n\n`);
-      }
-      reject(new Error(`${scriptName} 启动失败: ${error.message}`));
-    });
+const startJobWorker = () => {
+  console.log('启动任务队列worker: jobQueue.py work');
+  const child = spawn('python', ['jobQueue.py', 'work']);
+  jobWorker = child;
+  child.stdout.on('data', (data) => console.log(`[job-worker] ${data.toString().trim()}`));
+  child.stderr.on('data', (data) => console.error(`[job-worker stderr] ${data.toString().trim()}`));
+  // worker 意外退出时稍后重启，执行中的任务由新的 worker 回收后重新执行
+  child.on('close', (code) => {
+    console.error(`任务队列worker已退出，退出码: ${code}`);
+    if (jobWorker === child) {
+      jobWorker = null;
+      setTimeout(startJobWorker, 5000);
+    }
   });
 };
 
-// 移动PDF文件的辅助函数
-const movePdfFiles = () => {
-  try {
-    // 确保目录存在
-    if (!fs.existsSync('./downloads')) {
-      console.log('downloads目录不存在');
+// 常驻的 jobQueue.py serve 查询进程：每条命令以一行 JSON 发送，按请求 ID 匹配返回结果
+let jobQueueServer = null;
+let jobQueueRequestId = 0;
+const jobQueueRequests = new Map();
+
+const startJobQueueServer = () => {
+  const child = spawn('python', ['jobQueue.py', 'serve']);
+  jobQueueServer = child;
+  readline.createInterface({ input: child.stdout }).on('line', (line) => {
+    let reply;
+    try {
+      reply = JSON.parse(line);
+    } catch (error) {
+      return console.log(`[job-queue] ${line}`);
+    }
+    const request = jobQueueRequests.get(reply.id);
+    if (!request) {
       return;
     }
-    
-    if (!fs.existsSync('./data')) {
-      fs.mkdirSync('./data');
+    jobQueueRequests.delete(reply.id);
+    if (reply.error) {
+      request.reject(new Error(reply.error));
+    } else {
+      request.resolve(reply.result);
     }
-    
-    const files = fs.readdirSync('./downloads');
-    const pdfFiles = files.filter(file => 
-      file.endsWith('.pdf') || file.endsWith('.PDF')
-    );
-    
-    console.log(`在downloads目录中找到 ${pdfFiles.length} 个PDF文件`);
-    
-    let movedCount = 0;
-    pdfFiles.forEach(file => {
-      try {
-        const sourcePath = path.join('./downloads', file);
-        const destPath = path.join('./data', file);
-        
-        // 检查目标文件是否已存在
-        if (fs.existsSync(destPath)) {
-          console.log(`文件已存在，跳过: ${file}`);
-          return;
-        }
-        
-        fs.renameSync(sourcePath, destPath);
-        console.log(`移动文件: ${file}`);
-        movedCount++;
-      } catch (moveError) {
-        console.error(`移动文件 ${file} 失败:`, moveError.message);
-      }
+  });
+  child.stderr.on('data', (data) => console.error(`[job-queue stderr] ${data.toString().trim()}`));
+  // 进程退出时未完成的请求返回错误，下一次请求时重新启动
+  const onExit = (error) => {
+    if (jobQueueServer === child) {
+      jobQueueServer = null;
+    }
+    jobQueueRequests.forEach(request => request.reject(error));
+    jobQueueRequests.clear();
+  };
+  child.on('error', onExit);
+  child.on('close', (code) => onExit(new Error(`jobQueue.py 查询进程已退出，退出码: ${code}`)));
+  return child;
+};
+
+// 执行一条 jobQueue.py 命令（enqueue、status、events、cancel、list），返回结果
+const runJobQueue = (args) => {
+  return new Promise((resolve, reject) => {
+    const child = jobQueueServer || startJobQueueServer();
+    const id = ++jobQueueRequestId;
+    jobQueueRequests.set(id, { resolve, reject });
+    child.stdin.write(`${JSON.stringify({ id, command: args[0], args: args.slice(1) })}\n`);
+  });
+};
+
+// 把队列中记录的一条进度事件转换为前端使用的 SSE 消息
+const jobEventToMessage = (event) => {
+  const data = event.data;
+  if (event.kind === 'event') {
+    const script = JOB_STAGE_SCRIPTS[event.stage];
+    recordRunSummary(data, script);
+    return { type: 'progress', script, ...data };
+  }
+  if (event.kind === 'stdout' || event.kind === 'stderr') {
+    return { type: event.kind, message: data.message };
+  }
+  if (data.status === 'done' || data.status === 'cancelled') {
+    return { type: 'end', message: data.message };
+  }
+  if (data.status === 'failed') {
+    return { type: 'error', message: data.message };
+  }
+  return { type: 'info', message: data.message };
+};
+
+// 以 SSE 推送 job 在 after 之后的进度，直到 job 结束或客户端断开（断开不影响任务执行）
+const streamJob = async (jobId, req, res, after) => {
+  let closed = false;
+  req.on('close', () => { closed = true; });
+  while (!closed) {
+    const { job, events } = await runJobQueue(['events', jobId, String(after)]);
+    if (!job) {
+      res.write(`data: ${JSON.stringify({ type: 'error', message: `任务不存在: ${jobId}` })}\n\n`);
+      break;
+    }
+    events.forEach(event => {
+      after = event.id;
+      res.write(`data: ${JSON.stringify({ ...jobEventToMessage(event), eventId: event.id })}\n\n`);
     });
-    
-    console.log(`成功移动 ${movedCount} 个PDF文件到data目录`);
+    if (events.length === 0 && !['queued', 'running'].includes(job.status)) {
+      break;
+    }
+    if (events.length === 0) {
+      await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL));
+    }
+  }
+  res.end();
+};
+
+// 列出最近的任务
+app.get('/api/jobs', async (req, res) => {
+  try {
+    res.json(await runJobQueue(['list']));
+  } catch (error) {
+    res.status(500).json({ error: error.message });
+  }
+});
+
+// 查询任务及各阶段的状态
+app.get('/api/jobs/:id', async (req, res) => {
+  try {
+    const job = await runJobQueue(['status', req.params.id]);
+    if (!job) {
+      return res.status(404).json({ error: '任务不存在' });
+    }
+    res.json(job);
   } catch (error) {
-    console.error('移动PDF文件时出错:', error);
-    throw error;
+    res.status(500).json({ error: error.message });
+  }
+});
+
+// 查询任务在 after 之后的进度事件（轮询方式）
+app.get('/api/jobs/:id/events', async (req, res) => {
+  try {
+    res.json(await runJobQueue(['events', req.params.id, String(Number(req.query.after) || 0)]));
+  } catch (error) {
+    res.status(500).json({ error: error.message });
+  }
+});
+
+// 以 SSE 推送任务进度，页面刷新后可从 after 处续传
+app.get('/api/jobs/:id/stream', async (req, res) => {
+  res.writeHead(200, {
+    'Content-Type': 'text/event-stream',
+    'Cache-Control': 'no-cache',
+    'Connection': 'keep-alive',
+    'Access-Control-Allow-Origin': '*'
+  });
+  try {
+    await streamJob(req.params.id, req, res, Number(req.query.after) || 0);
+  } catch (error) {
+    res.write(`data: ${JSON.stringify({ type: 'error', message: error.message })}\n\n`);
+    res.end();
+  }
+});
+
+// 取消任务
+app.post('/api/jobs/:id/cancel', async (req, res) => {
+  try {
+    res.json(await runJobQueue(['cancel', req.params.id]));
+  } catch (error) {
+    res.status(500).json({ error: error.message });
+  }
+});
+
+// 各Python脚本最近一次运行的指标汇总（run_summary 事件），通过 /api/metrics 查看
+const runSummaries = {};
+const recordRunSummary = (event, scriptName) => {
+  if (event.event === 'run_summary') {
+    runSummaries[scriptName] = { ...event, receivedAt: new Date().toISOString() };
   }
 };
 
@@ -565,45 +597,34 @@ app.post('/api/download-files', (req, res) => {
   }
 });
 
-// 下载PDF文件
+// 下载PDF文件：只执行列表和下载两个阶段的 job，下载的 PDF 发布到 data 目录
 app.post('/api/download-pdf-files', async (req, res) => {
-  // 设置SSE响应头
-  res.writeHead(200, {
-    'Content-Type': 'text/event-stream',
-    'Cache-Control': 'no-cache',
-    'Connection': 'keep-alive',
-    'Access-Control-Allow-Origin': '*'
-  });
-
+  // 检查config.json文件是否存在
+  const configFile = 'config.json';
+  if (!fs.existsSync(configFile)) {
+    return res.status(400).json({ error: '没有找到配置文件 config.json' });
+  }
+  
   try {
-    // 发送开始消息
-    res.write(`data: ${JSON.stringify({ type: 'start', message: '开始下载PDF文件...' })}\n\n`);
+    const { id } = await runJobQueue(['enqueue', configFile, '--stages', 'list,download']);
     
-    // 检查config.json文件是否存在
-    const configFile = 'config.json';
-    if (!fs.existsSync(configFile)) {
-      res.write(`data: ${JSON.stringify({ type: 'error', message: '没有找到配置文件 config.json' })}\n\n`);
-      res.end();
-      return;
-    }
-    
-    res.write(`data: ${JSON.stringify({ type: 'info', message: '执行预处理任务...' })}\n\n`);
-    
-    // 先运行 inputJson.py 脚本
-    await runPythonScript('inputJson.py', [configFile]);
-    
-    res.write(`data: ${JSON.stringify({ type: 'info', message: '预处理任务完成，开始下载PDF文件...' })}\n\n`);
-    
-    // 再运行 getPdfFiles.py 脚本
-    await runPythonScript('getPdfFiles.py', [configFile]);
-    
-    res.write(`data: ${JSON.stringify({ type: 'end', message: 'PDF文件下载完成' })}\n\n`);
-    res.end();
+    // 设置SSE响应头
+    res.writeHead(200, {
+      'Content-Type': 'text/event-stream',
+      'Cache-Control': 'no-cache',
+      'Connection': 'keep-alive',
+      'Access-Control-Allow-Origin': '*'
+    });
+    res.write(`data: ${JSON.stringify({ type: 'start', message: '开始下载PDF文件...' })}\n\n`);
+    res.write(`data: ${JSON.stringify({ type: 'job', jobId: id })}\n\n`);
+    await streamJob(id, req, res, 0);
   } catch (error) {
     console.error('下载PDF文件失败:', error);
-    if (res && !res.headersSent) {
+    if (res.headersSent) {
       res.write(`data: ${JSON.stringify({ type: 'error', message: `下载PDF文件失败: ${error.message}` })}\n\n`);
       res.end();
+    } else {
+      res.status(500).json({ error: error.message });
     }
   }
 });
@@ -611,13 +632,13 @@ app.post('/api/download-pdf-files', async (req, res) => {
 // 打包并下载PDF文件
 app.post('/api/download-pdf-zip', (req, res) => {
   try {
-    // 检查downloads目录是否存在
-    const downloadsDir = './downloads';
+    // 下载任务的 PDF 发布在 data 目录
+    const downloadsDir = './data';
     if (!fs.existsSync(downloadsDir)) {
-      return res.status(404).json({ error: 'Downloads directory not found' });
+      return res.status(404).json({ error: 'Data directory not found' });
     }
     
-    // 获取downloads目录下的所有PDF文件
+    // 获取data目录下的所有PDF文件
     const files = fs.readdirSync(downloadsDir);
     const pdfFiles = files.filter(file => file.endsWith('.pdf') || file.endsWith('.PDF'));
     
@@ -703,6 +724,13 @@ app.post('/api/clear-data-files', (req, res) => {
 
 // 启动服务器
 ensureDirectories();
+startJobWorker();
 app.listen(PORT, () => {
   console.log(`服务器运行在 http://localhost:${PORT}`);
+});
+
+process.on('exit', () => {
+  if (jobWorker) {
+    jobWorker.kill();
+  }
 });
\ No newline at end of file
@@ -0,0 +1,106 @@
+import os
+import time
+import threading
+from pathlib import Path
+import pdfText
+import triage
+
+# 分析顺序调度：按页数和文件大小估算每个 PDF 的处理时间，短任务优先，避免一个几百页的年报挡住后面的小公告。
+# 使用“最高响应比优先”（(等待时间 + 预计耗时) / 预计耗时）：短任务先执行，大文件的响应比随等待时间增长，不会一直排在后面
+#   fifo:     按提交顺序
+#   sjf:      最高响应比优先
+#   priority: 先按公告类型的优先级（config.json 的 typePriority），同优先级内按响应比；
+#             每等待 SCHEDULE_AGING_SECONDS 秒优先级加 1（≤ 0 时不老化），低优先级的文件不会一直等待
+SCHEDULE_POLICY = os.getenv("SCHEDULE_POLICY", "sjf").lower()
+SCHEDULE_SECONDS_PER_PAGE = float(os.getenv("SCHEDULE_SECONDS_PER_PAGE", "1"))
+# 无法读取页数时按文件大小估算页数
+SCHEDULE_BYTES_PER_PAGE = int(os.getenv("SCHEDULE_BYTES_PER_PAGE", "50000"))
+# 优先级老化间隔（秒），0 或负数表示不老化（只按公告类型的优先级）
+SCHEDULE_AGING_SECONDS = float(os.getenv("SCHEDULE_AGING_SECONDS", "300"))
+# 页数之外每个任务的固定耗时（秒），使一页的小公告之间仍按提交顺序执行
+SCHEDULE_BASE_SECONDS = float(os.getenv("SCHEDULE_BASE_SECONDS", "5"))
+POLICIES = ("fifo", "sjf", "priority")
+# 预计耗时的下限（秒）：两个耗时参数都设为 0 时响应比的分母不为 0
+MIN_COST_SECONDS = 0.01
+
+
+def estimate_cost(pdf_path):
+    """
+    估算一个 PDF 的处理耗时（秒），返回 (耗时, 页数, 字节数)
+    """
+    pdf_path = Path(pdf_path)
+    size = pdf_path.stat().st_size if pdf_path.exists() else 0
+    try:
+        pages = pdfText.page_count(pdf_path)
+    except Exception:
+        pages = max(1, size // SCHEDULE_BYTES_PER_PAGE)
+    cost = max(MIN_COST_SECONDS, SCHEDULE_BASE_SECONDS + pages * SCHEDULE_SECONDS_PER_PAGE)
+    return cost, pages, size
+
+
+def response_ratio(waited, cost):
+    cost = max(cost, MIN_COST_SECONDS)
+    return (waited + cost) / cost
+
+
+class TaskQueue:
+    """
+    待分析文件的优先队列（线程安全），pop() 按调度策略取出下一个文件
+    """
+
+    def __init__(self, policy=None, type_priority=None):
+        policy = policy or SCHEDULE_POLICY
+        self.policy = policy if policy in POLICIES else "sjf"
+        self.type_priority = type_priority or {}
+        self.lock = threading.Lock()
+        self.items = []
+        self.seq = 0
+
+    def push(self, pdf_path, **extra):
+        """
+        加入一个文件；extra 随 pop() 一起返回
+        """
+        cost, pages, size = estimate_cost(pdf_path)
+        file_type = triage.classify(Path(pdf_path).stem)
+        with self.lock:
+            self.seq += 1
+            self.items.append({
+                "path": pdf_path,
+                "cost": cost,
+                "pages": pages,
+                "bytes": size,
+                "type": file_type,
+                "priority": self.type_priority.get(file_type, 0),
+                "queued_at": time.monotonic(),
+                "seq": self.seq,
+                "extra": extra,
+            })
+
+    def _key(self, item, now):
+        waited = now - item["queued_at"]
+        ratio = response_ratio(waited, item["cost"])
+        if self.policy == "fifo":
+            return (item["seq"],)
+        if self.policy == "priority":
+            aged = item["priority"]
+            if SCHEDULE_AGING_SECONDS > 0:
+                aged += int(waited // SCHEDULE_AGING_SECONDS)
+            return (-aged, -ratio, item["cost"], item["seq"])
+        # 同时加入的文件响应比相同，预计耗时短的优先
+        return (-ratio, item["cost"], item["seq"])
+
+    def pop(self):
+        """
+        取出下一个文件，返回 (文件, 已等待秒数, 条目信息)；队列为空时返回 None
+        """
+        with self.lock:
+            if not self.items:
+                return None
+            now = time.monotonic()
+            item = min(self.items, key=lambda item: self._key(item, now))
+            self.items.remove(item)
+        return item["path"], now - item["queued_at"], item
+
+    def __len__(self):
+        with self.lock:
+            return len(self.items)
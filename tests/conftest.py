@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# 测试直接导入项目根目录下的模块
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
@@ -0,0 +1,103 @@
+import json
+import shutil
+
+import pytest
+
+import callLLM
+import llmCache
+import loadTest
+import manifest
+import pdfText
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(llmCache, "CACHE_PATH", tmp_path / "llm_cache.db")
+    monkeypatch.setattr(manifest, "MANIFEST_PATH", tmp_path / "manifest.db")
+    monkeypatch.setattr(pdfText, "TEXT_CACHE_DIR", tmp_path / "text")
+    monkeypatch.setenv("LLM_PROVIDER", "mock")
+    write_config(tmp_path, "请分析此文档")
+    return tmp_path
+
+
+def write_config(directory, require):
+    config = {"target_url": "https://www.cninfo.com.cn/new/disclosure/stock?orgId=gssz0000001&stockCode=000001", "require": require}
+    (directory / "config.json").write_text(json.dumps(config, ensure_ascii=False), encoding="utf-8")
+
+
+def test_cache_key_depends_on_every_part():
+    parts = ["a" * 64, "请分析此文档", "deepseek", "deepseek-chat"]
+    key = llmCache.make_key(*parts)
+    assert key == llmCache.make_key(*parts)
+    for i in range(len(parts)):
+        changed = list(parts)
+        changed[i] += "x"
+        assert llmCache.make_key(*changed) != key
+    assert manifest.analysis_key("请分析此文档", "deepseek", "deepseek-chat") != manifest.analysis_key("请分析此文档", "gemini", "deepseek-chat")
+
+
+def test_cache_expires_and_evicts_least_recently_used(workdir, monkeypatch):
+    llmCache.put("old", "a" * 10)
+    llmCache.put("new", "b" * 10)
+    assert llmCache.get("old") == "a" * 10
+
+    # 上限只容得下一条：最近访问过的 old 保留，new 被淘汰
+    monkeypatch.setattr(llmCache, "CACHE_MAX_BYTES", 15)
+    llmCache.put("newest", "c" * 5)
+    assert llmCache.get("new") is None
+    assert llmCache.get("old") == "a" * 10
+
+    monkeypatch.setattr(llmCache, "CACHE_TTL", 60)
+    now = llmCache.time.time()
+    monkeypatch.setattr(llmCache.time, "time", lambda: now + 120)
+    assert llmCache.get("old") is None
+    assert llmCache.stats()["expired"] == 1
+
+
+def test_same_content_is_analyzed_once(workdir):
+    first = workdir / "a.pdf"
+    first.write_bytes(loadTest.make_pdf([["same content"]]))
+    copy = workdir / "b.pdf"
+    shutil.copy(first, copy)
+    calls = []
+
+    def analyze():
+        calls.append(1)
+        return f"结果 {len(calls)}"
+
+    assert callLLM.cached_analysis(first, analyze) == "结果 1"
+    # 内容相同、文件名不同：使用缓存的结果
+    assert callLLM.cached_analysis(copy, analyze) == "结果 1"
+    assert (workdir / "data" / "b.md").read_text(encoding="utf-8") == "结果 1"
+    assert len(calls) == 1
+
+    # 提示词变化后重新分析
+    write_config(workdir, "只提取公告日期")
+    assert callLLM.cached_analysis(copy, analyze) == "结果 2"
+    assert callLLM.cached_analysis(first, analyze, force=True) == "结果 3"
+
+
+def test_disabled_or_expired_cache_analyzes_again(workdir, monkeypatch):
+    pdf_path = workdir / "a.pdf"
+    pdf_path.write_bytes(loadTest.make_pdf([["cached content"]]))
+    # 清单中登记了这份内容，分析结果同样记入清单
+    manifest.record_download("https://www.cninfo.com.cn/a", pdfText.file_sha256(pdf_path), "a")
+    calls = []
+
+    def analyze():
+        calls.append(1)
+        return f"结果 {len(calls)}"
+
+    assert callLLM.cached_analysis(pdf_path, analyze) == "结果 1"
+    assert callLLM.cached_analysis(pdf_path, analyze) == "结果 1"
+
+    monkeypatch.setattr(llmCache, "CACHE_ENABLED", False)
+    assert callLLM.cached_analysis(pdf_path, analyze) == "结果 2"
+
+    monkeypatch.setattr(llmCache, "CACHE_ENABLED", True)
+    monkeypatch.setattr(llmCache, "CACHE_TTL", 60)
+    now = llmCache.time.time()
+    monkeypatch.setattr(llmCache.time, "time", lambda: now + 120)
+    assert callLLM.cached_analysis(pdf_path, analyze) == "结果 3"
+    assert len(calls) == 3
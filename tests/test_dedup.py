@@ -0,0 +1,74 @@
+import hashlib
+
+import pytest
+
+import dedup
+import loadTest
+import pdfText
+
+
+@pytest.fixture(autouse=True)
+def text_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdfText, "TEXT_CACHE_DIR", tmp_path / "text")
+
+
+def content(seed, pages=3, lines=20):
+    # 每行是不同的随机串，不同 seed 的正文几乎没有相同的片段
+    return [[hashlib.sha1(f"{seed}-{p}-{n}".encode()).hexdigest() for n in range(lines)] for p in range(pages)]
+
+
+def write(directory, name, pages):
+    path = directory / f"{name}.pdf"
+    path.write_bytes(loadTest.make_pdf(pages))
+    return path
+
+
+def grouped(groups):
+    return {representative.stem: {member.stem: mode for member, _, mode in members} for representative, members in groups}
+
+
+def test_variants_link_only_when_text_matches(tmp_path):
+    original = content("notice")
+    # 更正公告：标题只差“更正”，一半的行不同
+    corrected = [page[:10] + content("fix", 1)[0][:10] for page in original]
+    files = [
+        write(tmp_path, "年度报告", content("report")),
+        write(tmp_path, "年度报告（英文版）", content("report")),
+        write(tmp_path, "关于回购股份的公告", original),
+        write(tmp_path, "关于回购股份的公告（更正）", corrected),
+        write(tmp_path, "董事会决议公告", content("board")),
+        write(tmp_path, "董事会决议公告之二", content("board")),
+        write(tmp_path, "股东大会通知", content("meeting")),
+    ]
+    groups = grouped(dedup.group_files(files))
+    assert groups == {
+        "年度报告": {"年度报告（英文版）": "link"},
+        "关于回购股份的公告": {"关于回购股份的公告（更正）": "diff"},
+        "董事会决议公告": {"董事会决议公告之二": "link"},
+        "股东大会通知": {},
+    }
+
+
+def test_same_title_with_different_text_is_not_grouped(tmp_path):
+    # 每月的质押公告标题相同，内容不同
+    files = []
+    for month in ("january", "february"):
+        (tmp_path / month).mkdir()
+        files.append(write(tmp_path / month, "股份质押公告", content(month)))
+    groups = dedup.group_files(files)
+    assert [members for _, members in groups] == [[], []]
+
+
+def test_without_text_comparison_only_title_variants_are_read(tmp_path, monkeypatch):
+    files = [
+        write(tmp_path, "年度报告", content("report")),
+        write(tmp_path, "年度报告摘要", content("report")),
+        write(tmp_path, "董事会决议公告", content("board")),
+        write(tmp_path, "董事会决议公告之二", content("board")),
+    ]
+    read = []
+    extract_text = pdfText.extract_text
+    monkeypatch.setattr(pdfText, "extract_text", lambda path, *args: read.append(path.stem) or extract_text(path, *args))
+    groups = grouped(dedup.group_files(files, compare_text=False))
+    assert groups == {"年度报告": {"年度报告摘要": "link"}, "董事会决议公告": {}, "董事会决议公告之二": {}}
+    assert sorted(read) == ["年度报告", "年度报告摘要"]
@@ -0,0 +1,49 @@
+import jobQueue
+
+
+def write_results(job, title, content):
+    data = job / "data"
+    data.mkdir(parents=True)
+    (data / f"{title}.pdf").write_bytes(content)
+    (data / f"{title}.md").write_text(content.decode(), encoding="utf-8")
+    (data / f"{title}.triage.json").write_text("{}", encoding="utf-8")
+
+
+def test_publish_keeps_other_jobs_results_with_same_name(tmp_path, monkeypatch):
+    publish = tmp_path / "data"
+    monkeypatch.setattr(jobQueue, "JOBS_PUBLISH_DIR", publish)
+    first, second, again = tmp_path / "job-1", tmp_path / "job-2", tmp_path / "job-3"
+    write_results(first, "董事会决议公告", b"stock A")
+    write_results(second, "董事会决议公告", b"stock B")
+    write_results(again, "董事会决议公告", b"stock A")
+
+    assert jobQueue.publish_results(first) == 3
+    assert jobQueue.publish_results(second) == 3
+    assert (publish / "董事会决议公告.md").read_text(encoding="utf-8") == "stock A"
+    assert (publish / "董事会决议公告_job-2.pdf").read_bytes() == b"stock B"
+    assert (publish / "董事会决议公告_job-2.md").read_text(encoding="utf-8") == "stock B"
+    assert (publish / "董事会决议公告_job-2.triage.json").exists()
+
+    # 同一份公告再次发布时直接更新原来的文件
+    assert jobQueue.publish_results(again) == 3
+    assert sorted(path.name for path in publish.iterdir()) == [
+        "董事会决议公告.md", "董事会决议公告.pdf", "董事会决议公告.triage.json",
+        "董事会决议公告_job-2.md", "董事会决议公告_job-2.pdf", "董事会决议公告_job-2.triage.json",
+    ]
+
+
+def test_cleanup_removes_only_expired_job_dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobQueue, "JOBS_DB_PATH", tmp_path / "jobs.db")
+    monkeypatch.setattr(jobQueue, "JOBS_DIR", tmp_path / "jobs")
+    config = tmp_path / "config.json"
+    config.write_text("{}", encoding="utf-8")
+    old, recent, running = (jobQueue.enqueue(config) for _ in range(3))
+    now = jobQueue.time.time()
+    with jobQueue.transaction() as conn:
+        conn.execute("UPDATE jobs SET status = 'done', finished_at = ? WHERE id = ?", (now - 8 * 86400, old))
+        conn.execute("UPDATE jobs SET status = 'done', finished_at = ? WHERE id = ?", (now - 86400, recent))
+
+    assert jobQueue.cleanup_job_dirs() == 1
+    assert not jobQueue.job_dir(old).exists()
+    assert jobQueue.job_dir(recent).exists()
+    assert jobQueue.job_dir(running).exists()
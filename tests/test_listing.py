@@ -0,0 +1,99 @@
+import json
+from html.parser import HTMLParser
+from pathlib import Path
+
+import inputJson
+
+ROOT = Path(__file__).resolve().parent.parent
+# 录制的巨潮公告页面，以及从同一页面整理出的查询接口返回数据
+PAGE_PATH = ROOT / "htmlExample" / "untitled.html"
+API_FIXTURE_PATH = ROOT / "benchmark" / "fixtures" / "cninfo_listing.json"
+
+
+class TableRowParser(HTMLParser):
+    """
+    按 PAGE_SNAPSHOT_JS 的方式读取表格行：a.ahover 的文本和 href、span.time 的文本
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self.row = None
+        self.field = None
+        self.depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+        if tag == "tr" and "el-table__row" in classes:
+            self.row = {"title": "", "href": "", "when": ""}
+        elif self.row is not None and self.field is None:
+            if tag == "a" and "ahover" in classes:
+                self.field, self.depth = "title", 0
+                self.row["href"] = attrs.get("href") or ""
+            elif tag == "span" and "time" in classes:
+                self.field, self.depth = "when", 0
+        if self.field and tag == ("a" if self.field == "title" else "span"):
+            self.depth += 1
+
+    def handle_endtag(self, tag):
+        if self.field and tag == ("a" if self.field == "title" else "span"):
+            self.depth -= 1
+            if self.depth == 0:
+                self.field = None
+        if tag == "tr" and self.row is not None:
+            self.rows.append(self.row)
+            self.row = None
+
+    def handle_data(self, data):
+        if self.row is not None and self.field:
+            self.row[self.field] += data
+
+
+def dom_records():
+    parser = TableRowParser()
+    parser.feed(PAGE_PATH.read_text(encoding="utf-8"))
+    # 录制的页面中表格重复渲染了多次，只取第一份
+    records = []
+    seen = set()
+    for row in parser.rows:
+        record = inputJson.dom_row_to_record(row)
+        if record["announcementId"] not in seen:
+            seen.add(record["announcementId"])
+            records.append(record)
+    return records
+
+
+def api_records():
+    data = json.loads(API_FIXTURE_PATH.read_text(encoding="utf-8"))
+    return [inputJson.api_item_to_record(item, "gssz0002031") for item in data["announcements"]]
+
+
+def test_api_records_match_dom_records():
+    dom = dom_records()
+    api = api_records()
+    assert len(dom) == len(api) == 20
+    assert api == dom
+
+
+def test_dom_href_keeps_page_form():
+    record = dom_records()[0]
+    assert record["href"] == (
+        "https://www.cninfo.com.cn/new/disclosure/detail"
+        "?orgId=gssz0002031&announcementId=1224557663&announcementTime=2025-08-22 12:00"
+    )
+    assert record["title"] == "巨轮智能： 2025年半年度报告"
+    assert record["date"] == "2025-08-22"
+
+
+def test_api_title_strips_highlight():
+    item = {
+        "secName": "巨轮智能",
+        "orgId": "gssz0002031",
+        "announcementId": "1",
+        "announcementTitle": "关于<em>回购</em>股份的公告",
+        "announcementTime": 1755835200000,
+    }
+    record = inputJson.api_item_to_record(item, "gssz0002031")
+    assert record["title"] == "巨轮智能： 关于回购股份的公告"
+    assert inputJson.detail_href("gssz0002031", "1", "2025-08-22 12:00") == record["href"]
@@ -0,0 +1,117 @@
+import asyncio
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+import inputJson
+
+TARGET_URL = inputJson.build_target_url("000001")
+PAGE_SIZE = 3
+DAY = 24 * 3600 * 1000
+START = 1704038400000  # 2024-01-01 00:00（北京时间）
+
+
+class FakeListing:
+    """
+    模拟公告查询接口：公告按时间从新到旧分页返回，fail_page 页请求失败一次
+    """
+
+    def __init__(self, count):
+        self.items = []
+        self.requested = []
+        self.fail_page = None
+        self.publish(count)
+
+    def publish(self, count):
+        base = len(self.items)
+        new = [
+            {"announcementId": str(1000 + base + i), "announcementTitle": f"公告{base + i}",
+             "announcementTime": START + (base + i) * DAY, "secName": "平安银行", "orgId": "gssz0000001"}
+            for i in range(count)
+        ]
+        self.items = list(reversed(new)) + self.items
+
+    def handler(self, request):
+        page = int(parse_qs(request.content.decode())["pageNum"][0])
+        self.requested.append(page)
+        if page == self.fail_page:
+            self.fail_page = None
+            raise httpx.ConnectError("连接中断")
+        chunk = self.items[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+        return httpx.Response(200, json={"announcements": chunk, "hasMore": page * PAGE_SIZE < len(self.items)})
+
+
+@pytest.fixture(autouse=True)
+def checkpoint_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(inputJson, "LISTING_CHECKPOINT_DIR", tmp_path / "listing")
+    monkeypatch.setattr(inputJson, "API_PAGE_SIZE", PAGE_SIZE)
+    monkeypatch.setattr(inputJson, "API_RETRIES", 1)
+
+
+def fetch(fake):
+    async def run():
+        stream = inputJson.ListingStream(TARGET_URL, "2024-01-01", "2024-12-31", backend="api")
+        try:
+            async with httpx.AsyncClient(transport=httpx.MockTransport(fake.handler)) as client:
+                return await inputJson.fetch_listing_api(TARGET_URL, "2024-01-01", "2024-12-31", client=client, stream=stream)
+        finally:
+            stream.close()
+    return asyncio.run(run())
+
+
+def ids(records):
+    return [record["announcementId"] for record in records]
+
+
+def test_interrupted_listing_resumes_from_last_completed_page():
+    fake = FakeListing(10)
+    fake.fail_page = 3
+    with pytest.raises(httpx.ConnectError):
+        fetch(fake)
+    assert fake.requested == [1, 2, 3]
+
+    fake.requested.clear()
+    records = fetch(fake)
+    # 重新读取最后完成的第 2 页，不再请求第 1 页
+    assert fake.requested == [2, 3, 4]
+    assert ids(records) == [item["announcementId"] for item in fake.items]
+
+
+def test_changed_listing_discards_checkpoint_and_starts_over():
+    fake = FakeListing(10)
+    fake.fail_page = 3
+    with pytest.raises(httpx.ConnectError):
+        fetch(fake)
+
+    # 两次运行之间出现 2 条新公告，后面的公告整体后移，续传页的首行与检查点不一致
+    fake.publish(2)
+    fake.requested.clear()
+    records = fetch(fake)
+    assert fake.requested == [2, 1, 2, 3, 4]
+    assert ids(records) == [item["announcementId"] for item in fake.items]
+
+
+def test_finished_listing_starts_over():
+    fake = FakeListing(4)
+    assert len(fetch(fake)) == 4
+    fake.requested.clear()
+    fake.publish(1)
+    assert len(fetch(fake)) == 5
+    assert fake.requested[0] == 1
+
+
+def test_concurrent_stream_for_same_listing_leaves_checkpoint_alone():
+    fake = FakeListing(7)
+    fake.fail_page = 3
+    with pytest.raises(httpx.ConnectError):
+        fetch(fake)
+
+    # 另一个任务持有同一列表的检查点时，本次完整抓取且不改动对方的文件
+    holder = inputJson.ListingStream(TARGET_URL, "2024-01-01", "2024-12-31", backend="api")
+    saved = holder.jsonl_path.read_text(encoding="utf-8"), holder.checkpoint_path.read_text(encoding="utf-8")
+    fake.requested.clear()
+    assert len(fetch(fake)) == 7
+    assert fake.requested == [1, 2, 3]
+    assert (holder.jsonl_path.read_text(encoding="utf-8"), holder.checkpoint_path.read_text(encoding="utf-8")) == saved
+    holder.close()
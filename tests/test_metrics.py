@@ -0,0 +1,24 @@
+import pytest
+
+import metrics
+
+
+def test_timer_rejects_reserved_field_when_written(monkeypatch, capsys):
+    monkeypatch.setattr(metrics, "registry", metrics.Registry())
+    reached = []
+    with pytest.raises(ValueError):
+        with metrics.timer("download", labels={"stage": "list"}) as m:
+            m["seconds"] = 1
+            reached.append(True)
+    assert not reached
+    with pytest.raises(ValueError):
+        with metrics.timer("download", labels={"stage": "list"}) as m:
+            m.update(stage="download")
+
+    # 块内原本的异常不会被字段检查掩盖，事件带上 error 字段
+    with pytest.raises(KeyError):
+        with metrics.timer("download") as m:
+            m["bytes"] = 10
+            raise KeyError("file")
+    events = [line for line in capsys.readouterr().out.splitlines() if '"bytes"' in line]
+    assert '"error": "KeyError"' in events[-1]
@@ -0,0 +1,16 @@
+import callLLM
+import loadTest
+import pdfText
+import textCleaner
+
+
+def test_uncleaned_prompt_text_has_no_page_breaks(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdfText, "TEXT_CACHE_DIR", tmp_path / "text")
+    monkeypatch.setattr(textCleaner, "PROMPT_CLEAN", False)
+    pdf_path = tmp_path / "a.pdf"
+    pdf_path.write_bytes(loadTest.make_pdf([["Page one"], ["Page two"], ["Page three"]]))
+
+    text = callLLM.read_pdf_text(pdf_path)
+    assert pdfText.PAGE_BREAK not in text
+    # 与不分页的提取结果逐字节相同：各页以换行连接
+    assert text == "\n".join(page.extract_text() for page in pdfText.PdfReader(pdf_path).pages) + "\n"
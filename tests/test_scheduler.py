@@ -0,0 +1,23 @@
+import taskScheduler
+
+
+def queue_with_waiting_low_priority(tmp_path):
+    queue = taskScheduler.TaskQueue("priority", {"问询函": 1})
+    queue.push(tmp_path / "董事会决议公告.pdf")
+    queue.push(tmp_path / "关于年报的问询函.pdf")
+    # 低优先级的公告已等待 1 小时
+    queue.items[0]["queued_at"] -= 3600
+    return queue
+
+
+def test_priority_ages_waiting_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(taskScheduler, "SCHEDULE_AGING_SECONDS", 300)
+    queue = queue_with_waiting_low_priority(tmp_path)
+    assert queue.pop()[0].name == "董事会决议公告.pdf"
+
+
+def test_aging_disabled_when_not_positive(tmp_path, monkeypatch):
+    for aging in (0, -1):
+        monkeypatch.setattr(taskScheduler, "SCHEDULE_AGING_SECONDS", aging)
+        queue = queue_with_waiting_low_priority(tmp_path)
+        assert [queue.pop()[0].name for _ in range(2)] == ["关于年报的问询函.pdf", "董事会决议公告.pdf"]
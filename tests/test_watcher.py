@@ -0,0 +1,103 @@
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+import inputJson
+import jobQueue
+import manifest
+import watcher
+
+TARGET_URL = inputJson.build_target_url("000001")
+PAGE_SIZE = 3
+DAY = 24 * 3600 * 1000
+START = 1704038400000  # 2024-01-01 00:00（北京时间）
+
+
+class FakeListing:
+    """
+    模拟公告查询接口：公告按时间从新到旧分页返回
+    """
+
+    def __init__(self):
+        self.items = []
+        self.pages = []
+
+    def publish(self, count):
+        base = len(self.items)
+        new = [
+            {"announcementId": str(1000 + base + i), "announcementTitle": f"公告{base + i}",
+             "announcementTime": START + (base + i) * DAY, "secName": "平安银行", "orgId": "gssz0000001"}
+            for i in range(count)
+        ]
+        self.items = list(reversed(new)) + self.items
+
+    def handler(self, request):
+        page = int(parse_qs(request.content.decode())["pageNum"][0])
+        self.pages.append(page)
+        chunk = self.items[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+        return httpx.Response(200, json={"announcements": chunk, "hasMore": page * PAGE_SIZE < len(self.items)})
+
+
+@pytest.fixture
+def listing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(watcher, "WATCH_DB_PATH", tmp_path / "watcher.db")
+    monkeypatch.setattr(manifest, "MANIFEST_PATH", tmp_path / "manifest.db")
+    monkeypatch.setattr(watcher, "WATCH_MAX_PAGES", 2)
+    monkeypatch.setattr(watcher, "WATCH_BACKFILL_DAYS", 0)
+    monkeypatch.setattr(inputJson, "API_PAGE_SIZE", PAGE_SIZE)
+    enqueued = []
+    monkeypatch.setattr(jobQueue, "enqueue", lambda path, **kwargs: enqueued.append(json.loads(path.read_text(encoding="utf-8"))) or "job")
+    fake = FakeListing()
+    fake.enqueued = enqueued
+    return fake
+
+
+def check(fake):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(fake.handler)) as client:
+            return await watcher.check_company(client, TARGET_URL, "分析")
+    return asyncio.run(run())
+
+
+def enqueued_titles(fake):
+    return [title for config in fake.enqueued for title in config["titles"]]
+
+
+def test_truncated_check_resumes_before_advancing_high_water(listing):
+    listing.publish(2)
+    assert check(listing) == 0  # 第一次检查只记录起点
+    high_water = watcher.get_state("000001")["last_time"]
+
+    # 高水位之后出现 10 条公告，单次最多翻 2 页（6 条）
+    listing.publish(10)
+    assert check(listing) == 6
+    state = watcher.get_state("000001")
+    assert state["last_time"] == high_water
+    assert state["backlog"]["page"] == 3
+
+    # 两次检查之间又出现 1 条：继续翻页时跳过已加入队列的公告，翻到高水位后才推进
+    listing.publish(1)
+    assert check(listing) == 4
+    state = watcher.get_state("000001")
+    assert state["backlog"] is None
+    assert state["last_time"] == START + 11 * DAY
+
+    # 最新的 1 条在下一次检查中发现
+    assert check(listing) == 1
+    titles = enqueued_titles(listing)
+    assert len(titles) == len(set(titles)) == 11
+    assert watcher.get_state("000001")["last_time"] == START + 12 * DAY
+
+
+def test_check_within_page_limit_advances_high_water(listing):
+    listing.publish(1)
+    check(listing)
+    listing.publish(4)
+    assert check(listing) == 4
+    state = watcher.get_state("000001")
+    assert state["backlog"] is None
+    assert state["last_time"] == START + 4 * DAY
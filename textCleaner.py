@@ -0,0 +1,102 @@
+import os
+import re
+import sys
+import json
+from collections import Counter
+import docChunker
+import pdfText
+
+# 发送给大模型之前清理 PDF 文本：去掉每页重复的页眉页脚、页码、巨潮公告固定的声明文字和多余空白，
+# 减少提示词的 token 数；清理前后的 token 数随 text_clean 事件输出
+PROMPT_CLEAN = os.getenv("PROMPT_CLEAN", "1") == "1"
+# 每页开头和结尾各检查几行作为页眉页脚候选
+EDGE_LINES = int(os.getenv("PROMPT_CLEAN_EDGE_LINES", "3"))
+# 同一行（数字归一后）出现在至少该比例的页的页眉页脚位置时视为页眉页脚
+REPEAT_RATIO = float(os.getenv("PROMPT_CLEAN_REPEAT_RATIO", "0.5"))
+
+# 页码：“第 3 页”“第3页 共10页”“3/10”“- 3 -”“Page 3”
+PAGE_NUMBER_RE = re.compile(
+    r"^(第\s*\d+\s*页(\s*[,，/／]?\s*共\s*\d+\s*页)?|共\s*\d+\s*页\s*第\s*\d+\s*页|\d+\s*[/／]\s*\d+|[-—－]\s*\d+\s*[-—－]|page\s*\d+(\s*of\s*\d+)?)$",
+    re.IGNORECASE,
+)
+# 单独的数字只有与实际页码相近时才视为页码（表格末尾的数字不删除）
+BARE_NUMBER_RE = re.compile(r"^\d{1,4}$")
+PAGE_NUMBER_SLACK = 3
+# 巨潮公告固定的声明文字（可能跨行），以及“特此公告”
+BOILERPLATE_RES = [
+    re.compile(r"本公司及(?:董事会|董事会全体成员|全体董事|董事、监事、高级管理人员|监事会)[^。]{0,60}?保证[^。]{0,120}?(?:重大遗漏|连带责任)[^。]{0,60}?。"),
+    re.compile(r"(?:本公司)?董事会及全体董事保证[^。]{0,160}?(?:重大遗漏|连带责任)[^。]{0,80}?。"),
+    re.compile(r"特此公告[。.]?"),
+]
+# 目录中的引导点（……、.....）
+LEADER_RE = re.compile(r"[.．·…]{4,}")
+SPACES_RE = re.compile(r"[ \t　\xa0]+")
+
+
+def normalize_line(line):
+    """
+    归一化用于比较的行：去掉空白，数字统一替换（页眉页脚中的页码每页不同）
+    """
+    return re.sub(r"\d+", "#", SPACES_RE.sub("", line))
+
+
+def find_repeated_lines(pages):
+    """
+    找出在多数页的开头或结尾几行重复出现的行（归一化后），页数太少时不判断
+    """
+    if len(pages) < 3:
+        return set()
+    counts = Counter()
+    for lines in pages:
+        edges = lines[:EDGE_LINES] + lines[-EDGE_LINES:]
+        counts.update({normalize_line(line) for line in edges})
+    threshold = max(3, len(pages) * REPEAT_RATIO)
+    return {line for line, count in counts.items() if count >= threshold}
+
+
+def clean_text(text):
+    """
+    清理文本，返回 (清理后的文本, 统计信息)；统计信息包含清理前后的 token 数和各类删除的行数
+    """
+    # 空行不计入页首页尾的行数
+    pages = [[line.strip() for line in page.splitlines() if line.strip()] for page in pdfText.split_pages(text)]
+    repeated = find_repeated_lines(pages)
+    removed = Counter()
+    kept = []
+    for page_no, lines in enumerate(pages, start=1):
+        last = len(lines) - 1
+        for index, line in enumerate(lines):
+            in_edge = index < EDGE_LINES or index > last - EDGE_LINES
+            if in_edge and normalize_line(line) in repeated:
+                removed["header_footer"] += 1
+                continue
+            if in_edge and (PAGE_NUMBER_RE.match(line) or (BARE_NUMBER_RE.match(line) and abs(int(line) - page_no) <= PAGE_NUMBER_SLACK)):
+                removed["page_number"] += 1
+                continue
+            kept.append(line)
+
+    cleaned = "\n".join(kept)
+    for pattern in BOILERPLATE_RES:
+        cleaned, count = pattern.subn("", cleaned)
+        removed["boilerplate"] += count
+    cleaned = LEADER_RE.sub(" ", cleaned)
+    cleaned = SPACES_RE.sub(" ", cleaned)
+    # 去掉行首尾空白和删除声明后留下的空行
+    cleaned = "\n".join(line.strip() for line in cleaned.splitlines() if line.strip()) + "\n"
+
+    tokens_before = docChunker.estimate_tokens(text)
+    tokens_after = docChunker.estimate_tokens(cleaned)
+    return cleaned, {
+        "pages": len(pages),
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "reduction": round(1 - tokens_after / tokens_before, 3) if tokens_before else 0.0,
+        "removed": dict(removed),
+    }
+
+
+if __name__ == "__main__":
+    # python textCleaner.py a.pdf b.pdf ...   输出每个文件清理前后的 token 数
+    for path in sys.argv[1:]:
+        text, _ = pdfText.extract_text(path)
+        print(json.dumps({"file": path, **clean_text(text)[1]}, ensure_ascii=False))
@@ -0,0 +1,188 @@
+import os
+import re
+import sys
+import json
+import time
+from pathlib import Path
+from PyPDF2 import PdfReader
+import pdfText
+
+# 快速分拣：只解析 PDF 的第一页和最后一页，用正则提取公告编号、日期、标题和页数并判断公告类型，
+# 不调用大模型；只有需要关注的类型才进入完整分析，例行公告只写出提取的元数据
+TRIAGE_MODE = os.getenv("TRIAGE_MODE", "0") == "1"
+# 需要完整分析的公告类型（逗号分隔），config.json 中的 analyzeTypes 优先
+TRIAGE_ANALYZE_TYPES = [t.strip() for t in os.getenv(
+    "TRIAGE_ANALYZE_TYPES", "定期报告,业绩预告,重大资产重组,股权激励,问询函,诉讼仲裁,未分类"
+).split(",") if t.strip()]
+
+# 公告类型及标题关键词，按顺序匹配第一个命中的类型；都不匹配时为“未分类”
+TYPE_RULES = [
+    ("问询函", ("问询函", "关注函", "监管函", "警示函")),
+    ("定期报告", ("年度报告", "年报", "季度报告", "一季报", "三季报")),
+    ("业绩预告", ("业绩预告", "业绩快报", "业绩预增", "业绩预减", "业绩预亏")),
+    ("重大资产重组", ("重大资产重组", "资产重组", "发行股份购买资产", "收购报告书", "要约收购")),
+    ("股权激励", ("股权激励", "限制性股票", "股票期权", "员工持股计划")),
+    ("诉讼仲裁", ("诉讼", "仲裁", "立案")),
+    ("权益分派", ("权益分派", "利润分配", "分红")),
+    ("股份变动", ("减持", "增持", "回购", "质押", "解除限售", "上市流通")),
+    ("股东大会", ("股东大会", "股东会")),
+    ("董事会决议", ("董事会决议", "监事会决议", "董事会会议", "监事会会议")),
+    ("中介机构意见", ("法律意见书", "核查意见", "独立董事", "独立意见", "专项说明", "鉴证报告", "审计报告")),
+    ("关联交易", ("关联交易", "担保")),
+    ("其他例行公告", ("提示性公告", "更正", "补充公告", "变更", "进展公告")),
+]
+
+NUMBER_PATTERNS = [
+    # 公告编号：2024-012 / 临2024-012 / 2024-临-012
+    re.compile(r"(?:公告|临时公告)?编号\s*[:：]?\s*([A-Za-z临\d〔〕\[\]（）()\-－—_]{4,24})"),
+    re.compile(r"(临?\s*\d{4}\s*[-－—]\s*(?:临\s*[-－—]\s*)?\d{2,4})"),
+]
+STOCK_CODE_PATTERN = re.compile(r"证券代码\s*[:：]?\s*(\d{6})")
+STOCK_NAME_PATTERN = re.compile(r"证券简称\s*[:：]?\s*(\S+?)(?:\s|公告编号|$)")
+DATE_PATTERN = re.compile(r"(\d{4})\s*年\s*(\d{1,2})\s*月\s*(\d{1,2})\s*日")
+CN_DATE_PATTERN = re.compile(r"([〇零一二三四五六七八九○Ｏ]{4})\s*年\s*([〇零一二三四五六七八九十]{1,3})\s*月\s*([〇零一二三四五六七八九十]{1,3})\s*日")
+CN_DIGITS = {c: i for i, c in enumerate("〇一二三四五六七八九")}
+CN_DIGITS.update({"零": 0, "○": 0, "Ｏ": 0})
+# 标题行通常以这些词结尾
+TITLE_SUFFIXES = ("公告", "报告", "报告书", "摘要", "意见", "意见书", "决议", "通知", "说明", "函", "制度", "章程", "计划", "方案")
+
+
+def read_edge_pages(pdf_path):
+    """
+    只解析第一页和最后一页，返回 (第一页文本, 最后一页文本, 页数)；PdfReader 按需解析页面对象，其余页不会被读取
+    """
+    reader = PdfReader(pdf_path)
+    page_count = pdfText.page_count(pdf_path, reader)
+    if page_count == 0:
+        return "", "", 0
+    first = reader.pages[0].extract_text() or ""
+    last = first if page_count == 1 else (reader.pages[page_count - 1].extract_text() or "")
+    return first, last, page_count
+
+
+def _cn_number(text):
+    """
+    中文数字（一至三十一）转为整数
+    """
+    if "十" not in text:
+        return int("".join(str(CN_DIGITS[c]) for c in text))
+    tens, _, ones = text.partition("十")
+    return (CN_DIGITS[tens] if tens else 1) * 10 + (CN_DIGITS[ones] if ones else 0)
+
+
+def find_date(text):
+    """
+    返回文本中最后出现的日期（YYYY-MM-DD），支持阿拉伯数字和中文数字；落款日期在文末
+    """
+    found = []
+    for match in DATE_PATTERN.finditer(text):
+        found.append((match.end(), match.groups()))
+    for match in CN_DATE_PATTERN.finditer(text):
+        try:
+            year = "".join(str(CN_DIGITS[c]) for c in match.group(1))
+            found.append((match.end(), (year, _cn_number(match.group(2)), _cn_number(match.group(3)))))
+        except KeyError:
+            continue
+    for _, (year, month, day) in sorted(found, reverse=True):
+        if 1 <= int(month) <= 12 and 1 <= int(day) <= 31:
+            return f"{int(year):04d}-{int(month):02d}-{int(day):02d}"
+    return None
+
+
+def find_number(text):
+    for pattern in NUMBER_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return re.sub(r"\s+", "", match.group(1)).strip("-－—_")
+    return None
+
+
+def find_title(first_page, fallback=None):
+    """
+    取第一页开头（证券代码、编号等行之后）第一个以公告类词语结尾的行，标题跨两行时合并；找不到时使用 fallback（文件名）
+    """
+    lines = [line.strip() for line in first_page.splitlines() if line.strip()]
+    for index, line in enumerate(lines[:15]):
+        if STOCK_CODE_PATTERN.search(line) or "编号" in line or len(line) > 60:
+            continue
+        if line.endswith(TITLE_SUFFIXES):
+            # 标题前一行没有标点时通常是标题的前半部分（如公司名称）
+            previous = lines[index - 1] if index > 0 else ""
+            if previous and not re.search(r"[:：，,。；;]|\d{6}|编号", previous) and len(previous) <= 30:
+                return previous + line
+            return line
+    return fallback
+
+
+def classify(title):
+    for name, keywords in TYPE_RULES:
+        if any(keyword in title for keyword in keywords):
+            return name
+    return "未分类"
+
+
+def triage_pdf(pdf_path):
+    """
+    分拣一个 PDF：返回公告编号、日期、标题、证券代码、页数、类型和耗时
+    """
+    pdf_path = Path(pdf_path)
+    start = time.perf_counter()
+    first, last, page_count = read_edge_pages(pdf_path)
+    # 文件名由公告标题生成，第一页找不到标题时使用
+    title = find_title(first, fallback=pdf_path.stem)
+    code = STOCK_CODE_PATTERN.search(first)
+    name = STOCK_NAME_PATTERN.search(first)
+    return {
+        "file": pdf_path.name,
+        "title": title,
+        "number": find_number(first),
+        # 日期在最后一页的落款处；只有一页或最后一页没有日期时在第一页中查找
+        "date": find_date(last) or find_date(first),
+        "stockCode": code.group(1) if code else None,
+        "stockName": name.group(1) if name else None,
+        "pages": page_count,
+        "type": classify(f"{title} {pdf_path.stem}"),
+        "seconds": round(time.perf_counter() - start, 4),
+    }
+
+
+def should_analyze(meta, analyze_types=None):
+    """
+    是否需要完整分析：类型在 analyze_types（默认 TRIAGE_ANALYZE_TYPES）中
+    """
+    return meta["type"] in (analyze_types or TRIAGE_ANALYZE_TYPES)
+
+
+def format_markdown(meta):
+    """
+    按分析结果的格式输出分拣得到的元数据（未调用大模型）
+    """
+    stock = " ".join(part for part in (meta.get("stockCode"), meta.get("stockName")) if part)
+    return (
+        f"## 公告编号\n{meta['number'] or '未识别'}\n\n"
+        f"## 公告日期\n{meta['date'] or '未识别'}\n\n"
+        f"## 文档摘要\n{meta['title']}（{meta['type']}，共 {meta['pages']} 页）。快速分拣模式：该类型未进行完整分析。\n\n"
+        f"## 关键信息\n"
+        f"- 公告类型：{meta['type']}\n"
+        f"- 证券：{stock or '未识别'}\n"
+        f"- 页数：{meta['pages']}\n\n"
+        f"## 详细内容\n未调用大模型，只提取了首末页的元数据；需要详细分析时把“{meta['type']}”加入 analyzeTypes 后重新分析。\n"
+    )
+
+
+def write_outputs(meta, output_path):
+    """
+    写出分拣结果：<文件名>.md（与分析结果格式一致）和 <文件名>.triage.json
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(format_markdown(meta), encoding="utf-8")
+    json_path = output_path.with_suffix(".triage.json")
+    json_path.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+    return output_path
+
+
+if __name__ == "__main__":
+    # python triage.py a.pdf b.pdf ...   输出每个文件的分拣结果（JSON）
+    for path in sys.argv[1:]:
+        print(json.dumps(triage_pdf(path), ensure_ascii=False))
@@ -0,0 +1,333 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import sqlite3
+import hashlib
+from pathlib import Path
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import httpx
+from dotenv import load_dotenv
+import inputJson
+import jobQueue
+import metrics
+
+load_dotenv()
+
+# 增量监控：定时查询每个公司最新一页公告，与记录的高水位（最新公告的时间和 ID）比较，
+# 只把新公告写成列表文件加入任务队列（跳过列表阶段，直接下载和分析），不重新扫描历史公告
+WATCH_DB_PATH = Path(os.getenv("WATCH_DB_PATH", Path(__file__).resolve().parent / "watcher.db"))
+# 两次检查的间隔（秒），实际间隔上下浮动 10%，避免所有实例同时请求
+WATCH_INTERVAL = float(os.getenv("WATCH_INTERVAL", "120"))
+# 同时检查的公司数
+WATCH_CONCURRENCY = int(os.getenv("WATCH_CONCURRENCY", "4"))
+# 第一次监控某公司时回看的天数；0 表示只记录当前最新公告作为起点，不分析历史公告
+WATCH_BACKFILL_DAYS = int(os.getenv("WATCH_BACKFILL_DAYS", "0"))
+# 单次检查最多翻页数，避免高水位之后的公告过多时一次请求过多页面；
+# 没有翻到高水位时记录翻页进度，下次检查从下一页继续，翻到高水位后才推进高水位
+WATCH_MAX_PAGES = int(os.getenv("WATCH_MAX_PAGES", "5"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS companies (
+    stock_code TEXT PRIMARY KEY,
+    target_url TEXT,
+    last_time INTEGER,
+    last_ids TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    page_hash TEXT,
+    checked_at REAL,
+    last_new_at REAL,
+    backlog TEXT
+);
+"""
+# 已建表的数据库路径
+_schema_ready = set()
+
+
+def connect():
+    """
+    打开高水位数据库（WAL 模式）；建表只在进程内第一次打开时执行
+    """
+    WATCH_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    ready = WATCH_DB_PATH in _schema_ready and WATCH_DB_PATH.exists()
+    conn = sqlite3.connect(WATCH_DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    if not ready:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        # 早期创建的数据库没有 backlog 列
+        if "backlog" not in {row["name"] for row in conn.execute("PRAGMA table_info(companies)")}:
+            conn.execute("ALTER TABLE companies ADD COLUMN backlog TEXT")
+        _schema_ready.add(WATCH_DB_PATH)
+    return conn
+
+
+@contextmanager
+def transaction():
+    """
+    打开一个连接，退出时提交（出错时回滚）并关闭
+    """
+    conn = connect()
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def get_state(stock_code):
+    with transaction() as conn:
+        row = conn.execute("SELECT * FROM companies WHERE stock_code = ?", (stock_code,)).fetchone()
+    if row is None:
+        return None
+    state = dict(row)
+    state["last_ids"] = json.loads(state["last_ids"] or "[]")
+    state["backlog"] = json.loads(state["backlog"]) if state["backlog"] else None
+    return state
+
+
+def save_state(stock_code, target_url, **fields):
+    """
+    更新公司的检查状态；fields 中的 last_ids 为列表，backlog 为字典（None 表示清除）
+    """
+    if "last_ids" in fields:
+        fields["last_ids"] = json.dumps(sorted(fields["last_ids"]))
+    if "backlog" in fields:
+        fields["backlog"] = json.dumps(fields["backlog"]) if fields["backlog"] else None
+    fields["checked_at"] = time.time()
+    columns = ["stock_code", "target_url", *fields]
+    with transaction() as conn:
+        conn.execute(
+            f"""
+            INSERT INTO companies ({", ".join(columns)}) VALUES ({", ".join("?" for _ in columns)})
+            ON CONFLICT(stock_code) DO UPDATE SET target_url = excluded.target_url,
+                {", ".join(f"{name} = excluded.{name}" for name in fields)}
+            """,
+            (stock_code, target_url, *fields.values()),
+        )
+
+
+def load_companies(watch_data):
+    """
+    读取监控配置中的公司列表，返回公告页面地址列表（与批量配置相同，可以用 stockCode/orgId 或 target_url）
+    """
+    urls = []
+    for company in watch_data["companies"]:
+        target_url = company.get("target_url") or inputJson.build_target_url(company["stockCode"], company.get("orgId"))
+        if not target_url.startswith("https://www.cninfo.com.cn"):
+            print(f"错误: 跳过不受支持的target_url: {target_url}")
+            continue
+        urls.append(target_url)
+    return urls
+
+
+def is_new(item, state):
+    """
+    公告是否在高水位之后：时间更晚，或时间相同但 ID 未见过
+    """
+    if state is None or state["last_time"] is None:
+        return True
+    return item["announcementTime"] > state["last_time"] or (
+        item["announcementTime"] == state["last_time"] and str(item["announcementId"]) not in state["last_ids"]
+    )
+
+
+def is_older(item, mark):
+    """
+    公告是否在 mark（{"time", "ids"}）之前：时间更早，或时间相同但 ID 不在 mark 中
+    """
+    return item["announcementTime"] < mark["time"] or (
+        item["announcementTime"] == mark["time"] and str(item["announcementId"]) not in mark["ids"]
+    )
+
+
+def edge_mark(items, newest, previous=None):
+    """
+    返回 items 中最新（newest=True）或最早的公告时间及该时间的所有 ID；与 previous 时间相同时合并 ID
+    """
+    pick = max if newest else min
+    when = pick(item["announcementTime"] for item in items)
+    ids = {str(item["announcementId"]) for item in items if item["announcementTime"] == when}
+    if previous and previous["time"] == when:
+        ids |= set(previous["ids"])
+    return {"time": when, "ids": sorted(ids)}
+
+
+async def fetch_first_page(client, form, state):
+    """
+    请求第一页；带上次的 ETag / Last-Modified 发起条件请求，
+    服务器返回 304 或内容哈希与上次相同时返回 None（没有变化）
+    """
+    headers = {}
+    if state and state.get("etag"):
+        headers["If-None-Match"] = state["etag"]
+    if state and state.get("last_modified"):
+        headers["If-Modified-Since"] = state["last_modified"]
+    for attempt in range(1, inputJson.API_RETRIES + 1):
+        try:
+            response = await client.post(f"{inputJson.CNINFO_API_BASE}/new/hisAnnouncement/query", data=form, headers=headers)
+            if response.status_code == 304:
+                return None, {}
+            response.raise_for_status()
+            break
+        except httpx.HTTPError as e:
+            if attempt == inputJson.API_RETRIES:
+                raise
+            print(f"查询接口请求失败，第 {attempt} 次重试: {e}")
+            await asyncio.sleep(attempt)
+
+    validators = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "page_hash": hashlib.sha256(response.content).hexdigest(),
+    }
+    if state and state.get("page_hash") == validators["page_hash"]:
+        return None, validators
+    return response.json(), validators
+
+
+async def check_company(client, target_url, require):
+    """
+    检查一个公司是否有新公告，有则写出列表文件并加入任务队列，返回新公告数
+    """
+    org_id, stock_code = inputJson.parse_target_url(target_url)
+    state = get_state(stock_code)
+    today = datetime.now(inputJson.CST).date()
+    first_run = state is None or state["last_time"] is None
+    # 第一次监控且不回看时，只需要找到最近一年内的最新公告作为起点
+    initialize_only = first_run and WATCH_BACKFILL_DAYS == 0
+    if first_run:
+        start = today - timedelta(days=365 if initialize_only else WATCH_BACKFILL_DAYS)
+    else:
+        # 从高水位当天开始查询，同一天较早的公告由 ID 排除
+        start = datetime.fromtimestamp(state["last_time"] / 1000, tz=inputJson.CST).date()
+    form, org_id, stock_code, column = inputJson.build_query_form(target_url, start.isoformat(), today.isoformat())
+    # 上次检查没有翻到高水位：从记录的页继续，已加入队列的公告（floor 及更新的）不再加入
+    backlog = state["backlog"] if state else None
+
+    with metrics.timer("watch_check", stock=stock_code) as m:
+        if backlog:
+            form["pageNum"] = backlog["page"]
+            data, validators = await inputJson.fetch_listing_page(client, form), {}
+        else:
+            data, validators = await fetch_first_page(client, form, state)
+        if data is None:
+            m["changed"] = False
+            save_state(stock_code, target_url, **validators)
+            return 0
+
+        first_page = form["pageNum"]
+        items = []
+        truncated = False
+        while True:
+            page_items = data.get("announcements") or []
+            fresh = [
+                item for item in page_items
+                if is_new(item, state) and (not backlog or is_older(item, backlog["floor"]))
+            ]
+            items.extend(fresh)
+            # 本页没有出现高水位及更早的公告时才继续翻页
+            reached = any(not is_new(item, state) for item in page_items)
+            if initialize_only or not page_items or reached or not data.get("hasMore"):
+                break
+            if form["pageNum"] - first_page + 1 >= WATCH_MAX_PAGES:
+                truncated = True
+                break
+            form["pageNum"] += 1
+            data = await inputJson.fetch_listing_page(client, form)
+        m.update(changed=True, new=len(items), pages=form["pageNum"] - first_page + 1, truncated=truncated)
+
+    # 不回看时只把当前最新公告作为高水位，不加入队列
+    enqueue_items = [] if initialize_only else items
+    if truncated:
+        # 没有翻到高水位：高水位不变，记录下次继续的页、本轮最新的公告（翻完后作为新高水位）和已加入队列的最早公告
+        high_water = {"backlog": {
+            "page": form["pageNum"] + 1,
+            "top": backlog["top"] if backlog else edge_mark(items, newest=True),
+            "floor": edge_mark(items, newest=False, previous=backlog and backlog["floor"]) if items else backlog["floor"],
+        }}
+        print(f"⏸️ {stock_code} 新公告超过 {WATCH_MAX_PAGES} 页，下次检查从第 {form['pageNum'] + 1} 页继续")
+    elif items or backlog:
+        # 接口返回的公告时间可能只精确到天，同一时间的所有 ID 都要记录
+        top = backlog["top"] if backlog else edge_mark(items, newest=True)
+        last_time, last_ids = top["time"], set(top["ids"])
+        if state and state["last_time"] == last_time:
+            last_ids |= set(state["last_ids"])
+        high_water = {"last_time": last_time, "last_ids": last_ids, "backlog": None}
+    elif first_run:
+        # 查询范围内没有公告时以今天零点为起点
+        midnight = datetime.combine(today, datetime.min.time(), tzinfo=inputJson.CST)
+        high_water = {"last_time": int(midnight.timestamp() * 1000), "last_ids": set()}
+    else:
+        high_water = {}
+
+    if enqueue_items:
+        records = [inputJson.api_item_to_record(item, org_id) for item in enqueue_items]
+        dates = sorted(record["date"] for record in records)
+        config_data = {"target_url": target_url, "startDate": dates[0], "endDate": dates[-1], "require": require}
+        inputJson.apply_records(config_data, records)
+        output_dir = Path("listings")
+        output_dir.mkdir(exist_ok=True)
+        output_path = output_dir / f"{stock_code}_watch_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(config_data, f, ensure_ascii=False, indent=4)
+        # 列表已经写入配置文件，任务只需下载和分析
+        job_id = jobQueue.enqueue(output_path, name=f"{stock_code} 新公告 {len(records)} 条", stages=["download", "analyze"])
+        high_water["last_new_at"] = time.time()
+        metrics.count("watch_new_announcements", len(records), stock=stock_code, job=job_id)
+        metrics.emit("watch_new", stock=stock_code, count=len(records), job=job_id, titles=[r["title"] for r in records])
+        print(f"🆕 {stock_code} 新公告 {len(records)} 条，已加入任务队列: {job_id}")
+    elif first_run:
+        print(f"📌 {stock_code} 开始监控，当前最新公告作为起点")
+
+    # 加入队列成功后才推进高水位，中途失败时下次检查会重新发现这些公告
+    save_state(stock_code, target_url, **validators, **high_water)
+    return len(enqueue_items)
+
+
+async def run_once(watch_data):
+    """
+    检查所有公司一次，返回新公告总数
+    """
+    urls = load_companies(watch_data)
+    require = watch_data.get("require", "请分析此文档，提取关键内容并进行总结。")
+    semaphore = asyncio.Semaphore(max(1, int(watch_data.get("concurrency", WATCH_CONCURRENCY))))
+    async with httpx.AsyncClient(
+        headers={"User-Agent": "Mozilla/5.0", "X-Requested-With": "XMLHttpRequest"},
+        timeout=30,
+    ) as client:
+        async def check(target_url):
+            async with semaphore:
+                try:
+                    return await check_company(client, target_url, require)
+                except Exception as e:
+                    print(f"❌ 检查失败: {target_url}，错误: {e}")
+                    return 0
+
+        counts = await asyncio.gather(*(check(url) for url in urls))
+    return sum(counts)
+
+
+async def watch(watch_data, once=False):
+    interval = float(watch_data.get("interval", WATCH_INTERVAL))
+    print(f"👀 监控 {len(watch_data['companies'])} 个公司，每 {interval:.0f} 秒检查一次")
+    while True:
+        total = await run_once(watch_data)
+        print(f"{datetime.now().strftime('%H:%M:%S')} 检查完成，新公告 {total} 条")
+        if once:
+            metrics.emit_summary("watcher.py")
+            return total
+        await asyncio.sleep(interval * random.uniform(0.9, 1.1))
+
+
+if __name__ == "__main__":
+    # python watcher.py watch.json          按间隔持续监控
+    # python watcher.py watch.json --once   只检查一次（可由 cron 定时调用）
+    args = [arg for arg in sys.argv[1:] if arg != "--once"]
+    with open(args[0] if args else "watch.json", "r", encoding="utf-8") as f:
+        watch_config = json.load(f)
+    asyncio.run(watch(watch_config, once="--once" in sys.argv))